@@ -65,12 +65,53 @@ CREATE TABLE IF NOT EXISTS `Doctor_Portal` (
 create_table("Pharmacist_Portal", """
 CREATE TABLE IF NOT EXISTS `Pharmacist_Portal` (
   `User_ID` INT,
-  `Pharma_ID` INT PRIMARY KEY,
+  `Pharma_ID` INT NOT NULL,
   `Patient_UID` INT,
-  `Pr_ID` INT
+  `Pr_ID` INT,
+  `Lease_Until` DATETIME DEFAULT NULL,
+  UNIQUE KEY `ux_pharmacist_portal_pr` (`Pr_ID`)
 ) ENGINE=InnoDB;
 """)
 
+create_table("Prescription_Change", """
+CREATE TABLE IF NOT EXISTS `Prescription_Change` (
+  `Seq` BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  `Pr_ID` INT NOT NULL,
+  `Patient_ID` INT,
+  `Op` CHAR(1) NOT NULL COMMENT 'I / U / D'
+) ENGINE=InnoDB;
+""")
+
+# change feed: every write to Prescription is logged (see imhotep_app/imhotep/db/change_feed.py)
+print("--- Creating triggers ---")
+for name, event, row, op in (
+    ("trg_prescription_change_ins", "INSERT", "NEW", "I"),
+    ("trg_prescription_change_upd", "UPDATE", "NEW", "U"),
+    ("trg_prescription_change_del", "DELETE", "OLD", "D"),
+):
+    try:
+        cur.execute(
+            f"CREATE TRIGGER `{name}` AFTER {event} ON `Prescription` FOR EACH ROW "
+            f"INSERT INTO `Prescription_Change` (`Pr_ID`, `Patient_ID`, `Op`) "
+            f"VALUES ({row}.`Pr_ID`, {row}.`Patient_ID`, '{op}')"
+        )
+    except mysql.connector.Error as e:
+        print("   skipped:", e.msg)   # already exists on re-run
+
+# 2) Secondary indexes (same set as imhotep_app/imhotep/db/schema.py)
+print("--- Creating indexes ---")
+for stmt in (
+    "CREATE INDEX `ix_prescription_patient_dispense_visit` ON `Prescription` (`Patient_ID`, `Dispense`, `Visit_Date`)",
+    "CREATE INDEX `ix_prescription_patient_visit` ON `Prescription` (`Patient_ID`, `Visit_Date`)",
+    "CREATE INDEX `ix_prescription_patient_pr` ON `Prescription` (`Patient_ID`, `Pr_ID`)",
+    "CREATE INDEX `ix_prescription_visit_pr` ON `Prescription` (`Visit_Date`, `Pr_ID`)",
+    "CREATE INDEX `ix_prescription_dispense_pr` ON `Prescription` (`Dispense`, `Pr_ID`)",
+):
+    try:
+        cur.execute(stmt)
+    except mysql.connector.Error as e:
+        print("   skipped:", e.msg)   # already exists on re-run
+
 print("\n✅ Database and tables created successfully!")
 
 # Close connection
@@ -81,7 +81,8 @@ CREATE TABLE `pharmacist_portal` (
   `User_ID` int(11) DEFAULT NULL,
   `Pharma_ID` int(11) NOT NULL,
   `Patient_UID` int(11) DEFAULT NULL,
-  `Pr_ID` int(11) DEFAULT NULL
+  `Pr_ID` int(11) DEFAULT NULL,
+  `Lease_Until` datetime DEFAULT NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 --
@@ -117,6 +118,31 @@ CREATE TABLE `prescription` (
 INSERT INTO `prescription` (`Pr_ID`, `Patient_ID`, `Doctor_Sugg`, `Prescription`, `Visit_Date`, `Dispense`) VALUES
 (5, 112233, 'Frommmm doctors note sami is sick', 'From Presciption take napa twice a day', NULL, 1);
 
+--
+-- Triggers `prescription`
+--
+DELIMITER $$
+CREATE TRIGGER `trg_prescription_change_ins` AFTER INSERT ON `prescription` FOR EACH ROW INSERT INTO `prescription_change` (`Pr_ID`, `Patient_ID`, `Op`) VALUES (NEW.`Pr_ID`, NEW.`Patient_ID`, 'I')
+$$
+CREATE TRIGGER `trg_prescription_change_upd` AFTER UPDATE ON `prescription` FOR EACH ROW INSERT INTO `prescription_change` (`Pr_ID`, `Patient_ID`, `Op`) VALUES (NEW.`Pr_ID`, NEW.`Patient_ID`, 'U')
+$$
+CREATE TRIGGER `trg_prescription_change_del` AFTER DELETE ON `prescription` FOR EACH ROW INSERT INTO `prescription_change` (`Pr_ID`, `Patient_ID`, `Op`) VALUES (OLD.`Pr_ID`, OLD.`Patient_ID`, 'D')
+$$
+DELIMITER ;
+
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `prescription_change`
+--
+
+CREATE TABLE `prescription_change` (
+  `Seq` bigint(20) NOT NULL,
+  `Pr_ID` int(11) NOT NULL,
+  `Patient_ID` int(11) DEFAULT NULL,
+  `Op` char(1) NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
 -- --------------------------------------------------------
 
 --
@@ -141,17 +167,42 @@ INSERT INTO `user` (`User_ID`, `User_Name`, `Password`, `match`) VALUES
 -- Indexes for dumped tables
 --
 
+--
+-- Indexes for table `doctor_portal`
+--
+ALTER TABLE `doctor_portal`
+  ADD KEY `ix_doctor_portal_pr` (`Pr_ID`,`User_ID`),
+  ADD KEY `ix_doctor_portal_user_pr` (`User_ID`,`Pr_ID`);
+
 --
 -- Indexes for table `patient_portal`
 --
 ALTER TABLE `patient_portal`
   ADD PRIMARY KEY (`Patient_ID`);
 
+--
+-- Indexes for table `pharmacist_portal`
+--
+ALTER TABLE `pharmacist_portal`
+  ADD UNIQUE KEY `ux_pharmacist_portal_pr` (`Pr_ID`);
+
 --
 -- Indexes for table `prescription`
 --
 ALTER TABLE `prescription`
-  ADD PRIMARY KEY (`Pr_ID`);
+  ADD PRIMARY KEY (`Pr_ID`),
+  ADD KEY `ix_prescription_patient_dispense_visit` (`Patient_ID`,`Dispense`,`Visit_Date`),
+  ADD KEY `ix_prescription_patient_visit` (`Patient_ID`,`Visit_Date`),
+  ADD KEY `ix_prescription_patient_pr` (`Patient_ID`,`Pr_ID`),
+  ADD KEY `ix_prescription_visit_pr` (`Visit_Date`,`Pr_ID`),
+  ADD KEY `ix_prescription_dispense_pr` (`Dispense`,`Pr_ID`),
+  ADD FULLTEXT KEY `ft_prescription_text` (`Doctor_Sugg`,`Prescription`);
+
+--
+-- Indexes for table `prescription_change`
+--
+ALTER TABLE `prescription_change`
+  ADD PRIMARY KEY (`Seq`);
 
 --
 -- Indexes for table `user`
@@ -168,6 +219,12 @@ ALTER TABLE `user`
 --
 ALTER TABLE `prescription`
   MODIFY `Pr_ID` int(11) NOT NULL AUTO_INCREMENT, AUTO_INCREMENT=6;
+
+--
+-- AUTO_INCREMENT for table `prescription_change`
+--
+ALTER TABLE `prescription_change`
+  MODIFY `Seq` bigint(20) NOT NULL AUTO_INCREMENT;
 COMMIT;
 
 /*!40101 SET CHARACTER_SET_CLIENT=@OLD_CHARACTER_SET_CLIENT */;
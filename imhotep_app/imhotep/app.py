@@ -1,10 +1,46 @@
 import sys
 from PyQt5.QtWidgets import QApplication
+from . import applog
 from .router import Router
 
+
+def _shutdown():
+    # let in-flight queries finish (briefly) before closing pooled connections
+    from .db.connection import close_pool
+    from .db.instrument import log_summary
+    from .executor import db_thread_pool
+
+    db_thread_pool().waitForDone(2000)
+    close_pool()
+    log_summary()                       # per-action query latencies of this session
+    applog.stop()
+
+
+def _warm_up(router):
+    # once the selection screen is up: build the login view (pulls in the DB
+    # layer) and spawn bcrypt workers, so the first click and login don't wait
+    from .db.hashing import get_hash_service
+    from .db.name_index import get_name_index
+    from .watchdog import StallWatchdog
+
+    applog.start()                      # app.log from here on, starting with what was queued
+    router.preload("login")
+    get_hash_service().warm_up()
+    get_name_index().load_async()       # patient name autocomplete, off the GUI thread
+
+    # from here on, log the stack whenever the GUI thread stops answering
+    router.watchdog = StallWatchdog(router, view=router.current_view)
+    router.watchdog.start()
+    QApplication.instance().aboutToQuit.connect(router.watchdog.stop)
+
+
 def run_app():
+    applog.install()
     app = QApplication(sys.argv)
+    app.aboutToQuit.connect(_shutdown)
     router = Router()
+    router.stack.currentChanged.connect(lambda _: applog.set_view(router.current_view()))
+    router.first_paint.connect(lambda: _warm_up(router))
     router.show_selection()  # start at role selection
     router.show()            # show main window
     sys.exit(app.exec_())
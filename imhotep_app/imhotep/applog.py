@@ -0,0 +1,259 @@
+# imhotep/applog.py
+"""
+App-wide logging.
+
+    applog.install()        # run_app, before anything logs: records go to a queue
+    applog.start()          # after the first paint: a listener thread writes them
+    applog.stop()           # on quit: flush repeat counts, drain the queue
+
+Every logger's records go through a QueueHandler, so the thread that logs
+(usually the GUI thread) never touches the disk. A QueueListener thread
+writes them to LOG_FILE (default app.log in imhotep_app/) as JSON lines:
+
+    {"ts": "...", "level": "ERROR", "logger": "imhotep.patient", "msg": "...",
+     "view": "patient", "action": "patient.on_load", "thread": "...", "exc": "Traceback ..."}
+
+"view" is the screen on display (Router keeps set_view() current) and
+"action" the query tag of the portal action being run (db.instrument).
+
+The file rotates at LOG_MAX_BYTES into LOG_BACKUPS gzip files (app.log.1.gz,
+...). A traceback seen again within LOG_DEDUP_SECONDS (default 60) is not
+written again; once the window is over one line says how often it repeated.
+That keeps a DB outage, where every poll fails the same way, down to a few
+lines a minute. Warnings and up are also echoed, one line each, to stderr.
+"""
+import atexit
+import gzip
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import time
+from pathlib import Path
+
+DEFAULT_LOG_FILE = "app.log"
+DEFAULT_MAX_BYTES = 5_000_000
+DEFAULT_BACKUPS = 5
+DEFAULT_DEDUP_SECONDS = 60
+
+_queue = queue.SimpleQueue()
+_listener = None
+_context = {"view": None}
+
+
+def _no_action():
+    return None
+
+
+_action = _no_action                    # db.instrument.current_tag once start() has run
+
+
+def set_view(name):
+    """Called on the GUI thread whenever the visible screen changes."""
+    _context["view"] = name
+
+
+# ---------------- producer side (any thread) ----------------
+class _ContextQueueHandler(logging.handlers.QueueHandler):
+    """Stamps view/action and renders the traceback on the logging thread, then enqueues."""
+
+    def prepare(self, record):
+        record.view = _context["view"]
+        record.action = _action()
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        # traceback objects and args must not cross threads; the text is kept
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+
+def _env_level():
+    return os.getenv("LOG_LEVEL", "INFO").strip().upper() or "INFO"
+
+
+def install(level=None):
+    """Route the root logger through the queue. Cheap: no file is opened here."""
+    root = logging.getLogger()
+    if any(isinstance(h, _ContextQueueHandler) for h in root.handlers):
+        return
+    root.addHandler(_ContextQueueHandler(_queue))
+    root.setLevel(level or _env_level())
+    logging.captureWarnings(True)
+
+
+# ---------------- consumer side (listener thread) ----------------
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "view": getattr(record, "view", None),
+            "action": getattr(record, "action", None),
+            "thread": record.threadName,
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        for extra in ("repeats", "first_seen", "fingerprint"):
+            if hasattr(record, extra):
+                entry[extra] = getattr(record, extra)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def _gzip_rotator(source, dest):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def rotating_file_handler(path, max_bytes, backups):
+    """RotatingFileHandler whose rotated files are gzipped (app.log.1.gz, app.log.2.gz, ...)."""
+    handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                   encoding="utf-8", delay=True)
+    handler.namer = lambda name: name + ".gz"
+    handler.rotator = _gzip_rotator
+    return handler
+
+
+def fingerprint(record):
+    """Same logger + same traceback text = same fingerprint (message text may differ)."""
+    return hashlib.blake2b(f"{record.name}\n{record.exc_text}".encode(), digest_size=6).hexdigest()
+
+
+class TracebackDedup(logging.Handler):
+    """
+    Passes records on to `targets`, except that a traceback already written
+    in the last `window` seconds is only counted. When its window closes a
+    summary record ("... repeated N times") is written instead.
+    Runs on the listener thread only.
+    """
+
+    def __init__(self, targets, window):
+        super().__init__()
+        self.targets = targets
+        self.window = window
+        self._seen = {}                 # fingerprint -> [first_written, repeats, last_record]
+
+    def emit(self, record):
+        now = record.created
+        self._expire(now)
+        if record.exc_text and self.window > 0:
+            key = fingerprint(record)
+            seen = self._seen.get(key)
+            if seen is not None:
+                seen[1] += 1
+                seen[2] = record
+                return
+            self._seen[key] = [now, 0, record]
+            record.fingerprint = key
+        self._write(record)
+
+    def _expire(self, now):
+        for key in [k for k, (first, _, _) in self._seen.items() if now - first >= self.window]:
+            self._summarize(key, self._seen.pop(key))
+
+    def _summarize(self, key, seen):
+        first, repeats, last = seen
+        if not repeats:
+            return
+        summary = logging.makeLogRecord({
+            "name": last.name, "levelno": last.levelno, "levelname": last.levelname,
+            "msg": f"last traceback repeated {repeats} more time(s) in {last.created - first:.0f} s: "
+                   f"{last.getMessage()}",
+            "created": last.created, "msecs": last.msecs, "threadName": last.threadName,
+            "view": getattr(last, "view", None), "action": getattr(last, "action", None),
+            "repeats": repeats, "first_seen": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(first)),
+            "fingerprint": key,
+        })
+        self._write(summary)
+
+    def _write(self, record):
+        for target in self.targets:
+            if record.levelno >= target.level:
+                target.handle(record)
+
+    def flush(self):
+        for key in list(self._seen):
+            self._summarize(key, self._seen.pop(key))
+        for target in self.targets:
+            target.flush()
+
+    def close(self):
+        self.flush()
+        for target in self.targets:
+            target.close()
+        super().close()
+
+
+class _OneLineFormatter(logging.Formatter):
+    """stderr: the message, and only the last line of a traceback."""
+
+    def format(self, record):
+        exc_text, record.exc_text = record.exc_text, None
+        try:
+            line = super().format(record)
+        finally:
+            record.exc_text = exc_text
+        if exc_text:
+            line += " | " + exc_text.strip().splitlines()[-1]
+        return line
+
+
+def start():
+    """Open LOG_FILE and start the listener thread; records queued since install() are written first."""
+    global _listener, _action
+    if _listener is not None:
+        return
+    install()
+    from .db.config import APP_DIR, env_int, load_env
+    from .db.instrument import current_tag
+
+    load_env()                          # LOG_LEVEL may come from .env
+    logging.getLogger().setLevel(_env_level())
+    _action = current_tag
+    targets = []
+    path = os.getenv("LOG_FILE", DEFAULT_LOG_FILE).strip()
+    if path:
+        file_handler = rotating_file_handler(APP_DIR / Path(path).expanduser(),
+                                             env_int("LOG_MAX_BYTES", DEFAULT_MAX_BYTES),
+                                             env_int("LOG_BACKUPS", DEFAULT_BACKUPS))
+        file_handler.setFormatter(JsonLinesFormatter())
+        targets.append(file_handler)
+    console = logging.StreamHandler(sys.stderr)
+    console.setLevel(logging.WARNING)
+    console.setFormatter(_OneLineFormatter("%(levelname)s %(name)s [%(view)s]: %(message)s"))
+    targets.append(console)
+
+    dedup = TracebackDedup(targets, env_int("LOG_DEDUP_SECONDS", DEFAULT_DEDUP_SECONDS))
+    _listener = logging.handlers.QueueListener(_queue, dedup)
+    _listener.start()
+
+
+def stop():
+    """Write what is still queued plus pending repeat counts, then close the file."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+def queued(handler):
+    """
+    Put a QueueListener of its own in front of `handler` and return the
+    QueueHandler to attach instead, so the loggers that use it don't block
+    on the file either (the slow-query log uses this).
+    """
+    q = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(q, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)      # drains what is still queued
+    return logging.handlers.QueueHandler(q)
@@ -0,0 +1,83 @@
+# imhotep/change_poller.py
+"""
+Background polling of the prescription change feed (db/change_feed.py).
+
+    self._poller = ChangePoller(self, prepare=self._rows_for_changes)
+    self._poller.changes.connect(self._merge_changes)
+    self._poller.start()        # e.g. in showEvent
+    self._poller.stop()         # e.g. in hideEvent
+
+Every CHANGE_POLL_MS (default 2000) one range query runs on a worker thread;
+`changes` is only emitted when something changed. `prepare(changes)`, if
+given, also runs on the worker, so a portal can look up what it needs to show
+the rows (patient names, ...) without touching the database on the GUI thread.
+A poll never overlaps the previous one. The poller has its own executor, so
+it does not flash the portal's busy cursor.
+"""
+import logging
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from .db.change_feed import ChangeCursor, maybe_prune
+from .db.config import env_int, load_env
+from .executor import QueryExecutor
+
+DEFAULT_INTERVAL_MS = 2000
+
+logger = logging.getLogger("imhotep.change_poller")
+
+
+class ChangePoller(QObject):
+    changes = pyqtSignal(object)        # list of Change, or whatever `prepare` returned
+
+    def __init__(self, parent=None, prepare=None, interval_ms=None):
+        super().__init__(parent)
+        if interval_ms is None:
+            load_env()
+            interval_ms = env_int("CHANGE_POLL_MS", DEFAULT_INTERVAL_MS)
+        self._prepare = prepare
+        self._cursor = None
+        self._executor = QueryExecutor(self)
+        self._timer = QTimer(self)
+        self._timer.setInterval(max(100, interval_ms))
+        self._timer.timeout.connect(self._poll)
+
+    def start(self):
+        if not self._timer.isActive():
+            self._timer.start()
+            self._poll()
+
+    def stop(self):
+        """Stop polling; the next start() begins at the end of the feed again."""
+        self._timer.stop()
+        self._executor.cancel("poll")
+        self._cursor = None
+
+    def is_running(self):
+        return self._timer.isActive()
+
+    def _poll(self):
+        if self._executor.is_busy("poll"):
+            return
+        self._executor.submit(
+            "poll", self._fetch, self._cursor, self._prepare,
+            on_result=self._on_polled,
+            on_error=lambda e: logger.error("Error polling changes", exc_info=e),
+        )
+
+    @staticmethod
+    def _fetch(cursor, prepare):
+        if cursor is None:
+            # first poll: start from "now"; the portal shows fresh data anyway
+            maybe_prune()
+            return ChangeCursor.at_end(), []
+        changes = cursor.poll()
+        return cursor, (prepare(changes) if changes and prepare else changes)
+
+    def _on_polled(self, result):
+        cursor, changes = result
+        if not self._timer.isActive():
+            return                      # stopped while the poll was running
+        self._cursor = cursor
+        if changes:
+            self.changes.emit(changes)
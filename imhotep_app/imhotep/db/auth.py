@@ -1,76 +1,113 @@
-import pymysql
-from pymysql import err as db_errors
-import bcrypt
+import logging
+import threading
+
+from . import queries
+from .connection import DatabaseError, execute, fetch_one
+from .hashing import cost_pinned, get_hash_service, needs_rehash, target_cost
+from .names import get_name_cache
+
+logger = logging.getLogger("imhotep.auth")
+
+PASSWORD_MIN = 8
+PASSWORD_MAX = 16
+
+
+def registration_error(fullname, unique_code, password):
+    """
+    Why a registration can't be accepted, or None if it can. The rules of
+    RegisterView, shared with the bulk import (user_import.py). Pass the
+    fields already stripped.
+    """
+    if not fullname or not unique_code or not password:
+        return "Please fill in all fields."
+    if " " in unique_code:
+        return "Unique Code cannot contain spaces!"
+    if not unique_code.isdigit():
+        return "Unique Code must contain digits only!"
+    if not (PASSWORD_MIN <= len(password) <= PASSWORD_MAX):
+        return f"Password must be {PASSWORD_MIN} to {PASSWORD_MAX} characters long!"
+    return None
+
 
 class AuthHandler:
     @staticmethod
     def verify_user_credentials(User_ID, Password):
         try:
-            conn = pymysql.connect(
-                host="127.0.0.1",
-                user="root",
-                password="",
-                database="imhotep",
-                cursorclass=pymysql.cursors.Cursor
-            )
-            cur = conn.cursor()
-            cur.execute("SELECT Password FROM user WHERE User_ID=%s", (User_ID,))
-            row = cur.fetchone()
-            cur.close(); conn.close()
+            row = fetch_one(queries.USER_PASSWORD, (User_ID,), as_dict=False)
 
             if not row:
                 return "Invalid Credentials"
 
             stored_hash = row[0]
-            if bcrypt.checkpw(Password.encode('utf-8'), stored_hash.encode('utf-8')):
+            # bcrypt runs on the hashing process pool; we only wait for the answer
+            if get_hash_service().verify(Password, stored_hash).result():
+                if needs_rehash(stored_hash, target_cost(), downgrade=cost_pinned()):
+                    # raise it to this site's cost (lower only with BCRYPT_COST) without delaying the login
+                    threading.Thread(
+                        target=AuthHandler._rehash_password,
+                        args=(User_ID, Password, stored_hash),
+                        name="bcrypt-rehash", daemon=True,
+                    ).start()
                 return "Login Success"
             else:
                 return "Invalid Credentials"
 
-        except db_errors.Error as e:
+        except DatabaseError as e:
             return "Database Error: " + str(e)
+        except Exception as e:
+            return "An unexpected error occurred: " + str(e)
+
+    @staticmethod
+    def _rehash_password(User_ID, Password, old_hash):
+        try:
+            new_hash = get_hash_service().hash(Password).result()
+            # only replace the hash we verified; a concurrent reset wins
+            execute(queries.USER_REHASH_PASSWORD, (new_hash, User_ID, old_hash))
+        except Exception:
+            logger.exception("Could not rehash password for User_ID %s", User_ID)
 
     @staticmethod
     def reset_user_password(User_ID, Password, match):
         try:
-            # 'with' automatically opens and closes the connection and cursor
-            with pymysql.connect(
-                host="127.0.0.1",
-                user="root",
-                password="",
-                database="imhotep",
-                cursorclass=pymysql.cursors.Cursor
-            ) as conn:
-                with conn.cursor() as cur:
-
-                    # 1. Get the STORED MATCH HASH for the user (ONE query)
-                    # We use backticks (`) because 'user' and 'match' are SQL keywords
-                    cur.execute("SELECT `match` FROM `user` WHERE `User_ID`=%s", (User_ID,))
-                    result = cur.fetchone()
-
-                    # 2. Check 1: Was the User_ID found?
-                    if result is None:
-                        return "Unique Code not found"
-
-                    # 3. Check 2: (Fixes Crash Bug) Is the match column empty?
-                    if result[0] is None:
-                        return "Error: Security text not set for this user."
-
-                    # 4. Check 3: Does the security text match?
-                    stored_hash = result[0].encode('utf-8')
-
-                    if bcrypt.checkpw(match.encode('utf-8'), stored_hash):
-                        # SUCCESS! Both checks passed. Update the password.
-                        hashed_pw = bcrypt.hashpw(Password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-                        cur.execute("UPDATE `user` SET `Password`=%s WHERE `User_ID`=%s", (hashed_pw, User_ID))
-                        conn.commit()
-                        return "Password successfully updated"
-                    else:
-                        # User was found, but the 'match' text was wrong
-                        return "Invalid Credentials"
+            # 1. Get the STORED MATCH HASH for the user (ONE query)
+            result = fetch_one(queries.USER_MATCH, (User_ID,), as_dict=False)
+
+            # 2. Check 1: Was the User_ID found?
+            if result is None:
+                return "Unique Code not found"
+
+            # 3. Check 2: (Fixes Crash Bug) Is the match column empty?
+            if result[0] is None:
+                return "Error: Security text not set for this user."
+
+            # 4. Check 3: Does the security text match?
+            # The new hash is computed in parallel with the check (on the process
+            # pool) and simply thrown away if the check fails.
+            hashing = get_hash_service()
+            matched = hashing.verify(match, result[0])
+            new_hash = hashing.hash(Password)
+            # the only time we see the plain match text: bring its cost up to date too
+            new_match = (hashing.hash(match)
+                         if needs_rehash(result[0], target_cost(), downgrade=cost_pinned()) else None)
+
+            if matched.result():
+                # SUCCESS! Both checks passed. Update the password.
+                if new_match is not None:
+                    execute(queries.USER_SET_PASSWORD_AND_MATCH,
+                            (new_hash.result(), new_match.result(), User_ID))
+                else:
+                    execute(queries.USER_SET_PASSWORD, (new_hash.result(), User_ID))
+                get_name_cache().invalidate(User_ID)
+                return "Password successfully updated"
+            else:
+                # User was found, but the 'match' text was wrong
+                new_hash.cancel()
+                if new_match is not None:
+                    new_match.cancel()
+                return "Invalid Credentials"
 
         # 5. Correct exception handling
-        except pymysql.Error as e:
+        except DatabaseError as e:
             return "Database Error: " + str(e)
         except Exception as e:
             # Catch any other error (like bcrypt failing or the None.encode)
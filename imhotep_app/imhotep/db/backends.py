@@ -0,0 +1,259 @@
+# imhotep/db/backends.py
+"""
+Storage backends behind connection.py.
+
+- MySQLBackend: MySQL/MariaDB server through PyMySQL (the default).
+- SQLiteBackend: a local database file in WAL mode, for single-terminal sites
+  that don't want to run a server. Enable with DB_BACKEND=sqlite.
+
+SQL is written once in MySQL flavour with %s placeholders (queries.py); the
+SQLite cursor translates placeholders on the fly. Backticks and the rest of
+the syntax we use are understood by both.
+"""
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from functools import lru_cache
+
+from .config import DBSettings
+from .pool import ConnectionPool
+
+
+class Backend:
+    name = ""
+    driver_errors = ()          # exceptions translated to DatabaseError
+    integrity_errors = ()       # ... or to IntegrityError
+    skip_locked = False         # SELECT ... FOR UPDATE SKIP LOCKED available
+
+    def __init__(self, settings: DBSettings):
+        self.settings = settings
+        self.pool = ConnectionPool(
+            self.connect,
+            min_size=settings.pool_min,
+            max_size=settings.pool_max,
+            idle_timeout=settings.pool_idle_timeout,
+            ping_after=settings.pool_ping_after,
+            checkout_timeout=settings.pool_checkout_timeout,
+            ping=self.ping,
+            reset=self.reset,
+        )
+
+    def connect(self):
+        raise NotImplementedError
+
+    ping = None
+
+    def reset(self, conn):
+        """Called when a connection goes back to the pool."""
+
+    def cursor(self, conn, as_dict=False):
+        raise NotImplementedError
+
+    def stream_cursor(self, conn, as_dict=False):
+        """Cursor that hands rows over as they arrive instead of buffering the result."""
+        return self.cursor(conn, as_dict)
+
+    def begin(self, conn):
+        raise NotImplementedError
+
+
+# ---------------- MySQL / MariaDB ----------------
+def supports_skip_locked(server_version):
+    """'8.0.36' / '5.5.5-10.6.12-MariaDB' -> True; MySQL 8.0.1+ and MariaDB 10.6+ have SKIP LOCKED."""
+    version = server_version.split("5.5.5-", 1)[-1]      # MariaDB's replication-compat prefix
+    numbers = tuple(int(n) for n in re.findall(r"\d+", version)[:3])
+    if "mariadb" in version.lower():
+        return numbers >= (10, 6)
+    return numbers >= (8, 0, 1)
+
+
+class MySQLBackend(Backend):
+    name = "mysql"
+
+    def __init__(self, settings):
+        import pymysql                                  # only needed for this backend
+        from pymysql.constants import SERVER_STATUS
+
+        self._pymysql = pymysql
+        self._in_trans = SERVER_STATUS.SERVER_STATUS_IN_TRANS
+        self.driver_errors = (pymysql.err.Error,)
+        self.integrity_errors = (pymysql.err.IntegrityError,)
+        super().__init__(settings)
+
+    def connect(self):
+        s = self.settings
+        conn = self._pymysql.connect(
+            host=s.host,
+            port=s.port,
+            user=s.user,
+            password=s.password,
+            database=s.database,
+            charset=s.charset,
+            connect_timeout=s.connect_timeout,
+            autocommit=True,                            # transaction() opens explicit ones
+            cursorclass=self._pymysql.cursors.Cursor,
+        )
+        self.skip_locked = supports_skip_locked(conn.get_server_info())
+        return conn
+
+    def ping(self, conn):
+        conn.ping(reconnect=False)
+
+    def reset(self, conn):
+        # never hand out a connection with a half-finished transaction
+        if conn.server_status & self._in_trans:
+            conn.rollback()
+
+    def cursor(self, conn, as_dict=False):
+        cursors = self._pymysql.cursors
+        return conn.cursor(cursors.DictCursor if as_dict else cursors.Cursor)
+
+    def stream_cursor(self, conn, as_dict=False):
+        # unbuffered: rows are read off the socket as they are fetched
+        cursors = self._pymysql.cursors
+        return conn.cursor(cursors.SSDictCursor if as_dict else cursors.SSCursor)
+
+    def begin(self, conn):
+        conn.begin()
+
+
+# ---------------- SQLite ----------------
+@lru_cache(maxsize=256)
+def qmark(sql):
+    """'... WHERE a = %s AND b LIKE '%%x'' -> '... WHERE a = ? AND b LIKE '%x''"""
+    return re.sub(r"%([s%])", lambda m: "?" if m.group(1) == "s" else "%", sql)
+
+
+def _convert_date(raw):
+    try:
+        return date.fromisoformat(raw.decode())
+    except ValueError:
+        return raw.decode()
+
+
+def _convert_datetime(raw):
+    try:
+        return datetime.fromisoformat(raw.decode())
+    except ValueError:
+        return raw.decode()
+
+
+# match pymysql: DATE / DATETIME columns come back as date / datetime objects
+sqlite3.register_converter("DATE", _convert_date)
+sqlite3.register_converter("DATETIME", _convert_datetime)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(" "))
+
+
+class SQLiteCursor:
+    """DB-API cursor wrapper: %s placeholders, dict rows on request, usable in `with`."""
+
+    def __init__(self, cur, as_dict=False):
+        self._cur = cur
+        if as_dict:
+            cur.row_factory = lambda c, row: {d[0]: v for d, v in zip(c.description, row)}
+
+    def execute(self, sql, params=()):
+        self._cur.execute(qmark(sql), params or ())
+        return self._cur.rowcount
+
+    def executemany(self, sql, seq_of_params):
+        self._cur.executemany(qmark(sql), seq_of_params)
+        return self._cur.rowcount
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._cur.fetchmany(size or self._cur.arraysize)
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    def close(self):
+        self._cur.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SQLiteBackend(Backend):
+    name = "sqlite"
+    driver_errors = (sqlite3.Error,)
+    integrity_errors = (sqlite3.IntegrityError,)
+
+    def __init__(self, settings):
+        self.path = settings.sqlite_file()
+        self._init_lock = threading.Lock()
+        self._initialised = False
+        super().__init__(settings)
+
+    def connect(self):
+        conn = sqlite3.connect(
+            str(self.path),
+            timeout=self.settings.connect_timeout,      # busy timeout while another writer holds the lock
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            isolation_level=None,                       # autocommit; transaction() issues BEGIN
+            check_same_thread=False,                    # the pool hands connections to worker threads
+        )
+        s = self.settings
+        conn.execute("PRAGMA synchronous = NORMAL")     # safe with WAL, no fsync per commit
+        conn.execute(f"PRAGMA cache_size = -{s.sqlite_cache_mb * 1024}")
+        conn.execute(f"PRAGMA mmap_size = {s.sqlite_mmap_mb * 1024 * 1024}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        self._initialise_once(conn)
+        return conn
+
+    def _initialise_once(self, conn):
+        if self._initialised:
+            return
+        with self._init_lock:
+            if self._initialised:
+                return
+            from .schema import init_sqlite             # schema imports connection -> us
+            conn.execute("PRAGMA journal_mode = WAL")   # persistent, stored in the file
+            init_sqlite(conn)
+            self._initialised = True
+
+    def reset(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+
+    def cursor(self, conn, as_dict=False):
+        return SQLiteCursor(conn.cursor(), as_dict)
+
+    def begin(self, conn):
+        # take the write lock up front instead of failing to upgrade a read lock later
+        conn.execute("BEGIN IMMEDIATE")
+
+
+BACKENDS = {"mysql": MySQLBackend, "sqlite": SQLiteBackend}
+
+
+def create_backend(settings: DBSettings) -> Backend:
+    try:
+        cls = BACKENDS[settings.backend]
+    except KeyError:
+        raise ValueError(
+            f"unknown DB_BACKEND {settings.backend!r} (expected one of: {', '.join(BACKENDS)})"
+        ) from None
+    return cls(settings)
@@ -0,0 +1,123 @@
+# imhotep/db/change_feed.py
+"""
+Change feed for `prescription`.
+
+Triggers (schema.TRIGGERS) append a row to `prescription_change` for every
+insert, update (dispense included) and delete, numbered by an increasing Seq.
+A portal keeps a ChangeCursor and asks for what happened since:
+
+    feed = ChangeCursor.at_end()        # start from "now"
+    for change in feed.poll():          # one range query on the Seq primary key
+        ...                             # change.pr_id, change.patient_id, current column values
+
+Every Change carries the prescription as it is *now* (not as it was at that
+Seq), so applying one twice, or out of order, is harmless.
+
+On MySQL a Seq is handed out when the row is inserted, not when it commits:
+Seq 11 can be visible while Seq 10 is still in flight. The cursor therefore
+only moves past a missing Seq once rows after it have been seen for
+GAP_TIMEOUT seconds (a rolled-back write leaves a permanent hole), and it
+never hands the same Seq out twice.
+"""
+import threading
+import time
+from typing import NamedTuple
+
+from . import queries
+from .config import env_int, load_env
+from .connection import execute, fetch_all, fetch_one
+
+BATCH_SIZE = 500
+GAP_TIMEOUT = 10.0          # seconds before a missing Seq is written off
+DEFAULT_KEEP = 100000       # change rows kept by prune() (CHANGE_LOG_KEEP in .env)
+PRUNE_EVERY = 3600.0        # seconds; maybe_prune() runs at most this often per process
+
+
+class Change(NamedTuple):
+    seq: int
+    op: str                 # "I", "U" or "D", as logged
+    pr_id: int
+    patient_id: object
+    doctor_sugg: object     # current values; all None once the prescription is deleted
+    prescription: object
+    visit_date: object
+    dispense: object
+
+    @property
+    def deleted(self):
+        return self.dispense is None
+
+
+def latest_seq():
+    row = fetch_one(queries.CHANGES_LATEST, as_dict=False)
+    return (row[0] if row else None) or 0
+
+
+def collapse(changes):
+    """Latest Change per Pr_ID, in feed order: rows already carry the current state."""
+    last = {change.pr_id: change for change in changes}
+    return sorted(last.values(), key=lambda change: change.seq)
+
+
+class ChangeCursor:
+    def __init__(self, after=0, gap_timeout=GAP_TIMEOUT, clock=time.monotonic):
+        self.after = after          # every Seq <= after is delivered or written off
+        self.gap_timeout = gap_timeout
+        self._clock = clock
+        self._seen = set()          # delivered Seqs above `after` (there is a gap below them)
+        self._gaps = {}             # missing Seq -> when it was first noticed
+
+    @classmethod
+    def at_end(cls, **kwargs):
+        return cls(after=latest_seq(), **kwargs)
+
+    def poll(self, limit=BATCH_SIZE):
+        """New changes since the last poll (collapsed per Pr_ID); one query."""
+        rows = fetch_all(queries.CHANGES_AFTER, (self.after, limit), as_dict=False)
+        return collapse(self.advance(Change(*row) for row in rows))
+
+    def advance(self, changes):
+        """Filter out already-delivered changes and move `after` as far as it safely can."""
+        fresh = [change for change in changes if change.seq not in self._seen]
+        self._seen.update(change.seq for change in fresh)
+
+        now = self._clock()
+        while self._seen:
+            following = self.after + 1
+            if following in self._seen:
+                self._seen.remove(following)
+                self._gaps.pop(following, None)
+                self.after = following
+                continue
+            # hole below the rows we have: note every missing Seq up to them at once
+            for seq in range(following, min(self._seen)):
+                self._gaps.setdefault(seq, now)
+            if now - self._gaps[following] < self.gap_timeout:
+                break
+            del self._gaps[following]
+            self.after = following
+        return fresh
+
+
+def prune(keep=DEFAULT_KEEP):
+    """Drop all but the newest `keep` change rows; returns how many went."""
+    cutoff = latest_seq() - keep
+    if cutoff <= 0:
+        return 0
+    return execute(queries.CHANGES_PRUNE, (cutoff,)).rowcount
+
+
+_last_prune = None
+_prune_lock = threading.Lock()
+
+
+def maybe_prune():
+    """prune() with CHANGE_LOG_KEEP, at most once per PRUNE_EVERY in this process."""
+    global _last_prune
+    with _prune_lock:
+        now = time.monotonic()
+        if _last_prune is not None and now - _last_prune < PRUNE_EVERY:
+            return 0
+        _last_prune = now
+    load_env()
+    return prune(max(1, env_int("CHANGE_LOG_KEEP", DEFAULT_KEEP)))
@@ -0,0 +1,80 @@
+# imhotep/db/config.py
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# imhotep_app/.env (next to .env.sample); real environment variables win
+APP_DIR = Path(__file__).resolve().parents[2]
+ENV_FILE = APP_DIR / ".env"
+
+
+def load_env(env_file=ENV_FILE):
+    if env_file and Path(env_file).exists():
+        load_dotenv(env_file, override=False)
+
+
+def env_int(name, default):
+    value = os.getenv(name, "").strip()
+    return int(value) if value else default
+
+
+def env_float(name, default):
+    value = os.getenv(name, "").strip()
+    return float(value) if value else default
+
+
+@dataclass(frozen=True)
+class DBSettings:
+    """
+    Connection + pool settings for the app database.
+    Read once from the environment (and imhotep_app/.env if present).
+    """
+    backend: str = "mysql"              # "mysql" (MySQL/MariaDB server) or "sqlite" (local file)
+
+    host: str = "localhost"
+    port: int = 3306
+    user: str = "root"
+    password: str = ""
+    database: str = "imhotep"
+    charset: str = "utf8mb4"
+    connect_timeout: int = 5
+
+    # sqlite backend (single-terminal sites); relative paths are relative to imhotep_app/
+    sqlite_path: str = "../imhotep.db"
+    sqlite_cache_mb: int = 64
+    sqlite_mmap_mb: int = 256
+
+    # pool sizing / health
+    pool_min: int = 1
+    pool_max: int = 5
+    pool_idle_timeout: float = 300.0     # close idle connections above pool_min after this
+    pool_ping_after: float = 30.0        # ping on checkout only if idle longer than this
+    pool_checkout_timeout: float = 5.0   # wait this long for a free connection
+
+    @classmethod
+    def from_env(cls, env_file=ENV_FILE):
+        load_env(env_file)
+        return cls(
+            backend=(os.getenv("DB_BACKEND", cls.backend) or cls.backend).strip().lower(),
+            host=os.getenv("DB_HOST", cls.host) or cls.host,
+            port=env_int("DB_PORT", cls.port),
+            user=os.getenv("DB_USER", cls.user) or cls.user,
+            password=os.getenv("DB_PASSWORD", cls.password),
+            database=os.getenv("DB_NAME", cls.database) or cls.database,
+            charset=os.getenv("DB_CHARSET", cls.charset) or cls.charset,
+            connect_timeout=env_int("DB_CONNECT_TIMEOUT", cls.connect_timeout),
+            sqlite_path=os.getenv("DB_SQLITE_PATH", cls.sqlite_path) or cls.sqlite_path,
+            sqlite_cache_mb=env_int("DB_SQLITE_CACHE_MB", cls.sqlite_cache_mb),
+            sqlite_mmap_mb=env_int("DB_SQLITE_MMAP_MB", cls.sqlite_mmap_mb),
+            pool_min=env_int("DB_POOL_MIN", cls.pool_min),
+            pool_max=env_int("DB_POOL_MAX", cls.pool_max),
+            pool_idle_timeout=env_float("DB_POOL_IDLE_TIMEOUT", cls.pool_idle_timeout),
+            pool_ping_after=env_float("DB_POOL_PING_AFTER", cls.pool_ping_after),
+            pool_checkout_timeout=env_float("DB_POOL_CHECKOUT_TIMEOUT", cls.pool_checkout_timeout),
+        )
+
+    def sqlite_file(self) -> Path:
+        path = Path(self.sqlite_path).expanduser()
+        return path if path.is_absolute() else (APP_DIR / path).resolve()
@@ -1,10 +1,230 @@
-import mysql.connector
-def get_conn():
-        return mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="",          # your password here
-            database="imhotep",
-            connection_timeout=5, # prevent hangs
-            autocommit=False
-        )
\ No newline at end of file
+# imhotep/db/connection.py
+"""
+Shared database access for every view.
+
+All connections come from one process-wide pool (see pool.py) configured from
+.env (DB_BACKEND, DB_HOST, DB_USER, DB_PASSWORD, DB_NAME, DB_POOL_*). The
+backend is MySQL/MariaDB by default or a local SQLite file (backends.py).
+Use the helpers:
+
+    row  = fetch_one("SELECT ... WHERE User_ID=%s", (uid,))
+    rows = fetch_all("SELECT ...", as_dict=False)
+    res  = execute("UPDATE ...", params)          # -> WriteResult(rowcount, lastrowid)
+    res  = execute_many("UPDATE ...", [p1, p2])   # same statement per tuple, one commit
+    for row in stream("SELECT ..."):              # big results, never held in memory at once
+        ...
+
+    with transaction() as conn:                   # several statements, one commit
+        with cursor(conn) as cur:                 # %s placeholders on either backend
+            ...
+
+    with count_queries() as q:                    # round trips issued by this thread
+        ...
+    q.count                                       # count_queries(all_threads=True): by any thread
+"""
+import threading
+from contextlib import contextmanager
+from typing import NamedTuple, Optional
+
+from .backends import Backend, create_backend
+from .config import DBSettings
+from .instrument import InstrumentedCursor
+from .pool import ConnectionPool, PoolTimeout
+
+
+class DatabaseError(Exception):
+    """Any failure talking to the database (driver errors, pool timeouts)."""
+
+
+class IntegrityError(DatabaseError):
+    """Constraint violation, e.g. inserting a duplicate primary key."""
+
+
+STREAM_BATCH = 1000            # rows per fetchmany() in stream()
+
+
+class WriteResult(NamedTuple):
+    rowcount: int
+    lastrowid: Optional[int]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> Backend:
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(DBSettings.from_env())
+    return _backend
+
+
+def backend_name() -> str:
+    """"mysql" or "sqlite", for the few places that need dialect-specific SQL."""
+    return get_backend().name
+
+
+def get_pool() -> ConnectionPool:
+    return get_backend().pool
+
+
+def pool_stats() -> dict:
+    return get_pool().stats()
+
+
+def close_pool():
+    global _backend
+    with _backend_lock:
+        if _backend is not None:
+            _backend.pool.close()
+            _backend = None
+
+
+@contextmanager
+def connection():
+    """Check out a pooled connection (autocommit on)."""
+    backend = get_backend()
+    try:
+        with backend.pool.connection() as conn:
+            yield conn
+    except PoolTimeout as e:
+        raise DatabaseError(str(e)) from e
+    except backend.integrity_errors as e:
+        raise IntegrityError(str(e)) from e
+    except backend.driver_errors as e:
+        raise DatabaseError(str(e)) from e
+
+
+@contextmanager
+def transaction():
+    """Check out a connection inside BEGIN ... COMMIT; rolls back on any error."""
+    _note_query()                   # the whole block counts as one round trip
+    with connection() as conn:
+        get_backend().begin(conn)
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+
+
+class QueryCount:
+    def __init__(self):
+        self.count = 0
+
+
+_counters = threading.local()
+_global_counters = []               # count_queries(all_threads=True)
+_global_lock = threading.Lock()
+
+
+@contextmanager
+def count_queries(all_threads=False):
+    """
+    Count the calls to fetch_one/fetch_all/stream and the transaction() blocks
+    (execute/execute_many are one each) on this thread (or, with all_threads,
+    on any thread, e.g. QueryExecutor workers) while the block runs. Counters
+    nest; every active one is incremented.
+    """
+    counter = QueryCount()
+    if all_threads:
+        with _global_lock:
+            _global_counters.append(counter)
+    else:
+        stack = _counters.__dict__.setdefault("stack", [])
+        stack.append(counter)
+    try:
+        yield counter
+    finally:
+        if all_threads:
+            with _global_lock:
+                _global_counters.remove(counter)
+        else:
+            stack.remove(counter)
+
+
+def _note_query():
+    for counter in getattr(_counters, "stack", ()):
+        counter.count += 1
+    if _global_counters:
+        with _global_lock:
+            for counter in _global_counters:
+                counter.count += 1
+
+
+def cursor(conn, as_dict=False):
+    """
+    Cursor on a pooled connection that takes %s placeholders on every backend.
+    Every statement on it is timed and tagged (instrument.py).
+    """
+    return InstrumentedCursor(get_backend().cursor(conn, as_dict))
+
+
+def fetch_one(sql, params=None, *, as_dict=True):
+    _note_query()
+    with connection() as conn:
+        with cursor(conn, as_dict) as cur:
+            cur.execute(sql, params or ())
+            return cur.fetchone()
+
+
+def fetch_all(sql, params=None, *, as_dict=True):
+    _note_query()
+    with connection() as conn:
+        with cursor(conn, as_dict) as cur:
+            cur.execute(sql, params or ())
+            return list(cur.fetchall())
+
+
+def stream(sql, params=None, *, as_dict=False, batch=STREAM_BATCH):
+    """
+    Yield the rows of one SELECT, `batch` at a time from the driver, without
+    ever holding the whole result: MySQL reads them off an unbuffered
+    server-side cursor (SSCursor), SQLite steps its statement. The connection
+    stays checked out until the generator is used up or closed. One closed
+    early is thrown away rather than drained of the rows nobody wants.
+    """
+    _note_query()
+    backend = get_backend()
+    try:
+        conn = backend.pool.acquire()
+    except PoolTimeout as e:
+        raise DatabaseError(str(e)) from e
+    cur, done = None, False
+    try:
+        cur = InstrumentedCursor(backend.stream_cursor(conn, as_dict))
+        cur.execute(sql, params or ())
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            yield from rows
+        cur.close()
+        done = True
+    except backend.driver_errors as e:
+        raise DatabaseError(str(e)) from e
+    finally:
+        if cur is not None and not done:
+            cur.abandon()
+        backend.pool.release(conn, discard=not done)
+
+
+def execute(sql, params=None) -> WriteResult:
+    with transaction() as conn:
+        with cursor(conn) as cur:
+            rowcount = cur.execute(sql, params or ())
+            return WriteResult(rowcount, cur.lastrowid)
+
+
+def execute_many(sql, seq_of_params) -> WriteResult:
+    """Run one statement for every parameter tuple in a single transaction; rowcount is the total."""
+    with transaction() as conn:
+        with cursor(conn) as cur:
+            rowcount = cur.executemany(sql, list(seq_of_params))
+            return WriteResult(rowcount, cur.lastrowid)
@@ -0,0 +1,76 @@
+# imhotep/db/dashboard.py
+"""
+Patient dashboard data, loaded with a single query (queries.PATIENT_DASHBOARD);
+only a patient without prescriptions costs a second one, for the name.
+
+    dash = load_patient_dashboard(patient_id)     # from a worker thread
+    dash.name, dash.current, dash.history, dash.round_trips
+
+round_trips is measured with connection.count_queries(), so a change that
+sneaks a second query into the dashboard shows up in the log right away.
+"""
+from dataclasses import dataclass, field
+from datetime import date
+from typing import List, Optional, Union
+
+from . import queries
+from .connection import count_queries, fetch_all
+from .names import get_name_cache
+
+
+@dataclass(frozen=True)
+class Prescription:
+    pr_id: int
+    patient_id: int
+    doctor_sugg: Optional[str]
+    prescription: Optional[str]
+    visit_date: Optional[Union[date, str]]
+    dispense: bool                              # True while still to be dispensed
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(
+            pr_id=row["Pr_ID"],
+            patient_id=row["Patient_ID"],
+            doctor_sugg=row["Doctor_Sugg"],
+            prescription=row["Prescription"],
+            visit_date=row["Visit_Date"],
+            dispense=bool(row["Dispense"]),
+        )
+
+
+@dataclass(frozen=True)
+class PatientDashboard:
+    patient_id: int
+    found: bool                                 # False: neither a user row nor prescriptions
+    name: Optional[str] = None
+    prescriptions: List[Prescription] = field(default_factory=list)  # newest first
+    round_trips: int = 0
+
+    @property
+    def current(self) -> Optional[Prescription]:
+        return self.prescriptions[0] if self.prescriptions else None
+
+    @property
+    def history(self) -> List[Prescription]:
+        return self.prescriptions[1:]
+
+
+def load_patient_dashboard(patient_id: int) -> PatientDashboard:
+    """Name, latest prescription and history page for one patient. Raises DatabaseError."""
+    with count_queries() as counter:
+        rows = fetch_all(queries.PATIENT_DASHBOARD, (patient_id,))
+        if rows:
+            name = rows[0]["User_Name"]             # None: prescriptions without a user row
+            if name is not None:
+                get_name_cache().put(patient_id, name)      # came for free with the JOIN
+        else:
+            name = get_name_cache().get(patient_id)
+
+    return PatientDashboard(
+        patient_id,
+        found=bool(rows) or name is not None,
+        name=name,
+        prescriptions=[Prescription.from_row(r) for r in rows],
+        round_trips=counter.count,
+    )
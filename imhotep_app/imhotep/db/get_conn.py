@@ -1,10 +0,0 @@
-# imhotep/db/connection.py
-import mysql.connector
-
-def get_conn():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="",
-        database="imhotep",
-    )
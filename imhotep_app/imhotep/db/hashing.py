@@ -0,0 +1,204 @@
+# imhotep/db/hashing.py
+"""
+bcrypt hashing / verification on a small process pool.
+
+Importing this module stays cheap: bcrypt and the process pool machinery are
+only imported once something is hashed (or warm_up() is called).
+
+bcrypt at cost 12 takes ~250 ms per call, so it never runs on the GUI thread.
+The service hands out concurrent.futures.Future objects:
+
+    hashing = get_hash_service()
+    ok = hashing.verify(password, stored_hash).result()      # from a worker thread
+    pw, m = hashing.hash(password), hashing.hash(match)      # run in parallel
+
+New hashes use the site's target cost: BCRYPT_COST from .env if set, otherwise
+the highest cost whose hash time on this machine fits BCRYPT_TARGET_MS
+(see calibrate_cost). needs_rehash() tells AuthHandler when a stored hash
+should be brought to that cost. A calibrated cost differs from host to host,
+so it only ever raises a hash's cost; otherwise logging in on a fast terminal
+and then a slow one would rewrite the hash every time. Lowering the cost of
+existing hashes takes a site-wide BCRYPT_COST.
+"""
+import atexit
+import os
+import re
+import threading
+import time
+from concurrent.futures import BrokenExecutor, Future
+
+from .config import env_int, load_env
+
+MIN_COST = 10
+MAX_COST = 16
+DEFAULT_COST = 12
+DEFAULT_TARGET_MS = 250
+
+_COST_RE = re.compile(r"^\$2[abxy]?\$(\d{2})\$")
+
+
+# ---------------- cost helpers ----------------
+def hash_cost(hashed: str):
+    """Work factor encoded in a bcrypt hash ("$2b$12$..." -> 12), or None if unparseable."""
+    m = _COST_RE.match(hashed or "")
+    return int(m.group(1)) if m else None
+
+
+def needs_rehash(hashed: str, cost: int, downgrade: bool = False) -> bool:
+    """True if `hashed` is below `cost` (or unparseable); above it only counts with `downgrade`."""
+    current = hash_cost(hashed)
+    if current is None:
+        return True
+    return current < cost or (downgrade and current > cost)
+
+
+def time_hash(cost: int, samples: int = 1) -> float:
+    """Best-of-N seconds for one hashpw at `cost` on this machine."""
+    import bcrypt
+
+    salt = bcrypt.gensalt(cost)
+    best = float("inf")
+    for _ in range(samples):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration-password", salt)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def calibrate_cost(target_ms: float = DEFAULT_TARGET_MS, min_cost: int = MIN_COST,
+                   max_cost: int = MAX_COST) -> int:
+    """
+    Highest cost whose hash time stays within `target_ms` on this host.
+    Each +1 doubles the work, so we stop timing as soon as a level is over budget.
+    """
+    chosen = min_cost
+    for cost in range(min_cost, max_cost + 1):
+        if time_hash(cost, samples=2) * 1000 > target_ms:
+            break
+        chosen = cost
+    return chosen
+
+
+_target_cost = None
+_target_lock = threading.Lock()
+
+
+def target_cost() -> int:
+    """Cost for new hashes: BCRYPT_COST if configured, else calibrated once per process."""
+    global _target_cost
+    if _target_cost is None:
+        with _target_lock:
+            if _target_cost is None:
+                load_env()
+                pinned = env_int("BCRYPT_COST", 0)
+                if pinned:
+                    _target_cost = max(4, min(31, pinned))
+                else:
+                    _target_cost = calibrate_cost(env_int("BCRYPT_TARGET_MS", DEFAULT_TARGET_MS))
+    return _target_cost
+
+
+def cost_pinned() -> bool:
+    """BCRYPT_COST is set: one cost for the whole site, which may also lower existing hashes."""
+    load_env()
+    return env_int("BCRYPT_COST", 0) > 0
+
+
+# ---------------- picklable worker functions ----------------
+def hash_secret(secret: str, cost: int = DEFAULT_COST, salt: str = None) -> str:
+    """bcrypt hash of `secret`; pass a "$2b$NN$..." salt for a reproducible hash (test data only)."""
+    import bcrypt
+
+    salt = salt.encode("ascii") if salt else bcrypt.gensalt(cost)
+    return bcrypt.hashpw(secret.encode("utf-8"), salt).decode("utf-8")
+
+
+def check_secret(secret: str, hashed: str) -> bool:
+    import bcrypt
+
+    return bcrypt.checkpw(secret.encode("utf-8"), hashed.encode("utf-8"))
+
+
+def _noop():
+    return None
+
+
+class HashService:
+    """Process pool for bcrypt work; falls back to the calling thread if the pool dies."""
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    # ---------------- futures API ----------------
+    def hash(self, secret: str) -> Future:
+        return self._submit(hash_secret, secret, target_cost())
+
+    def verify(self, secret: str, hashed: str) -> Future:
+        return self._submit(check_secret, secret, hashed)
+
+    def hash_many(self, secrets, chunksize=8):
+        """Hash a list of secrets across all workers; returns hashes in input order."""
+        cost = target_cost()
+        try:
+            return list(self._executor().map(hash_secret, secrets, [cost] * len(secrets),
+                                             chunksize=chunksize))
+        except BrokenExecutor:
+            self._reset()
+            return [hash_secret(s, cost) for s in secrets]
+
+    def warm_up(self):
+        """
+        Start the worker processes now so the first login doesn't pay for it,
+        and settle the target cost in the background.
+        """
+        for _ in range(self.max_workers):
+            self._submit(_noop)
+        threading.Thread(target=target_cost, name="bcrypt-calibrate", daemon=True).start()
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    # ---------------- internals ----------------
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def _reset(self):
+        with self._lock:
+            self._pool = None
+
+    def _submit(self, fn, *args):
+        try:
+            return self._executor().submit(fn, *args)
+        except (BrokenExecutor, RuntimeError):
+            # pool died or interpreter is shutting down: compute inline
+            self._reset()
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_hash_service() -> HashService:
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = HashService()
+                atexit.register(_service.shutdown)
+    return _service
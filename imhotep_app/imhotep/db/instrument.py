@@ -0,0 +1,343 @@
+# imhotep/db/instrument.py
+"""
+Timing for every statement that goes through connection.cursor().
+
+connection.cursor() wraps the driver cursor in an InstrumentedCursor, so the
+helpers (fetch_one, execute, ...) and hand-written transactions are covered
+alike. Per statement it records the time spent in the driver (execute plus
+fetches), rows returned and roughly how many bytes came back, tagged with
+the portal action that asked for it:
+
+    with query_tag("pharma._on_load"):      # QueryExecutor does this for every task,
+        rows = fetch_all(...)               # using the method that called submit()
+
+Without a tag the nearest caller outside the db plumbing is used
+("auth._rehash_password").
+
+- stats() keeps in-process latency histograms per action and per statement;
+  stats().report() prints them, log_summary() logs them (app shutdown does).
+- statements slower than SLOW_QUERY_MS (default 250; 0 = all) go to the
+  slow-query log: one JSON object per line in SLOW_QUERY_LOG (default
+  slow_queries.jsonl in imhotep_app/; empty = only the "imhotep.db.slow" logger).
+  Parameters are never logged; they are patient data.
+
+    python -m imhotep.db.instrument                     # summarize slow_queries.jsonl
+    python -m imhotep.db.instrument other.jsonl --top 30
+"""
+import bisect
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+from ..applog import queued
+from .config import APP_DIR, env_int, load_env
+
+DEFAULT_SLOW_MS = 250
+DEFAULT_SLOW_LOG = APP_DIR / "slow_queries.jsonl"
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+SQL_CHARS = 300                 # statement text kept in the log / as a histogram key
+BYTES_SAMPLE = 64               # rows per fetch that are sized; the rest are estimated from them
+
+slow_logger = logging.getLogger("imhotep.db.slow")
+stats_logger = logging.getLogger("imhotep.db.stats")
+
+# frames from these modules are plumbing, not the caller worth naming
+_PLUMBING = ("imhotep.db.connection", "imhotep.db.instrument", "imhotep.db.backends", "contextlib")
+
+
+# ---------------- tags ----------------
+_local = threading.local()
+
+
+@contextmanager
+def query_tag(tag):
+    """Attribute the statements run inside the block (on this thread) to `tag`."""
+    previous = getattr(_local, "tag", None)
+    _local.tag = tag
+    try:
+        yield
+    finally:
+        _local.tag = previous
+
+
+def current_tag():
+    """The tag set by query_tag() on this thread, or None."""
+    return getattr(_local, "tag", None)
+
+
+def frame_tag(frame):
+    """'module.function' for a frame, module without the package: 'pharma._on_load'."""
+    module = frame.f_globals.get("__name__", "?").rsplit(".", 1)[-1]
+    return f"{module}.{frame.f_code.co_name}"
+
+
+def _caller():
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_globals.get("__name__", "").startswith(_PLUMBING):
+        frame = frame.f_back
+    return frame_tag(frame) if frame is not None else "?"
+
+
+# ---------------- histograms ----------------
+_PLACEHOLDER_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)+\s*\)")
+
+
+def normalize_sql(sql):
+    """One line, IN (%s, %s, ...) lists collapsed, so a statement is one key however many ids it had."""
+    sql = _PLACEHOLDER_LIST.sub("(%s, ...)", re.sub(r"\s+", " ", sql).strip())
+    return sql[:SQL_CHARS]
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.bytes = 0
+
+    def add(self, ms, rows, nbytes):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.rows += rows
+        self.bytes += nbytes
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (ms)."""
+        rank = p / 100 * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS_MS, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def as_dict(self):
+        return {
+            "count": self.count, "total_ms": round(self.total_ms, 1), "max_ms": round(self.max_ms, 1),
+            "p50_ms": round(self.percentile(50), 1), "p95_ms": round(self.percentile(95), 1),
+            "rows": self.rows, "bytes": self.bytes,
+            "buckets": {str(bound): n for bound, n in zip(BUCKETS_MS, self.counts) if n},
+        }
+
+
+class QueryStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.by_action = defaultdict(Histogram)
+            self.by_statement = defaultdict(Histogram)
+
+    def record(self, action, sql, ms, rows, nbytes):
+        with self._lock:
+            self.by_action[action].add(ms, rows, nbytes)
+            self.by_statement[sql].add(ms, rows, nbytes)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "by_action": {k: h.as_dict() for k, h in self.by_action.items()},
+                "by_statement": {k: h.as_dict() for k, h in self.by_statement.items()},
+            }
+
+    def report(self, top=15):
+        """Text table of the actions and statements with the most total time."""
+        snap = self.snapshot()
+        lines = []
+        for title, table in (("action", snap["by_action"]), ("statement", snap["by_statement"])):
+            lines.append(f"{'count':>7} {'total ms':>10} {'p50':>6} {'p95':>6} {'max ms':>8} {'rows':>8}  {title}")
+            for key, h in sorted(table.items(), key=lambda kv: -kv[1]["total_ms"])[:top]:
+                lines.append(f"{h['count']:>7} {h['total_ms']:>10} {h['p50_ms']:>6} {h['p95_ms']:>6} "
+                             f"{h['max_ms']:>8} {h['rows']:>8}  {key[:100]}")
+            lines.append("")
+        return "\n".join(lines)
+
+
+_stats = QueryStats()
+
+
+def stats():
+    return _stats
+
+
+def log_summary(top=15):
+    if _stats.by_action:
+        stats_logger.info("query stats\n%s", _stats.report(top))
+
+
+# ---------------- slow-query log ----------------
+_slow_ms = None
+_slow_lock = threading.Lock()
+
+
+def slow_threshold_ms():
+    """SLOW_QUERY_MS, read once; also attaches the SLOW_QUERY_LOG file handler."""
+    global _slow_ms
+    if _slow_ms is None:
+        with _slow_lock:
+            if _slow_ms is None:
+                load_env()
+                path = os.getenv("SLOW_QUERY_LOG", str(DEFAULT_SLOW_LOG)).strip()
+                if path:
+                    # relative to imhotep_app/, like DB_SQLITE_PATH; written by a listener
+                    # thread so the query thread doesn't wait for the disk
+                    handler = logging.FileHandler(APP_DIR / Path(path).expanduser(), encoding="utf-8", delay=True)
+                    handler.setFormatter(logging.Formatter("%(message)s"))
+                    slow_logger.addHandler(queued(handler))
+                    slow_logger.propagate = False       # its own file, not app.log as well
+                slow_logger.setLevel(logging.INFO)
+                _slow_ms = env_int("SLOW_QUERY_MS", DEFAULT_SLOW_MS)
+    return _slow_ms
+
+
+def _log_slow(entry):
+    slow_logger.warning(json.dumps(entry, default=str))
+
+
+# ---------------- the cursor ----------------
+def _row_bytes(row):
+    if row is None:
+        return 0
+    values = row.values() if isinstance(row, dict) else row
+    return sum(len(v) if isinstance(v, (str, bytes, bytearray)) else 8 for v in values if v is not None)
+
+
+def _rows_bytes(rows):
+    """Bytes in `rows`: summed for a short fetch, extrapolated from an even sample for a long one."""
+    if len(rows) <= BYTES_SAMPLE:
+        return sum(_row_bytes(row) for row in rows)
+    step = len(rows) / BYTES_SAMPLE
+    sample = sum(_row_bytes(rows[int(i * step)]) for i in range(BYTES_SAMPLE))
+    return round(sample * len(rows) / BYTES_SAMPLE)
+
+
+class InstrumentedCursor:
+    """
+    Wraps a driver cursor. A statement is measured from execute() until the
+    next execute(), close() or the end of the `with` block; only time inside
+    the driver counts, not what the caller does between fetches.
+    """
+
+    def __init__(self, cur):
+        self._cur = cur
+        self._open = None           # [sql, seconds, rows, bytes, action, caller, error]
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)         # rowcount, lastrowid, description, ...
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._finish()
+        self._cur.close()
+
+    def abandon(self):
+        """
+        Record the statement but leave the driver cursor alone: closing an
+        unbuffered cursor would read the rest of its result first. Only for
+        when the connection is thrown away anyway.
+        """
+        self._finish()
+
+    def execute(self, sql, params=None):
+        return self._run(self._cur.execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self._run(self._cur.executemany, sql, seq_of_params)
+
+    def _run(self, method, sql, params):
+        self._finish()
+        caller = _caller()
+        self._open = [sql, 0.0, 0, 0, getattr(_local, "tag", None) or caller, caller, None]
+        start = time.perf_counter()
+        try:
+            return method(sql, params)
+        except Exception as e:
+            self._open[6] = type(e).__name__
+            raise
+        finally:
+            self._open[1] += time.perf_counter() - start
+
+    def fetchone(self):
+        return self._fetch(self._cur.fetchone, one=True)
+
+    def fetchmany(self, size=None):
+        return self._fetch(lambda: self._cur.fetchmany(size) if size else self._cur.fetchmany())
+
+    def fetchall(self):
+        return self._fetch(self._cur.fetchall)
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def _fetch(self, method, one=False):
+        start = time.perf_counter()
+        result = method()
+        elapsed = time.perf_counter() - start
+        if self._open is not None:
+            rows = ([result] if result is not None else []) if one else result
+            self._open[1] += elapsed
+            self._open[2] += len(rows)
+            self._open[3] += _rows_bytes(rows)
+        return result
+
+    def _finish(self):
+        entry, self._open = self._open, None
+        if entry is None:
+            return
+        sql, seconds, rows, nbytes, action, caller, error = entry
+        ms = seconds * 1000
+        statement = normalize_sql(sql)
+        _stats.record(action, statement, ms, rows, nbytes)
+        if ms >= slow_threshold_ms() or error:
+            _log_slow({
+                "ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "action": action, "caller": caller,
+                "ms": round(ms, 2), "rows": rows, "bytes": nbytes, "sql": statement,
+                "thread": threading.current_thread().name, **({"error": error} if error else {}),
+            })
+
+
+# ---------------- offline summary ----------------
+def summarize_log(path):
+    """QueryStats rebuilt from a slow-query log file."""
+    summary = QueryStats()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            summary.record(entry.get("action", "?"), entry.get("sql", ""), entry.get("ms", 0),
+                           entry.get("rows", 0), entry.get("bytes", 0))
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize a slow-query log by action and statement.")
+    parser.add_argument("path", nargs="?", default=str(DEFAULT_SLOW_LOG))
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    print(summarize_log(args.path).report(args.top))
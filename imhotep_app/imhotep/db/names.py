@@ -0,0 +1,137 @@
+# imhotep/db/names.py
+"""
+Process-wide User_ID -> User_Name cache.
+
+Names practically never change, yet every portal render used to look them up
+again. The cache is a small LRU with a TTL (NAME_CACHE_SIZE, NAME_CACHE_TTL in
+.env) so a rename done directly in the database still shows up eventually:
+
+    names = get_name_cache()
+    names.get(uid)                        # one PK lookup on a miss
+    names.get_many([uid, uid2, ...])      # one WHERE User_ID IN (...) for all misses
+    names.invalidate(uid)                 # after writing to that user row
+
+Unknown IDs are not cached, so a user registered a moment later is found on
+the next lookup. Thread-safe; lookups run on worker threads.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from . import queries
+from .config import env_float, env_int, load_env
+from .connection import fetch_all, fetch_one
+
+DEFAULT_SIZE = 1024
+DEFAULT_TTL = 600.0         # seconds
+
+# keep IN (...) lists to a sane length
+BATCH_SIZE = 500
+
+
+class UserNameCache:
+    def __init__(self, max_size=DEFAULT_SIZE, ttl=DEFAULT_TTL, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()       # user_id -> (name, expires_at), oldest first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ---------------- lookups ----------------
+    def get(self, user_id):
+        """User_Name for user_id, or None if there is no such user."""
+        if user_id is None:
+            return None
+        user_id = int(user_id)
+        found, name = self._lookup(user_id)
+        if found:
+            return name
+        row = fetch_one(queries.USER_NAME, (user_id,), as_dict=False)
+        if row is None:
+            return None
+        self.put(user_id, row[0])
+        return row[0]
+
+    def get_many(self, user_ids):
+        """{user_id: User_Name} for every ID that exists; misses cost one query per BATCH_SIZE IDs."""
+        result, missing = {}, []
+        for user_id in {int(u) for u in user_ids if u is not None}:
+            found, name = self._lookup(user_id)
+            if found:
+                result[user_id] = name
+            else:
+                missing.append(user_id)
+
+        for start in range(0, len(missing), BATCH_SIZE):
+            batch = missing[start:start + BATCH_SIZE]
+            placeholders = ", ".join(["%s"] * len(batch))
+            rows = fetch_all(queries.USER_NAMES_IN.format(placeholders=placeholders), batch, as_dict=False)
+            for user_id, name in rows:
+                self.put(user_id, name)
+                result[user_id] = name
+        return result
+
+    # ---------------- maintenance ----------------
+    def put(self, user_id, name):
+        """Record a name we already have (e.g. from a JOIN or right after an INSERT)."""
+        with self._lock:
+            self._entries[int(user_id)] = (name, self._clock() + self.ttl)
+            self._entries.move_to_end(int(user_id))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id=None):
+        """Forget one user, or everyone if user_id is None."""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(int(user_id), None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    # ---------------- internals ----------------
+    def _lookup(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                name, expires_at = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(user_id)
+                    self.hits += 1
+                    return True, name
+                del self._entries[user_id]
+            self.misses += 1
+            return False, None
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_name_cache() -> UserNameCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                load_env()
+                _cache = UserNameCache(
+                    max_size=env_int("NAME_CACHE_SIZE", DEFAULT_SIZE),
+                    ttl=env_float("NAME_CACHE_TTL", DEFAULT_TTL),
+                )
+    return _cache
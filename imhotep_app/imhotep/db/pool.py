@@ -0,0 +1,198 @@
+# imhotep/db/pool.py
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out within the timeout."""
+
+
+class _PooledConn:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """
+    Small thread-safe connection pool.
+
+    - keeps between `min_size` and `max_size` connections open
+    - idle connections above `min_size` are closed after `idle_timeout` seconds
+    - a connection is pinged on checkout only if it sat idle longer than `ping_after`
+    - `acquire()` waits up to `checkout_timeout` seconds when all connections are busy
+
+    `connect()` opens a new driver connection, `ping(conn)` must raise if the
+    connection is dead, and `reset(conn)` is called on every return to the pool
+    (e.g. to roll back a transaction the caller left open).
+    """
+
+    def __init__(self, connect, *, min_size=1, max_size=5, idle_timeout=300.0,
+                 ping_after=30.0, checkout_timeout=5.0, ping=None, reset=None):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"invalid pool size: min={min_size} max={max_size}")
+        self._connect = connect
+        self._ping = ping
+        self._reset = reset
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+        self.checkout_timeout = checkout_timeout
+
+        self._idle = deque()          # most recently used on the right
+        self._in_use = {}             # id(conn) -> _PooledConn
+        self._opening = 0             # connections being opened outside the lock
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+        self._stats = dict(created=0, reused=0, pinged=0, ping_failures=0,
+                           evicted=0, discarded=0, waits=0, timeouts=0)
+
+    # ---------------- checkout / return ----------------
+    def acquire(self, timeout=None):
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeout("connection pool is closed")
+                self._evict_idle_locked()
+                item = None
+                if self._idle:
+                    item = self._idle.pop()
+                elif self._size_locked() < self.max_size:
+                    self._opening += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"no free database connection after {timeout:.1f}s "
+                            f"({self.max_size} in use)"
+                        )
+                    self._stats["waits"] += 1
+                    self._cond.wait(remaining)
+                    continue
+
+            # network work happens outside the lock
+            if item is None:
+                return self._open_new()
+            if self._check_alive(item):
+                with self._cond:
+                    self._in_use[id(item.conn)] = item
+                    self._stats["reused"] += 1
+                return item.conn
+            # dead connection: drop it and go round again (may open a fresh one)
+
+    def release(self, conn, discard=False):
+        with self._cond:
+            item = self._in_use.pop(id(conn), None)
+        if item is None:
+            return
+        if not discard and self._reset is not None:
+            try:
+                self._reset(conn)
+            except Exception:
+                discard = True
+        with self._cond:
+            if discard or self._closed:
+                self._stats["discarded"] += 1
+                self._close_quietly(conn)
+            else:
+                item.last_used = time.monotonic()
+                self._idle.append(item)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.acquire(timeout)
+        broken = False
+        try:
+            yield conn
+        except BaseException as e:
+            broken = self._looks_broken(e)
+            raise
+        finally:
+            self.release(conn, discard=broken)
+
+    # ---------------- housekeeping ----------------
+    def stats(self):
+        with self._cond:
+            return dict(
+                self._stats,
+                size=self._size_locked(),
+                idle=len(self._idle),
+                in_use=len(self._in_use),
+                min_size=self.min_size,
+                max_size=self.max_size,
+            )
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._cond.notify_all()
+        for item in idle:
+            self._close_quietly(item.conn)
+
+    # ---------------- internals ----------------
+    def _size_locked(self):
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def _open_new(self):
+        try:
+            conn = self._connect()
+        except BaseException:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+        item = _PooledConn(conn)
+        with self._cond:
+            self._opening -= 1
+            self._in_use[id(conn)] = item
+            self._stats["created"] += 1
+        return conn
+
+    def _check_alive(self, item):
+        if self._ping is None or time.monotonic() - item.last_used < self.ping_after:
+            return True
+        try:
+            self._ping(item.conn)
+            with self._cond:
+                self._stats["pinged"] += 1
+            return True
+        except Exception:
+            with self._cond:
+                self._stats["ping_failures"] += 1
+            self._close_quietly(item.conn)
+            return False
+
+    def _evict_idle_locked(self):
+        # oldest idle connections sit on the left
+        now = time.monotonic()
+        while (self._idle and self._size_locked() > self.min_size
+               and now - self._idle[0].last_used > self.idle_timeout):
+            item = self._idle.popleft()
+            self._stats["evicted"] += 1
+            self._close_quietly(item.conn)
+
+    @staticmethod
+    def _looks_broken(exc):
+        # connection-level failures (lost server, timeouts) mean the handle can't be reused
+        return isinstance(exc, (ConnectionError, TimeoutError)) or getattr(exc, "args", (None,))[:1] in (
+            (2006,), (2013,), (2055,)
+        )
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
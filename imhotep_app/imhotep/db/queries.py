@@ -0,0 +1,413 @@
+# imhotep/db/queries.py
+"""
+Every SQL statement the views and AuthHandler issue, in one place.
+
+Each read/update statement also has an entry in PLAN_CHECKS, which
+`python -m imhotep.tools.plan_check` runs through EXPLAIN to make sure it
+still uses an index (see schema.INDEXES). When you add or edit a query here,
+add/adjust its plan check too.
+"""
+from typing import NamedTuple, Tuple
+
+
+# ---------------- user ----------------
+USER_NAME = "SELECT User_Name FROM `user` WHERE User_ID = %s"
+
+# names.UserNameCache.get_many; {placeholders} is filled with one %s per ID
+USER_NAMES_IN = "SELECT User_ID, User_Name FROM `user` WHERE User_ID IN ({placeholders})"
+
+# name_index.NameIndex.load: every user, one keyset page at a time
+USER_NAMES_PAGE = "SELECT User_ID, User_Name FROM `user` WHERE User_ID > %s ORDER BY User_ID LIMIT %s"
+
+USER_PASSWORD = "SELECT Password FROM `user` WHERE User_ID = %s"
+
+# We use backticks (`) because 'user' and 'match' are SQL keywords
+USER_MATCH = "SELECT `match` FROM `user` WHERE `User_ID` = %s"
+
+USER_EXISTS = "SELECT 1 FROM `user` WHERE `User_ID` = %s"
+
+USER_INSERT = (
+    "INSERT INTO `user` (`User_ID`, `User_Name`, `Password`, `match`) VALUES (%s, %s, %s, %s)"
+)
+
+USER_SET_PASSWORD = "UPDATE `user` SET `Password` = %s WHERE `User_ID` = %s"
+
+USER_SET_PASSWORD_AND_MATCH = "UPDATE `user` SET `Password` = %s, `match` = %s WHERE `User_ID` = %s"
+
+# rehash on login: only replace the hash we just verified
+USER_REHASH_PASSWORD = "UPDATE `user` SET `Password` = %s WHERE `User_ID` = %s AND `Password` = %s"
+
+
+# ---------------- doctor ----------------
+# History panel: newest first, one page at a time (keyset on Pr_ID), and only a
+# preview of the TEXT columns. The full texts are read with DOCTOR_RECORD when a
+# record is opened for editing.
+HISTORY_PREVIEW_CHARS = 120
+
+DOCTOR_HISTORY_COLUMNS = f"""
+        Pr_ID,
+        Patient_ID,
+        Visit_Date,
+        Dispense,
+        SUBSTR(Doctor_Sugg, 1, {HISTORY_PREVIEW_CHARS}) AS Sugg_Preview,
+        SUBSTR(Prescription, 1, {HISTORY_PREVIEW_CHARS}) AS Prescription_Preview
+"""
+
+DOCTOR_HISTORY_FIRST = f"""
+    SELECT {DOCTOR_HISTORY_COLUMNS}
+    FROM prescription
+    WHERE Patient_ID = %s
+    ORDER BY Pr_ID DESC
+    LIMIT %s
+"""
+
+DOCTOR_HISTORY_AFTER = f"""
+    SELECT {DOCTOR_HISTORY_COLUMNS}
+    FROM prescription
+    WHERE Patient_ID = %s AND Pr_ID < %s
+    ORDER BY Pr_ID DESC
+    LIMIT %s
+"""
+
+DOCTOR_RECORD = """
+    SELECT Pr_ID, Patient_ID, Doctor_Sugg, Prescription
+    FROM prescription
+    WHERE Pr_ID = %s
+"""
+
+PRESCRIPTION_UPDATE = """
+    UPDATE prescription
+    SET Doctor_Sugg = %s, Prescription = %s
+    WHERE Pr_ID = %s
+"""
+
+PRESCRIPTION_INSERT = """
+    INSERT INTO prescription (Patient_ID, Doctor_Sugg, Prescription)
+    VALUES (%s, %s, %s)
+"""
+
+
+# Full-text search (search.py) over Doctor_Sugg / Prescription, best match
+# first, same preview columns as the history. MySQL uses the FULLTEXT index
+# ft_prescription_text in boolean mode; ordering by the MATCH() score alone lets
+# InnoDB stop after LIMIT ranked hits instead of sorting them all.
+DOCTOR_SEARCH_MYSQL = f"""
+    SELECT {DOCTOR_HISTORY_COLUMNS},
+        MATCH(Doctor_Sugg, Prescription) AGAINST (%s IN BOOLEAN MODE) AS Score
+    FROM prescription
+    WHERE MATCH(Doctor_Sugg, Prescription) AGAINST (%s IN BOOLEAN MODE)
+    ORDER BY Score DESC
+    LIMIT %s
+"""
+
+# SQLite: the FTS5 table prescription_fts (schema.SQLITE_FTS). bm25 needs
+# each term's document count, which FTS5 gets by reading the term's whole
+# doclist, so search.py first reads the hits of each word up to a cap
+# (DOCTOR_SEARCH_HITS, one word per call). If every term has a word under it,
+# every hit is ranked: ORDER BY rank (bm25, lower is better) LIMIT n lets FTS5
+# keep only the best n while it scores, and only those are joined to
+# prescription.
+DOCTOR_SEARCH_HITS = "SELECT rowid FROM prescription_fts WHERE prescription_fts MATCH %s LIMIT %s"
+
+DOCTOR_SEARCH_SQLITE = """
+    SELECT
+        p.Pr_ID,
+        p.Patient_ID,
+        p.Visit_Date,
+        p.Dispense,
+        SUBSTR(p.Doctor_Sugg, 1, {chars}) AS Sugg_Preview,
+        SUBSTR(p.Prescription, 1, {chars}) AS Prescription_Preview,
+        -f.Score AS Score
+    FROM (
+        SELECT rowid AS Pr_ID, rank AS Score
+        FROM prescription_fts
+        WHERE prescription_fts MATCH %s
+        ORDER BY rank
+        LIMIT %s
+    ) f
+    JOIN prescription p ON p.Pr_ID = f.Pr_ID
+    ORDER BY f.Score
+""".format(chars=HISTORY_PREVIEW_CHARS)
+
+# A term past the cap (a common word: "amoxicillin" is in every tenth row)
+# can't be scored cheaply, so the newest hits come back unranked instead.
+# search.py reads them a rowid window at a time, newest window first, and
+# joins only the ones it keeps. Each window is read in ascending rowid order:
+# descending, FTS5 reads a phrase's doclists to the end whatever the bounds.
+DOCTOR_SEARCH_NEWEST = "SELECT MAX(Pr_ID) FROM prescription"
+
+DOCTOR_SEARCH_WINDOW = """
+    SELECT rowid FROM prescription_fts
+    WHERE prescription_fts MATCH %s AND rowid BETWEEN %s AND %s
+"""
+
+DOCTOR_SEARCH_ROWS = f"""
+    SELECT {DOCTOR_HISTORY_COLUMNS}, NULL AS Score
+    FROM prescription
+    WHERE Pr_ID IN ({{placeholders}})
+    ORDER BY Pr_ID DESC
+"""
+
+
+# ---------------- patient ----------------
+# Whole dashboard in one round trip: the prescriptions drive a LEFT JOIN on
+# `user` for the name, so they still show when the user row is missing (name
+# NULL). A patient without prescriptions gets no rows; dashboard.py then looks
+# the name up on its own. Row 0 is the latest prescription, the rest the
+# history. NULL Visit_Date sorts last in DESC order on both backends.
+PATIENT_DASHBOARD = """
+    SELECT
+        u.User_Name,
+        p.Pr_ID,
+        p.Patient_ID,
+        p.Doctor_Sugg,
+        p.Prescription,
+        p.Visit_Date,
+        p.Dispense
+    FROM prescription p
+    LEFT JOIN `user` u ON u.User_ID = p.Patient_ID
+    WHERE p.Patient_ID = %s
+    ORDER BY p.Visit_Date DESC, p.Pr_ID DESC
+    LIMIT 20
+"""
+
+
+# ---------------- pharmacist ----------------
+# patient names come from names.UserNameCache instead of a JOIN on `user`
+# "All patients" list, newest first, one page at a time (keyset pagination on
+# (Visit_Date, Pr_ID); see pharma._query_prescriptions_page). Dated rows come
+# first, then the undated ones (NULL Visit_Date sorts last, as before). Both
+# phases walk ix_prescription_visit_pr, so a page costs the same on any table size.
+PHARMA_COLUMNS = """
+        p.Pr_ID,
+        p.Doctor_Sugg,
+        p.Prescription,
+        p.Visit_Date,
+        p.Dispense,
+        p.Patient_ID
+"""
+
+PHARMA_PAGE_DATED_FIRST = f"""
+    SELECT {PHARMA_COLUMNS}
+    FROM prescription p
+    WHERE p.Visit_Date IS NOT NULL
+    ORDER BY p.Visit_Date DESC, p.Pr_ID DESC
+    LIMIT %s
+"""
+
+PHARMA_PAGE_DATED_AFTER = f"""
+    SELECT {PHARMA_COLUMNS}
+    FROM prescription p
+    WHERE p.Visit_Date < %s
+       OR (p.Visit_Date = %s AND p.Pr_ID < %s)
+    ORDER BY p.Visit_Date DESC, p.Pr_ID DESC
+    LIMIT %s
+"""
+
+PHARMA_PAGE_UNDATED_FIRST = f"""
+    SELECT {PHARMA_COLUMNS}
+    FROM prescription p
+    WHERE p.Visit_Date IS NULL
+    ORDER BY p.Pr_ID DESC
+    LIMIT %s
+"""
+
+PHARMA_PAGE_UNDATED_AFTER = f"""
+    SELECT {PHARMA_COLUMNS}
+    FROM prescription p
+    WHERE p.Visit_Date IS NULL AND p.Pr_ID < %s
+    ORDER BY p.Pr_ID DESC
+    LIMIT %s
+"""
+
+PHARMA_BY_PATIENT = f"""
+    SELECT {PHARMA_COLUMNS}
+    FROM prescription p
+    WHERE p.Patient_ID = %s
+    AND p.Dispense = 1       -- >>> ONLY ACTIVE
+    ORDER BY p.Visit_Date DESC
+"""
+
+# One prescription, by primary key, and only if it is still active: rowcount 0
+# means another pharmacist dispensed it first (work_queue.complete, for a claim).
+PHARMA_DISPENSE = "UPDATE prescription SET Dispense = 0 WHERE Pr_ID = %s AND Dispense = 1"
+
+# The same from the "all" / per-patient lists (work_queue.dispense), which show
+# claimed rows too: rowcount 0 also when another pharmacist (User_ID <> %s)
+# holds a live claim on it, so nobody dispenses what someone else is working on.
+PHARMA_DISPENSE_UNCLAIMED = """
+    UPDATE prescription SET Dispense = 0
+    WHERE Pr_ID = %s AND Dispense = 1
+    AND NOT EXISTS (
+        SELECT 1 FROM pharmacist_portal c
+        WHERE c.Pr_ID = prescription.Pr_ID AND c.User_ID <> %s AND c.Lease_Until > %s
+    )
+"""
+
+
+# ---------------- pharmacist work queue (work_queue.py) ----------------
+# A claim is a pharmacist_portal row (Pr_ID unique) whose Lease_Until is in the
+# future. Candidates are the oldest active prescriptions nobody holds; {lock}
+# is "FOR UPDATE SKIP LOCKED" where the server has it, so pharmacists claiming
+# at the same moment walk past each other's rows instead of queueing on them.
+QUEUE_CANDIDATES = """
+    SELECT p.Pr_ID, p.Patient_ID
+    FROM prescription p
+    WHERE p.Dispense = 1
+    AND NOT EXISTS (
+        SELECT 1 FROM pharmacist_portal c
+        WHERE c.Pr_ID = p.Pr_ID AND c.Lease_Until > %s
+    )
+    ORDER BY p.Pr_ID
+    LIMIT %s
+    {lock}
+"""
+
+# Take a candidate, or an expired / lease-less claim row on it; a live claim
+# by someone else is left alone (the row stays theirs, see QUEUE_HELD).
+QUEUE_CLAIM = """
+    INSERT INTO pharmacist_portal (Pr_ID, Patient_UID, User_ID, Pharma_ID, Lease_Until)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        User_ID = IF(Lease_Until IS NULL OR Lease_Until <= %s, VALUES(User_ID), User_ID),
+        Pharma_ID = IF(Lease_Until IS NULL OR Lease_Until <= %s, VALUES(Pharma_ID), Pharma_ID),
+        Lease_Until = IF(Lease_Until IS NULL OR Lease_Until <= %s, VALUES(Lease_Until), Lease_Until)
+"""
+
+# SQLite spelling of QUEUE_CLAIM (the "now" parameter only once)
+QUEUE_CLAIM_SQLITE = """
+    INSERT INTO pharmacist_portal (Pr_ID, Patient_UID, User_ID, Pharma_ID, Lease_Until)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (Pr_ID) DO UPDATE SET
+        User_ID = excluded.User_ID,
+        Pharma_ID = excluded.Pharma_ID,
+        Lease_Until = excluded.Lease_Until
+    WHERE Lease_Until IS NULL OR Lease_Until <= %s
+"""
+
+QUEUE_HELD = """
+    SELECT Pr_ID FROM pharmacist_portal
+    WHERE Pr_ID IN ({placeholders}) AND User_ID = %s AND Lease_Until = %s
+"""
+
+QUEUE_ROWS = f"""
+    SELECT {PHARMA_COLUMNS}
+    FROM prescription p
+    WHERE p.Pr_ID IN ({{placeholders}})
+    ORDER BY p.Pr_ID
+"""
+
+QUEUE_RENEW = """
+    UPDATE pharmacist_portal SET Lease_Until = %s
+    WHERE Pr_ID = %s AND User_ID = %s AND Lease_Until > %s
+"""
+
+QUEUE_RELEASE = "DELETE FROM pharmacist_portal WHERE Pr_ID = %s AND User_ID = %s"
+
+
+# ---------------- export (export.py) ----------------
+# Every prescription in Pr_ID order, with its patient's name and the doctor
+# who wrote it (doctor_portal). {where} is "" or "WHERE " + the EXPORT_FILTERS
+# that are set, joined with AND. The doctor is a lookup per row on
+# ix_doctor_portal_pr rather than a join, so a prescription listed twice in
+# doctor_portal is still exported once. The rows are streamed
+# (connection.stream), so the result is never sorted or buffered: on the
+# primary key it arrives in order, as it does on ix_prescription_patient_pr
+# when one patient is asked for.
+EXPORT_PRESCRIPTIONS = """
+    SELECT
+        p.Pr_ID,
+        p.Visit_Date,
+        p.Patient_ID,
+        u.User_Name,
+        (SELECT MIN(d.User_ID) FROM doctor_portal d WHERE d.Pr_ID = p.Pr_ID),
+        p.Dispense,
+        p.Doctor_Sugg,
+        p.Prescription
+    FROM prescription p
+    LEFT JOIN `user` u ON u.User_ID = p.Patient_ID
+    {where}
+    ORDER BY p.Pr_ID
+"""
+
+EXPORT_FILTERS = {
+    "date_from": "p.Visit_Date >= %s",
+    "date_to": "p.Visit_Date <= %s",
+    "doctor_id": "p.Pr_ID IN (SELECT d.Pr_ID FROM doctor_portal d WHERE d.User_ID = %s)",
+    "patient_id": "p.Patient_ID = %s",
+    "dispense": "p.Dispense = %s",
+}
+
+
+# ---------------- change feed (change_feed.py) ----------------
+# prescription_change is filled by triggers on `prescription` (schema.TRIGGERS).
+# A poll is one range scan on its primary key; the LEFT JOIN brings the
+# current state of each changed prescription along (NULLs once it's deleted).
+CHANGES_LATEST = "SELECT MAX(Seq) FROM prescription_change"
+
+CHANGES_AFTER = """
+    SELECT c.Seq, c.Op, c.Pr_ID, COALESCE(p.Patient_ID, c.Patient_ID),
+           p.Doctor_Sugg, p.Prescription, p.Visit_Date, p.Dispense
+    FROM prescription_change c
+    LEFT JOIN prescription p ON p.Pr_ID = c.Pr_ID
+    WHERE c.Seq > %s
+    ORDER BY c.Seq
+    LIMIT %s
+"""
+
+CHANGES_PRUNE = "DELETE FROM prescription_change WHERE Seq <= %s"
+
+
+# ---------------- EXPLAIN regression list ----------------
+class PlanCheck(NamedTuple):
+    name: str                   # "<view>.<method>" that issues the query
+    sql: str
+    params: Tuple = ()
+    allow_scan: bool = False    # known, documented exception
+    note: str = ""
+    backend: str = ""           # only run on this backend ("mysql" / "sqlite"); "" = both
+
+
+PLAN_CHECKS = [
+    PlanCheck("names.UserNameCache.get", USER_NAME, (1,)),
+    PlanCheck("names.UserNameCache.get_many", USER_NAMES_IN.format(placeholders="%s, %s"), (1, 2)),
+    PlanCheck("name_index.NameIndex.load", USER_NAMES_PAGE, (0, 10000)),
+    PlanCheck("auth.verify_user_credentials", USER_PASSWORD, (1,)),
+    PlanCheck("auth.reset_user_password", USER_MATCH, (1,)),
+    PlanCheck("auth._rehash_password", USER_REHASH_PASSWORD, ("x", 1, "y")),
+    PlanCheck("register._create_user", USER_EXISTS, (1,)),
+    PlanCheck("doctor._fetch_history_page", DOCTOR_HISTORY_FIRST, (1, 30)),
+    PlanCheck("doctor._fetch_history_page", DOCTOR_HISTORY_AFTER, (1, 100, 30)),
+    PlanCheck("doctor._fetch_record", DOCTOR_RECORD, (1,)),
+    PlanCheck("doctor._save_prescription", PRESCRIPTION_UPDATE, ("n", "p", 1)),
+    PlanCheck("search.search_prescriptions", DOCTOR_SEARCH_MYSQL, ("+aspirin*", "+aspirin*", 50), backend="mysql"),
+    PlanCheck("search.search_prescriptions", DOCTOR_SEARCH_HITS, ('"aspirin"*', 5001), backend="sqlite"),
+    PlanCheck("search.search_prescriptions", DOCTOR_SEARCH_SQLITE, ('"aspirin"*', 50), backend="sqlite",
+              allow_scan=True, note="FTS5 ranks the hits, keeping the best LIMIT"),
+    PlanCheck("search.search_prescriptions", DOCTOR_SEARCH_NEWEST, backend="sqlite"),
+    PlanCheck("search.search_prescriptions", DOCTOR_SEARCH_WINDOW, ('"aspirin"*', 1, 2000), backend="sqlite"),
+    PlanCheck("search.search_prescriptions", DOCTOR_SEARCH_ROWS.format(placeholders="%s, %s"), (1, 2),
+              backend="sqlite"),
+    PlanCheck("dashboard.load_patient_dashboard", PATIENT_DASHBOARD, (1,)),
+    PlanCheck("pharma._query_prescriptions_by_id", PHARMA_BY_PATIENT, (1,)),
+    PlanCheck("pharma._query_prescriptions_page", PHARMA_PAGE_DATED_FIRST, (50,)),
+    PlanCheck("pharma._query_prescriptions_page", PHARMA_PAGE_DATED_AFTER, ("2024-01-01", "2024-01-01", 1, 50)),
+    PlanCheck("pharma._query_prescriptions_page", PHARMA_PAGE_UNDATED_FIRST, (50,)),
+    PlanCheck("pharma._query_prescriptions_page", PHARMA_PAGE_UNDATED_AFTER, (1, 50)),
+    PlanCheck("work_queue.WorkQueue.complete", PHARMA_DISPENSE, (1,)),
+    PlanCheck("work_queue.WorkQueue.dispense", PHARMA_DISPENSE_UNCLAIMED, (1, 1, "2024-01-01 00:00:00")),
+    PlanCheck("work_queue.WorkQueue.claim", QUEUE_CANDIDATES.format(lock=""), ("2024-01-01 00:00:00", 20)),
+    PlanCheck("work_queue.WorkQueue.claim", QUEUE_HELD.format(placeholders="%s, %s"), (1, 2, 1, "2024-01-01")),
+    PlanCheck("work_queue.WorkQueue.claim", QUEUE_ROWS.format(placeholders="%s, %s"), (1, 2)),
+    PlanCheck("work_queue.WorkQueue.renew", QUEUE_RENEW, ("2024-01-01", 1, 1, "2024-01-01")),
+    PlanCheck("work_queue.WorkQueue.release", QUEUE_RELEASE, (1, 1)),
+    PlanCheck("export.write_export", EXPORT_PRESCRIPTIONS.format(where=""), allow_scan=True,
+              note="an export reads every row, in primary-key order"),
+    PlanCheck("export.write_export",
+              EXPORT_PRESCRIPTIONS.format(where="WHERE " + EXPORT_FILTERS["patient_id"]), (1,)),
+    PlanCheck("export.write_export",
+              EXPORT_PRESCRIPTIONS.format(where="WHERE " + EXPORT_FILTERS["doctor_id"]), (1,)),
+    PlanCheck("change_feed.latest_seq", CHANGES_LATEST),
+    PlanCheck("change_feed.ChangeCursor.poll", CHANGES_AFTER, (1, 500)),
+    PlanCheck("change_feed.prune", CHANGES_PRUNE, (1,)),
+]
@@ -0,0 +1,347 @@
+# imhotep/db/schema.py
+"""
+Secondary indexes the app's queries rely on (the "index pack"), plus the
+columns, tables and triggers added to the original schema since.
+
+Fresh installs get them from `Data Base/imhotep.sql`; for an existing
+database run:
+
+    python -m imhotep.db.schema            # creates whatever is missing, drops LEGACY_KEYS
+
+Keep this list and the dump in sync. Every query in queries.PLAN_CHECKS must be
+served by the primary keys or one of these.
+
+SQLite databases (DB_BACKEND=sqlite) are created/upgraded by init_sqlite() the
+first time the backend opens the file, indexes included.
+"""
+from typing import NamedTuple, Tuple
+
+from .connection import backend_name, connection, cursor
+
+
+class Index(NamedTuple):
+    table: str
+    name: str
+    columns: Tuple[str, ...]
+    used_by: str
+    unique: bool = False
+    fulltext: bool = False      # MySQL FULLTEXT; SQLite gets the FTS5 table SQLITE_FTS instead
+
+
+INDEXES = [
+    # pharmacist: WHERE Patient_ID = ? AND Dispense = 1 ORDER BY Visit_Date DESC
+    Index("prescription", "ix_prescription_patient_dispense_visit",
+          ("Patient_ID", "Dispense", "Visit_Date"), "pharma._query_prescriptions_by_id"),
+    # patient dashboard: WHERE Patient_ID = ? ORDER BY Visit_Date DESC, Pr_ID DESC
+    # (InnoDB appends the primary key, so Pr_ID ordering comes for free)
+    Index("prescription", "ix_prescription_patient_visit",
+          ("Patient_ID", "Visit_Date"), "dashboard.load_patient_dashboard"),
+    # doctor history pages: WHERE Patient_ID = ? AND Pr_ID < ? ORDER BY Pr_ID DESC
+    Index("prescription", "ix_prescription_patient_pr",
+          ("Patient_ID", "Pr_ID"), "doctor._fetch_history_page"),
+    # pharmacist "all patients" pages: ORDER BY Visit_Date DESC, Pr_ID DESC with a keyset
+    Index("prescription", "ix_prescription_visit_pr",
+          ("Visit_Date", "Pr_ID"), "pharma._query_prescriptions_page"),
+    # work queue candidates: WHERE Dispense = 1 ORDER BY Pr_ID
+    Index("prescription", "ix_prescription_dispense_pr",
+          ("Dispense", "Pr_ID"), "work_queue.WorkQueue.claim"),
+    # doctor search: MATCH(Doctor_Sugg, Prescription) AGAINST (... IN BOOLEAN MODE)
+    Index("prescription", "ft_prescription_text",
+          ("Doctor_Sugg", "Prescription"), "search.search_prescriptions", fulltext=True),
+    # export: the doctor of each prescription, and one doctor's prescriptions
+    Index("doctor_portal", "ix_doctor_portal_pr",
+          ("Pr_ID", "User_ID"), "export.write_export"),
+    Index("doctor_portal", "ix_doctor_portal_user_pr",
+          ("User_ID", "Pr_ID"), "export.write_export"),
+    # one claim row per prescription; the claim upsert relies on the duplicate key
+    Index("pharmacist_portal", "ux_pharmacist_portal_pr",
+          ("Pr_ID",), "work_queue.WorkQueue.claim", unique=True),
+]
+
+# columns added to the dump's tables since: (table, column, definition)
+COLUMNS = [
+    ("pharmacist_portal", "Lease_Until", "DATETIME DEFAULT NULL"),
+]
+
+# keys older databases have that the dump doesn't: (table, index name); MySQL only
+LEGACY_KEYS = [
+    # the old setup script made Pharma_ID the primary key, but it is the
+    # pharmacist's ID and the same on all their claims: every claim row after
+    # the first hit it in QUEUE_CLAIM's ON DUPLICATE KEY instead of
+    # ux_pharmacist_portal_pr, so claim(n) got one row and stole another's lease
+    ("pharmacist_portal", "PRIMARY"),
+]
+
+# tables added to the dump since (MySQL spelling; SQLite's are in SQLITE_TABLES)
+TABLES = [
+    # change feed (change_feed.py): one row per write to `prescription`
+    """CREATE TABLE IF NOT EXISTS `prescription_change` (
+        `Seq` BIGINT NOT NULL AUTO_INCREMENT,
+        `Pr_ID` INT NOT NULL,
+        `Patient_ID` INT DEFAULT NULL,
+        `Op` CHAR(1) NOT NULL,
+        PRIMARY KEY (`Seq`)
+    ) ENGINE=InnoDB""",
+]
+
+
+class Trigger(NamedTuple):
+    name: str
+    table: str
+    event: str                  # INSERT / UPDATE / DELETE (always AFTER, FOR EACH ROW)
+    statement: str              # one statement, valid in MySQL and SQLite alike
+
+
+def _log_change(row, op):
+    return ("INSERT INTO `prescription_change` (`Pr_ID`, `Patient_ID`, `Op`) "
+            f"VALUES ({row}.`Pr_ID`, {row}.`Patient_ID`, '{op}')")
+
+
+# every write to `prescription` (the app's or anyone else's) lands in the change feed;
+# a dispense is an 'U'
+TRIGGERS = [
+    Trigger("trg_prescription_change_ins", "prescription", "INSERT", _log_change("NEW", "I")),
+    Trigger("trg_prescription_change_upd", "prescription", "UPDATE", _log_change("NEW", "U")),
+    Trigger("trg_prescription_change_del", "prescription", "DELETE", _log_change("OLD", "D")),
+]
+
+
+def trigger_ddl(trigger, sqlite):
+    head = f"`{trigger.name}` AFTER {trigger.event} ON `{trigger.table}` FOR EACH ROW"
+    if sqlite:
+        return f"CREATE TRIGGER IF NOT EXISTS {head} BEGIN {trigger.statement}; END"
+    return f"CREATE TRIGGER {head} {trigger.statement}"
+
+
+# Same tables as the MySQL dump, in SQLite types. Table names are
+# case-insensitive in SQLite, so the legacy imhotep.db (User, Prescription, ...)
+# is picked up as-is.
+SQLITE_TABLES = [
+    """CREATE TABLE IF NOT EXISTS `user` (
+        `User_ID` INTEGER PRIMARY KEY,
+        `User_Name` VARCHAR(100) NOT NULL,
+        `Password` VARCHAR(100) NOT NULL,
+        `match` VARCHAR(255) DEFAULT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS `patient_portal` (
+        `Patient_ID` INTEGER PRIMARY KEY,
+        `User_ID` INTEGER,
+        `User_Name` VARCHAR(100),
+        `Doctor_sugg` TEXT,
+        `Pr_ID` INTEGER
+    )""",
+    """CREATE TABLE IF NOT EXISTS `prescription` (
+        `Pr_ID` INTEGER PRIMARY KEY AUTOINCREMENT,
+        `Patient_ID` INTEGER,
+        `Doctor_Sugg` TEXT,
+        `Prescription` TEXT,
+        `Visit_Date` DATE,
+        `Dispense` TINYINT DEFAULT 1
+    )""",
+    """CREATE TABLE IF NOT EXISTS `doctor_portal` (
+        `doctor_ID` INTEGER PRIMARY KEY,
+        `User_ID` INTEGER,
+        `Patient_ID` INTEGER,
+        `Doctor_Name` VARCHAR(100),
+        `Pr_ID` INTEGER
+    )""",
+    """CREATE TABLE IF NOT EXISTS `pharmacist_portal` (
+        `Pharma_ID` INTEGER PRIMARY KEY,
+        `User_ID` INTEGER,
+        `Patient_UID` INTEGER,
+        `Pr_ID` INTEGER,
+        `Lease_Until` DATETIME DEFAULT NULL
+    )""",
+    # AUTOINCREMENT: a Seq is never handed out twice, even after the newest rows are pruned
+    """CREATE TABLE IF NOT EXISTS `prescription_change` (
+        `Seq` INTEGER PRIMARY KEY AUTOINCREMENT,
+        `Pr_ID` INTEGER NOT NULL,
+        `Patient_ID` INTEGER,
+        `Op` CHAR(1) NOT NULL
+    )""",
+]
+
+# Full-text index for search.py: an external-content FTS5 table over
+# prescription (the texts are not stored twice), kept in sync by triggers. A
+# dispense only touches Dispense, so it doesn't rewrite the index. prefix=
+# keeps extra indexes for 2- to 5-letter prefixes, so "amox*" while typing is
+# a lookup; a longer prefix would merge the doclists of every term it starts
+# (50+ ms for a common word at a million rows), so search.py never asks for
+# one. The four cost ~40% on top of the plain index.
+SQLITE_FTS_PREFIXES = (2, 3, 4, 5)
+SQLITE_FTS_OPTIONS = "prefix='{}'".format(" ".join(map(str, SQLITE_FTS_PREFIXES)))
+SQLITE_FTS = f"""CREATE VIRTUAL TABLE IF NOT EXISTS `prescription_fts` USING fts5(
+    Doctor_Sugg, Prescription,
+    content='prescription', content_rowid='Pr_ID',
+    tokenize='unicode61 remove_diacritics 2', {SQLITE_FTS_OPTIONS}
+)"""
+
+_FTS_INSERT = ("INSERT INTO `prescription_fts` (rowid, Doctor_Sugg, Prescription) "
+               "VALUES (NEW.`Pr_ID`, NEW.`Doctor_Sugg`, NEW.`Prescription`);")
+_FTS_DELETE = ("INSERT INTO `prescription_fts` (`prescription_fts`, rowid, Doctor_Sugg, Prescription) "
+               "VALUES ('delete', OLD.`Pr_ID`, OLD.`Doctor_Sugg`, OLD.`Prescription`);")
+
+SQLITE_FTS_TRIGGERS = [
+    ("trg_prescription_fts_ins", f"AFTER INSERT ON `prescription` BEGIN {_FTS_INSERT} END"),
+    ("trg_prescription_fts_del", f"AFTER DELETE ON `prescription` BEGIN {_FTS_DELETE} END"),
+    ("trg_prescription_fts_upd", "AFTER UPDATE OF `Pr_ID`, `Doctor_Sugg`, `Prescription` ON `prescription` "
+                                 f"BEGIN {_FTS_DELETE} {_FTS_INSERT} END"),
+]
+
+# re-index every prescription (after a bulk load with the triggers off)
+SQLITE_FTS_REBUILD = "INSERT INTO `prescription_fts` (`prescription_fts`) VALUES ('rebuild')"
+
+# columns added after the first SQLite schema shipped: (table, column, definition)
+SQLITE_COLUMNS = [
+    ("user", "match", "VARCHAR(255) DEFAULT NULL"),
+] + COLUMNS
+
+
+def init_sqlite(conn):
+    """Create missing tables, columns and indexes on a raw sqlite3 connection."""
+    for ddl in SQLITE_TABLES:
+        conn.execute(ddl)
+    for table, column, definition in SQLITE_COLUMNS:
+        have = {row[1].lower() for row in conn.execute(f"PRAGMA table_info(`{table}`)")}
+        if column.lower() not in have:
+            conn.execute(f"ALTER TABLE `{table}` ADD COLUMN `{column}` {definition}")
+    for ix in INDEXES:
+        if ix.fulltext:
+            continue
+        cols = ", ".join(f"`{c}`" for c in ix.columns)
+        unique = "UNIQUE " if ix.unique else ""
+        conn.execute(f"CREATE {unique}INDEX IF NOT EXISTS `{ix.name}` ON `{ix.table}` ({cols})")
+    for trigger in TRIGGERS:
+        conn.execute(trigger_ddl(trigger, sqlite=True))
+    init_sqlite_fts(conn)
+
+
+def init_sqlite_fts(conn):
+    """
+    Create prescription_fts and its triggers; a new index is filled from the
+    existing rows. One built with other prefix indexes is rebuilt (once; about
+    40 s per million prescriptions).
+    """
+    found = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'prescription_fts'").fetchone()
+    fresh = not found
+    if found and SQLITE_FTS_OPTIONS not in found[0]:
+        conn.execute("DROP TABLE `prescription_fts`")
+        fresh = True
+    conn.execute(SQLITE_FTS)
+    for name, body in SQLITE_FTS_TRIGGERS:
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS `{name}` {body}")
+    if fresh:
+        conn.execute(SQLITE_FTS_REBUILD)
+
+
+def existing_indexes(conn, table):
+    with cursor(conn) as cur:
+        if backend_name() == "sqlite":
+            cur.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s COLLATE NOCASE",
+                        (table,))
+        else:
+            cur.execute(
+                "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                (table,),
+            )
+        return {row[0] for row in cur.fetchall()}
+
+
+def ensure_indexes(verbose=False):
+    """Create any index from INDEXES that the connected database is missing; returns their names."""
+    created = []
+    sqlite = backend_name() == "sqlite"
+    with connection() as conn:
+        present = {}
+        for ix in INDEXES:
+            if ix.table not in present:
+                present[ix.table] = existing_indexes(conn, ix.table)
+            if ix.name in present[ix.table] or (sqlite and ix.fulltext):
+                continue
+            cols = ", ".join(f"`{c}`" for c in ix.columns)
+            kind = "UNIQUE " if ix.unique else "FULLTEXT " if ix.fulltext else ""
+            with cursor(conn) as cur:
+                if sqlite:
+                    cur.execute(f"CREATE {kind}INDEX `{ix.name}` ON `{ix.table}` ({cols})")
+                else:
+                    cur.execute(f"ALTER TABLE `{ix.table}` ADD {kind}INDEX `{ix.name}` ({cols})")
+            created.append(ix.name)
+            if verbose:
+                print(f"created {ix.table}.{ix.name} ({cols})")
+    return created
+
+
+def ensure_tables(verbose=False):
+    """Create the TABLES and TRIGGERS a MySQL database is missing; returns what was created."""
+    if backend_name() == "sqlite":
+        return []                                   # init_sqlite() already did
+    created = []
+    with connection() as conn:
+        with cursor(conn) as cur:
+            cur.execute("SELECT TABLE_NAME FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()")
+            tables = {row[0].lower() for row in cur.fetchall()}
+            for ddl in TABLES:
+                name = ddl.split("`")[1]
+                if name.lower() not in tables:
+                    cur.execute(ddl)
+                    created.append(name)
+            cur.execute("SELECT TRIGGER_NAME FROM information_schema.TRIGGERS WHERE TRIGGER_SCHEMA = DATABASE()")
+            triggers = {row[0] for row in cur.fetchall()}
+            for trigger in TRIGGERS:
+                if trigger.name not in triggers:
+                    cur.execute(trigger_ddl(trigger, sqlite=False))
+                    created.append(trigger.name)
+    if verbose:
+        for name in created:
+            print(f"created {name}")
+    return created
+
+
+def ensure_columns(verbose=False):
+    """Add any column from COLUMNS that the connected MySQL database is missing; returns them."""
+    if backend_name() == "sqlite":
+        return []                                   # init_sqlite() already did
+    added = []
+    with connection() as conn:
+        with cursor(conn) as cur:
+            for table, column, definition in COLUMNS:
+                cur.execute(
+                    "SELECT 1 FROM information_schema.COLUMNS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+                    (table, column),
+                )
+                if cur.fetchone():
+                    continue
+                cur.execute(f"ALTER TABLE `{table}` ADD COLUMN `{column}` {definition}")
+                added.append(f"{table}.{column}")
+                if verbose:
+                    print(f"added {table}.{column} {definition}")
+    return added
+
+
+def drop_legacy_keys(verbose=False):
+    """Drop the LEGACY_KEYS the connected MySQL database still has; returns them."""
+    if backend_name() == "sqlite":
+        return []                                   # SQLite's Pharma_ID is the rowid, numbered per row
+    dropped = []
+    with connection() as conn:
+        for table, name in LEGACY_KEYS:
+            if name not in existing_indexes(conn, table):
+                continue
+            key = "PRIMARY KEY" if name == "PRIMARY" else f"INDEX `{name}`"
+            with cursor(conn) as cur:
+                cur.execute(f"ALTER TABLE `{table}` DROP {key}")
+            dropped.append(f"{table}.{name}")
+            if verbose:
+                print(f"dropped {table}.{name}")
+    return dropped
+
+
+if __name__ == "__main__":
+    changed = ensure_tables(verbose=True)
+    changed += ensure_columns(verbose=True)
+    changed += ensure_indexes(verbose=True)
+    changed += drop_legacy_keys(verbose=True)      # after the indexes: ux_pharmacist_portal_pr replaces it
+    if not changed:
+        print("all tables, columns and indexes present")
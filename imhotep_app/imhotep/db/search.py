@@ -0,0 +1,162 @@
+# imhotep/db/search.py
+"""
+Full-text search over the doctor's notes and prescriptions.
+
+    results = search_prescriptions('"twice daily" amox')
+    results.rows, results.recent
+
+MySQL uses the FULLTEXT index ft_prescription_text, SQLite the FTS5 table
+prescription_fts (see schema.py). Both rank by relevance and return the
+history preview tuples (doctor_history.py) plus the score, best match first.
+
+SQLite's bm25 reads every hit of every term, however few rows match them all,
+so each word's hits are read first, stopping at FULL_RANK_HITS. If every term
+has a word under the cap, every match is ranked. Otherwise (a common word:
+"amoxicillin" is in every tenth row) the matches come back unranked, newest
+first, from the newest RECENT_SPAN prescriptions, and `recent` says so.
+Measured at a million prescriptions, one CPU, 50 results:
+
+    rare words (up to 5,000 hits), all ranked               2-15 ms
+    common words, newest first                               3-25 ms
+    common words that never meet ("day twice" as a phrase)  20-45 ms
+
+Ranking every match of a word in every tenth row took 200-400 ms. The last
+row is what RECENT_BUDGET bounds: finding nothing means reading all the
+words' hits, so the walk back stops when it runs out and reports what it has.
+
+What the user types is turned into the backend's syntax by parse(), never
+passed through, so a stray quote or operator can't make the query fail:
+
+- words must all match:               amoxicillin rash
+- "quoted words" match as a phrase:   "twice daily"
+- a trailing * matches a prefix:      amox*
+- the last word is also a prefix while it is being typed (no space after
+  it yet), which is what makes search-as-you-type useful. One letter is
+  never a prefix: "a*" would be every word starting with a. On SQLite a
+  prefix counts its first MAX_PREFIX letters ("amoxici" is "amoxi*").
+
+Punctuation splits a word the way both indexes tokenize it: "co-amoxiclav"
+is searched as the phrase "co amoxiclav".
+"""
+import re
+import time
+from typing import List, NamedTuple, Tuple
+
+from . import queries
+from .connection import backend_name, fetch_all
+from .schema import SQLITE_FTS_PREFIXES
+
+DEFAULT_LIMIT = 50
+FULL_RANK_HITS = 5000       # SQLite: a term with more hits in each of its words isn't ranked...
+RECENT_WINDOW = 2000        # ...but read a window of rowids at a time, newest first,
+RECENT_SPAN = 200_000       # each four times the last, going at most this far back
+RECENT_BUDGET = 0.025       # or for this many seconds (common words that rarely meet)
+MIN_PREFIX = 2              # schema.SQLITE_FTS_PREFIXES: prefix indexes from 2 letters...
+MAX_PREFIX = max(SQLITE_FTS_PREFIXES)   # ...to 5; a longer prefix is cut to this on SQLite
+MYSQL_MIN_WORD = 3          # innodb_ft_min_token_size: shorter whole words are not indexed
+
+_TOKEN = re.compile(r'"([^"]*)"?(\*?)|(\S+)')
+_WORD = re.compile(r"\w+")
+
+
+class SearchResults(NamedTuple):
+    rows: list                  # (Pr_ID, Patient_ID, Visit_Date, Dispense, notes, prescription, score)
+    recent: bool = False        # too common to rank: the newest matches, newest first, score None
+
+
+class Term(NamedTuple):
+    words: Tuple[str, ...]  # more than one = phrase
+    prefix: bool            # last word may be the start of a longer one
+
+
+def parse(text: str) -> List[Term]:
+    """Search box text -> terms; empty when there is nothing to search for."""
+    terms = []
+    for match in _TOKEN.finditer(text):
+        phrase, star, bare = match.groups()
+        raw = phrase if bare is None else bare
+        words = tuple(w.lower() for w in _WORD.findall(raw))
+        if words:
+            terms.append(Term(words, bool(star) or raw.endswith("*")))
+    if terms and not text[-1].isspace() and not text.endswith('"'):
+        terms[-1] = terms[-1]._replace(prefix=True)
+    return [term._replace(prefix=False) if len(term.words[-1]) < MIN_PREFIX else term for term in terms]
+
+
+def mysql_query(terms: List[Term]) -> str:
+    """Boolean-mode AGAINST() string: +word +prefix* +"a phrase"."""
+    parts = []
+    for term in terms:
+        if len(term.words) > 1:
+            parts.append('+"' + " ".join(term.words) + '"')    # InnoDB has no phrase prefixes
+        elif term.prefix:
+            parts.append(f"+{term.words[0]}*")
+        elif len(term.words[0]) >= MYSQL_MIN_WORD:
+            parts.append(f"+{term.words[0]}")
+    return " ".join(parts)
+
+
+def fts5_query(terms: List[Term]) -> str:
+    """FTS5 MATCH string: "word" "prefix"* "a phrase" (implicit AND); prefixes at most MAX_PREFIX letters."""
+    parts = []
+    for term in terms:
+        words = term.words
+        if term.prefix and len(words[-1]) > MAX_PREFIX:
+            words = (*words[:-1], words[-1][:MAX_PREFIX])      # served by a prefix index, not a merge
+        parts.append('"' + " ".join(words) + '"' + ("*" if term.prefix else ""))
+    return " ".join(parts)
+
+
+def _selective(term: Term) -> bool:
+    """
+    At most FULL_RANK_HITS rows hold `term`. A phrase is when one of its
+    words is: each word's hits are read up to the cap, which is cheap however
+    common the word, where reading the phrase's own would walk the doclists
+    until it had the cap or none were left.
+    """
+    for i, word in enumerate(term.words):
+        last = term.prefix and i == len(term.words) - 1
+        probe = fts5_query([Term((word,), last)])
+        if len(fetch_all(queries.DOCTOR_SEARCH_HITS, (probe, FULL_RANK_HITS + 1), as_dict=False)) <= FULL_RANK_HITS:
+            return True
+    return False
+
+
+def _recent(match: str, limit: int) -> list:
+    """
+    The newest `limit` matches, newest first, looked for among the newest
+    RECENT_SPAN prescriptions a window of rowids at a time (each four times
+    the last), until RECENT_BUDGET is spent.
+    """
+    newest = fetch_all(queries.DOCTOR_SEARCH_NEWEST, as_dict=False)[0][0]
+    if newest is None:
+        return []
+    oldest = max(newest - RECENT_SPAN + 1, 1)
+    deadline = time.monotonic() + RECENT_BUDGET
+    pr_ids, high, width = [], newest, RECENT_WINDOW
+    while len(pr_ids) < limit and high >= oldest and time.monotonic() < deadline:
+        low = max(high - width + 1, oldest)
+        window = fetch_all(queries.DOCTOR_SEARCH_WINDOW, (match, low, high), as_dict=False)
+        pr_ids.extend(row[0] for row in reversed(window))
+        high, width = low - 1, width * 4
+    pr_ids = pr_ids[:limit]
+    if not pr_ids:
+        return []
+    sql = queries.DOCTOR_SEARCH_ROWS.format(placeholders=", ".join(["%s"] * len(pr_ids)))
+    return fetch_all(sql, tuple(pr_ids), as_dict=False)
+
+
+def search_prescriptions(text: str, limit: int = DEFAULT_LIMIT) -> SearchResults:
+    """Best matches for `text` across all patients (SearchResults.rows, best first)."""
+    terms = parse(text)
+    if backend_name() == "sqlite":
+        match = fts5_query(terms)
+        if not match:
+            return SearchResults([])
+        if all(_selective(term) for term in terms):
+            return SearchResults(fetch_all(queries.DOCTOR_SEARCH_SQLITE, (match, limit), as_dict=False))
+        return SearchResults(_recent(match, limit), recent=True)
+    match = mysql_query(terms)
+    if not match:
+        return SearchResults([])
+    return SearchResults(fetch_all(queries.DOCTOR_SEARCH_MYSQL, (match, match, limit), as_dict=False))
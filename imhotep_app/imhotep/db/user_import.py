@@ -0,0 +1,186 @@
+# imhotep/db/user_import.py
+"""
+Bulk registration of users from CSV, for onboarding a clinic.
+
+    result = import_users("staff.csv", progress=print)
+    result.imported, result.rejected          # [User_ID, ...], [Rejected(line, user_id, reason), ...]
+
+    python -m imhotep.tools.import_users staff.csv     # the same from a shell
+
+The file has a header row with User_ID, User_Name, Password and optionally
+match (the recovery answer); column names are matched case-insensitively.
+Every row is checked with RegisterView's rules (auth.registration_error),
+then the IDs that are already registered, or repeated in the file, are
+found in one set-based pass (USER_NAMES_IN, BATCH_SIZE IDs per statement).
+Those rows are rejected, with the reason; the rest are imported.
+
+Hashing is what costs: two bcrypt hashes per user at the site's cost
+(hashing.target_cost, ~250 ms each at cost 12). They run on a process
+pool with one worker per core, so the import scales with cores. Rows are
+inserted in transactions of `batch` users with executemany, which pymysql
+sends as multi-row INSERTs, as each batch's hashes come back; the pool keeps
+hashing meanwhile. A batch that collides with a registration made during the
+import is checked again and the rest of it still goes in.
+"""
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple
+
+from . import queries
+from .auth import registration_error
+from .connection import IntegrityError, cursor, fetch_all, transaction
+from .hashing import hash_secret, target_cost
+from .name_index import get_name_index
+from .names import BATCH_SIZE
+
+DEFAULT_BATCH = 500         # users per INSERT transaction
+HASH_CHUNK = 4              # secrets per process-pool task
+
+COLUMNS = {"user_id": "User_ID", "user_name": "User_Name", "password": "Password", "match": "match"}
+REQUIRED = ("user_id", "user_name", "password")
+
+
+class NewUser(NamedTuple):
+    line: int                   # in the CSV file, header = 1
+    user_id: str
+    name: str
+    password: str
+    match: str
+
+
+class Rejected(NamedTuple):
+    line: int
+    user_id: str
+    reason: str
+
+
+class ImportResult(NamedTuple):
+    imported: List[int]
+    rejected: List[Rejected]
+    seconds: float
+    cost: int                   # bcrypt cost of the new hashes
+    workers: int
+
+    def __str__(self):
+        rate = len(self.imported) / self.seconds if self.seconds else 0
+        return (f"{len(self.imported):,} users imported, {len(self.rejected):,} rejected "
+                f"in {self.seconds:.1f} s ({rate:,.1f} users/s, bcrypt cost {self.cost}, "
+                f"{self.workers} workers)")
+
+
+# ---------------- reading and checking ----------------
+def read_csv(f):
+    """NewUser per data row of an open CSV file; fields stripped like RegisterView does."""
+    reader = csv.reader(f)
+    header = [h.strip().lower() for h in next(reader, [])]
+    missing = [COLUMNS[c] for c in REQUIRED if c not in header]
+    if missing:
+        raise ValueError(f"CSV header lacks {', '.join(missing)} "
+                         f"(expected {', '.join(COLUMNS.values())})")
+    at = {column: header.index(column) for column in COLUMNS if column in header}
+
+    def field(fields, column):
+        i = at.get(column)
+        return fields[i].strip() if i is not None and i < len(fields) else ""
+
+    for line, fields in enumerate(reader, start=2):
+        if not any(f.strip() for f in fields):
+            continue                    # blank line
+        yield NewUser(line, *(field(fields, column) for column in COLUMNS))
+
+
+def registered(user_ids):
+    """The subset of `user_ids` (ints) that already have a `user` row."""
+    user_ids = list(user_ids)
+    found = set()
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        chunk = user_ids[start:start + BATCH_SIZE]
+        sql = queries.USER_NAMES_IN.format(placeholders=", ".join(["%s"] * len(chunk)))
+        found.update(row[0] for row in fetch_all(sql, chunk, as_dict=False))
+    return found
+
+
+def check(users):
+    """(accepted, rejected): RegisterView's rules, then repeats within the file, then the database."""
+    accepted, rejected, first_line = [], [], {}
+    for user in users:
+        error = registration_error(user.name, user.user_id, user.password)
+        if not error and not user.user_id.isdecimal():      # "²" passes isdigit() but is no number
+            error = "Unique Code must contain digits only!"
+        if error:
+            rejected.append(Rejected(user.line, user.user_id, error))
+        elif int(user.user_id) in first_line:
+            rejected.append(Rejected(user.line, user.user_id,
+                                     f"Unique Code repeats line {first_line[int(user.user_id)]}"))
+        else:
+            first_line[int(user.user_id)] = user.line
+            accepted.append(user)
+    taken = registered(first_line)
+    if taken:
+        rejected += [Rejected(u.line, u.user_id, "Unique Code already exists!")
+                     for u in accepted if int(u.user_id) in taken]
+        accepted = [u for u in accepted if int(u.user_id) not in taken]
+    rejected.sort()
+    return accepted, rejected
+
+
+# ---------------- hashing and inserting ----------------
+def _insert(rows):
+    with transaction() as conn:
+        with cursor(conn) as cur:
+            cur.executemany(queries.USER_INSERT, rows)
+
+
+def _insert_batch(users, rows, rejected):
+    """Insert one batch; returns the users that went in."""
+    try:
+        _insert(rows)
+        return users
+    except IntegrityError:
+        # registered by someone else since check(): drop those, insert the rest
+        taken = registered(int(u.user_id) for u in users)
+        keep = [i for i, u in enumerate(users) if int(u.user_id) not in taken]
+        rejected += [Rejected(u.line, u.user_id, "Unique Code already exists!")
+                     for u in users if int(u.user_id) in taken]
+        if keep:
+            _insert([rows[i] for i in keep])
+        return [users[i] for i in keep]
+
+
+def import_users(source, batch=DEFAULT_BATCH, workers=None, cost=None, dry_run=False, progress=None):
+    """
+    Register every acceptable user in `source` (a CSV path, or NewUser rows).
+    progress(done, total) is called after each batch. With dry_run nothing is
+    hashed or written; `imported` then lists the users that would be.
+    """
+    started = time.perf_counter()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, newline="", encoding="utf-8-sig") as f:
+            users, rejected = check(read_csv(f))
+    else:
+        users, rejected = check(source)
+    cost = cost or target_cost()
+    workers = workers or os.cpu_count() or 1
+    if dry_run or not users:
+        return ImportResult([int(u.user_id) for u in users], rejected,
+                            time.perf_counter() - started, cost, workers)
+
+    # password and match of each user, in order; map() hands them out as they finish
+    secrets = [secret for u in users for secret in (u.password, u.match)]
+    imported = []
+    index = get_name_index()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        hashes = pool.map(hash_secret, secrets, [cost] * len(secrets), chunksize=HASH_CHUNK)
+        for start in range(0, len(users), batch):
+            chunk = users[start:start + batch]
+            rows = [(u.user_id, u.name, next(hashes), next(hashes)) for u in chunk]
+            for user in _insert_batch(chunk, rows, rejected):
+                imported.append(int(user.user_id))
+                if index.ready.is_set():            # inside the app: autocomplete knows them now
+                    index.add(user.user_id, user.name)
+            if progress is not None:
+                progress(len(imported), len(users))
+    rejected.sort()
+    return ImportResult(imported, rejected, time.perf_counter() - started, cost, workers)
@@ -0,0 +1,149 @@
+# imhotep/db/work_queue.py
+"""
+Pharmacist work queue on top of the `pharmacist_portal` table.
+
+Instead of every pharmacist paging through the same "all patients" list and
+racing to the Dispense button, each one claims the next few active
+prescriptions. A claim is a pharmacist_portal row (unique on Pr_ID) holding
+the claimer's User_ID and a lease expiry:
+
+    queue = WorkQueue(user_id)
+    rows = queue.claim(10)              # PHARMA_COLUMNS tuples, now held for a lease
+    queue.renew(pr_ids)                 # extend; returns the Pr_IDs still held
+    queue.complete([pr_id])             # dispense + drop the claim, one transaction
+    queue.release(pr_ids)               # hand back unfinished work
+    queue.dispense(pr_ids)              # picked from a list instead: skips others' claims
+
+A claim whose lease ran out (pharmacist walked away, app crashed) is up for
+grabs again; nothing has to clean it up. Where the server supports it
+(MySQL 8, MariaDB 10.6+) candidates are read with FOR UPDATE SKIP LOCKED,
+so concurrent claimers never wait on each other's rows. On older MariaDB the
+read is unlocked and two claimers can pick the same candidate, but the claim
+upsert only takes free or expired rows, so one of them simply gets fewer.
+SQLite serialises writers (BEGIN IMMEDIATE) and needs neither.
+
+Lease times come from the client clock; keep the counters' clocks in sync
+(NTP) or use a lease well above the expected skew (PHARMA_LEASE_SECONDS).
+"""
+from datetime import datetime, timedelta
+
+from . import queries
+from .config import env_int, load_env
+from .connection import backend_name, cursor, get_backend, transaction
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_CLAIM_SIZE = 10
+
+
+class WorkQueue:
+    def __init__(self, user_id, lease_seconds=DEFAULT_LEASE_SECONDS, clock=datetime.now):
+        self.user_id = int(user_id)
+        self.lease = timedelta(seconds=lease_seconds)
+        self._clock = clock
+
+    @classmethod
+    def from_env(cls, user_id):
+        load_env()
+        return cls(user_id, lease_seconds=env_int("PHARMA_LEASE_SECONDS", DEFAULT_LEASE_SECONDS))
+
+    def _now(self):
+        return self._clock().replace(microsecond=0)        # DATETIME has whole seconds
+
+    def _held(self, cur, pr_ids, lease_until):
+        sql = queries.QUEUE_HELD.format(placeholders=", ".join(["%s"] * len(pr_ids)))
+        cur.execute(sql, (*pr_ids, self.user_id, lease_until))
+        return {row[0] for row in cur.fetchall()}
+
+    # ---------------- claim / renew ----------------
+    def claim(self, count=DEFAULT_CLAIM_SIZE):
+        """
+        Claim up to `count` of the oldest active prescriptions nobody holds.
+        Returns their PHARMA_COLUMNS rows (Pr_ID order); fewer, or none, if the
+        queue is short or another pharmacist got there first.
+        """
+        now = self._now()
+        lease_until = now + self.lease
+        sqlite = backend_name() == "sqlite"
+        lock = "FOR UPDATE SKIP LOCKED" if get_backend().skip_locked else ""
+
+        with transaction() as conn:
+            with cursor(conn) as cur:
+                cur.execute(queries.QUEUE_CANDIDATES.format(lock=lock), (now, count))
+                candidates = cur.fetchall()
+                if not candidates:
+                    return []
+
+                # SQLite's Pharma_ID is a rowid alias and numbers itself
+                pharma_id = None if sqlite else self.user_id
+                if sqlite:
+                    claim_sql = queries.QUEUE_CLAIM_SQLITE
+                    params = [(pr_id, patient_id, self.user_id, pharma_id, lease_until, now)
+                              for pr_id, patient_id in candidates]
+                else:
+                    claim_sql = queries.QUEUE_CLAIM
+                    params = [(pr_id, patient_id, self.user_id, pharma_id, lease_until, now, now, now)
+                              for pr_id, patient_id in candidates]
+                cur.executemany(claim_sql, params)
+
+                held = self._held(cur, [pr_id for pr_id, _ in candidates], lease_until)
+                if not held:
+                    return []
+                sql = queries.QUEUE_ROWS.format(placeholders=", ".join(["%s"] * len(held)))
+                cur.execute(sql, tuple(held))
+                return list(cur.fetchall())
+
+    def renew(self, pr_ids):
+        """Push the lease out again; returns the subset of pr_ids this pharmacist still holds."""
+        pr_ids = list(pr_ids)
+        if not pr_ids:
+            return set()
+        now = self._now()
+        lease_until = now + self.lease
+        with transaction() as conn:
+            with cursor(conn) as cur:
+                cur.executemany(queries.QUEUE_RENEW,
+                                [(lease_until, pr_id, self.user_id, now) for pr_id in pr_ids])
+                return self._held(cur, pr_ids, lease_until)
+
+    # ---------------- finish ----------------
+    def complete(self, pr_ids):
+        """
+        Dispense the given claimed prescriptions and drop their claims, all in
+        one transaction. Returns the Pr_IDs actually dispensed here: a claim
+        someone else took over after our lease ran out is left alone.
+        """
+        dispensed = []
+        with transaction() as conn:
+            with cursor(conn) as cur:
+                for pr_id in pr_ids:
+                    if not cur.execute(queries.QUEUE_RELEASE, (pr_id, self.user_id)):
+                        continue                    # not ours (any more)
+                    if cur.execute(queries.PHARMA_DISPENSE, (pr_id,)):
+                        dispensed.append(pr_id)
+        return dispensed
+
+    def dispense(self, pr_ids):
+        """
+        Dispense prescriptions picked from a list rather than claimed, in one
+        transaction. Returns the Pr_IDs dispensed here: one that is already
+        dispensed, or held by another pharmacist's live claim, is skipped. A
+        claim of our own on it is dropped with it.
+        """
+        now = self._now()
+        dispensed = []
+        with transaction() as conn:
+            with cursor(conn) as cur:
+                for pr_id in pr_ids:
+                    if cur.execute(queries.PHARMA_DISPENSE_UNCLAIMED, (pr_id, self.user_id, now)):
+                        cur.execute(queries.QUEUE_RELEASE, (pr_id, self.user_id))
+                        dispensed.append(pr_id)
+        return dispensed
+
+    def release(self, pr_ids):
+        """Give claims back to the queue; returns how many were still ours."""
+        pr_ids = list(pr_ids)
+        if not pr_ids:
+            return 0
+        with transaction() as conn:
+            with cursor(conn) as cur:
+                return cur.executemany(queries.QUEUE_RELEASE, [(pr_id, self.user_id) for pr_id in pr_ids])
@@ -0,0 +1,152 @@
+# imhotep/executor.py
+"""
+Run blocking work (SQL, bcrypt, ...) off the Qt GUI thread.
+
+    self._executor = QueryExecutor(self)
+    self._executor.busy_changed.connect(self._set_busy)
+    self._executor.submit("load", self._fetch_rows, patient_id,
+                          on_result=self._show_rows, on_error=self._show_error)
+
+`fn` runs on a worker thread and must not touch widgets. `on_result` /
+`on_error` are always called back on the GUI thread. Submitting again with the
+same key supersedes the earlier request: if it hasn't started it is dropped
+from the queue, otherwise its result is discarded when it arrives -- handed
+to `on_discard` instead, if given, for work that must be undone (leases).
+"""
+import itertools
+import logging
+import sys
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+from .db.config import DBSettings
+from .db.instrument import frame_tag, query_tag
+
+logger = logging.getLogger("imhotep.executor")
+
+_db_threads = None
+
+
+def db_thread_pool() -> QThreadPool:
+    """
+    Shared worker pool for database work. Sized to the connection pool so a
+    worker never sits waiting for a free connection.
+    """
+    global _db_threads
+    if _db_threads is None:
+        _db_threads = QThreadPool()
+        _db_threads.setMaxThreadCount(max(2, DBSettings.from_env().pool_max))
+    return _db_threads
+
+
+class _Task(QRunnable):
+    def __init__(self, executor, ticket, fn, args, kwargs, tag):
+        super().__init__()
+        # Python keeps ownership so tryTake() on a finished task is always safe
+        self.setAutoDelete(False)
+        self._executor = executor
+        self.ticket = ticket
+        self._fn = fn
+        self._args = args
+        self._kwargs = kwargs
+        self.tag = tag
+
+    def run(self):
+        result, error = None, None
+        try:
+            with query_tag(self.tag):
+                result = self._fn(*self._args, **self._kwargs)
+        except Exception as e:
+            error = e
+        try:
+            # queued across threads: delivered on the executor's (GUI) thread
+            self._executor._finished.emit((self.ticket, result, error))
+        except RuntimeError:
+            # the owning view was destroyed while we were running
+            pass
+
+
+class QueryExecutor(QObject):
+    busy_changed = pyqtSignal(bool)
+    _finished = pyqtSignal(object)
+
+    _tickets = itertools.count(1)
+
+    def __init__(self, parent=None, thread_pool=None):
+        super().__init__(parent)
+        self._threads = thread_pool or db_thread_pool()
+        self._latest = {}       # key -> newest ticket
+        self._pending = {}      # ticket -> (key, task, on_result, on_error, on_discard)
+        self._finished.connect(self._deliver)
+
+    # ---------------- public API ----------------
+    def submit(self, key, fn, *args, on_result=None, on_error=None, on_discard=None, **kwargs):
+        """
+        Queue fn(*args, **kwargs) on a worker thread; returns a ticket number.
+        Its queries are tagged with the calling method ("pharma._on_load").
+        """
+        ticket = next(self._tickets)
+        previous = self._latest.get(key)
+        self._latest[key] = ticket
+        if previous is not None:
+            self._drop_if_queued(previous)
+
+        task = _Task(self, ticket, fn, args, kwargs, frame_tag(sys._getframe(1)))
+        was_busy = self.is_busy()
+        self._pending[ticket] = (key, task, on_result, on_error, on_discard)
+        self._threads.start(task)
+        if not was_busy:
+            self.busy_changed.emit(True)
+        return ticket
+
+    def cancel(self, key):
+        """Forget the current request for `key`; its result will be ignored."""
+        ticket = self._latest.pop(key, None)
+        if ticket is not None:
+            self._drop_if_queued(ticket)
+
+    def is_busy(self, key=None):
+        if key is None:
+            return bool(self._pending)
+        return any(k == key for k, *_ in self._pending.values())
+
+    # ---------------- internals ----------------
+    def _drop_if_queued(self, ticket):
+        entry = self._pending.get(ticket)
+        if entry is None:
+            return
+        if self._threads.tryTake(entry[1]):
+            self._forget(ticket)
+
+    def _forget(self, ticket):
+        self._pending.pop(ticket, None)
+        if not self._pending:
+            self.busy_changed.emit(False)
+
+    @pyqtSlot(object)
+    def _deliver(self, payload):
+        ticket, result, error = payload
+        entry = self._pending.get(ticket)
+        if entry is None:
+            return
+        key, task, on_result, on_error, on_discard = entry
+        current = self._latest.get(key) == ticket
+        if current:
+            del self._latest[key]
+        self._forget(ticket)
+        if not current:
+            # superseded or cancelled: drop silently, unless the result needs undoing
+            if on_discard is not None and error is None:
+                with query_tag(task.tag):
+                    on_discard(result)
+            return
+
+        # callbacks keep the task's tag, so what they log is attributed to the action
+        with query_tag(task.tag):
+            if error is not None:
+                if on_error is not None:
+                    on_error(error)
+                else:
+                    logger.error("background task %r failed", key, exc_info=error)
+            elif on_result is not None:
+                on_result(result)
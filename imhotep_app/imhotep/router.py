@@ -1,16 +1,27 @@
 # router.py
+import importlib
+
 from PyQt5.QtWidgets import QWidget, QStackedWidget, QVBoxLayout, QMessageBox
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QEvent, QTimer, pyqtSignal
 
 from .views.selection import SelectionView
-from .views.login import LoginView
-from .views.forgot import ForgotPasswordView
-from .views.register import RegisterView
-from .views.doctor import DoctorPortal
-from .views.pharma import PharmacistPortal
-from .views.patient import PatientPortal
+
+# every view except the selection screen: imported and built on first navigation,
+# so the DB layer, bcrypt and the portals' widget trees stay off the cold start
+# (tools/import_budget.py keeps it that way)
+VIEWS = {
+    "login": (".views.login", "LoginView"),
+    "forgot": (".views.forgot", "ForgotPasswordView"),
+    "register": (".views.register", "RegisterView"),
+    "doctor": (".views.doctor", "DoctorPortal"),
+    "pharmacist": (".views.pharma", "PharmacistPortal"),
+    "patient": (".views.patient", "PatientPortal"),
+}
+
 
 class Router(QWidget):
+    first_paint = pyqtSignal()          # selection screen painted for the first time
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Imhotep")
@@ -23,47 +34,75 @@ class Router(QWidget):
         # track the currently selected role here
         self.current_role = None
 
-        # instantiate main views
+        # the only view built up front; the rest come from view() when first shown
         self.selection = SelectionView()
-        self.login = LoginView()
-        self.forgot = ForgotPasswordView(parent=self.login)
-        self.register = RegisterView()
-
-        # portals: doctor created lazily, others created now
-        self.doctor = None                      # will be created on first doctor login
-        self.pharmacist = PharmacistPortal()
-        self.patient = PatientPortal()
+        for name in VIEWS:
+            setattr(self, name, None)
 
         # navigation from selection
         self.selection.goto_login.connect(self.show_login)      # selection may call with role or without
         self.selection.goto_register.connect(self.show_register)
+        self.selection.installEventFilter(self)
 
-        # login navigation
-        self.login.goto_forgot.connect(self.show_forgot)
-        self.login.goto_selection.connect(self.show_selection)
-        self.login.goto_register.connect(self.show_register)
-        self.login.login_success.connect(self.on_login_success)
-
-        # forgot
-        self.forgot.goto_login.connect(self.show_login)
-
-        # register
-        self.register.goto_selection.connect(self.show_selection)
-        self.register.register_success.connect(self.on_register_success)
-        self.register.goto_login.connect(self.show_login)
-
-        # portals back to login
-        # doctor: will be connected when we create it
-        self.pharmacist.goto_login.connect(self.show_login)
-        self.patient.goto_login.connect(self.show_login)
-
-        # add initial views to stack
-        for w in (self.selection, self.login, self.forgot, self.register):
-            self.stack.addWidget(w)
+        self.stack.addWidget(self.selection)
 
         self.resize(1000, 700)
         self.show_selection()
 
+    # ---------- lazy views ----------
+    def view(self, name, **kwargs):
+        """
+        The view registered under `name`, importing and building it on first use.
+        kwargs go to the constructor, so they only count the first time.
+        """
+        widget = getattr(self, name)
+        if widget is None:
+            module, class_name = VIEWS[name]
+            cls = getattr(importlib.import_module(module, __package__), class_name)
+            if name == "forgot":
+                kwargs.setdefault("parent", self.view("login"))
+            widget = cls(**kwargs)
+            setattr(self, name, widget)
+            self._wire(name, widget)
+            self.stack.addWidget(widget)
+        return widget
+
+    def preload(self, *names):
+        """Build views ahead of navigation, e.g. once the first screen is up."""
+        for name in names:
+            self.view(name)
+
+    def _wire(self, name, widget):
+        if name == "login":
+            widget.goto_forgot.connect(self.show_forgot)
+            widget.goto_selection.connect(self.show_selection)
+            widget.goto_register.connect(self.show_register)
+            widget.login_success.connect(self.on_login_success)
+        elif name == "forgot":
+            widget.goto_login.connect(self.show_login)
+        elif name == "register":
+            widget.goto_selection.connect(self.show_selection)
+            widget.register_success.connect(self.on_register_success)
+            widget.goto_login.connect(self.show_login)
+        else:
+            # portals back to login
+            widget.goto_login.connect(self.show_login)
+
+    def eventFilter(self, obj, event):
+        if obj is self.selection and event.type() == QEvent.Paint:
+            self.selection.removeEventFilter(self)
+            # after this paint has been delivered, not in the middle of it
+            QTimer.singleShot(0, self.first_paint.emit)
+        return super().eventFilter(obj, event)
+
+    def current_view(self):
+        """Name of the view on screen ("doctor", "login", ...), "selection" for the start screen."""
+        widget = self.stack.currentWidget()
+        for name in VIEWS:
+            if widget is not None and getattr(self, name) is widget:
+                return name
+        return "selection"
+
     # ---------- simple view switches ----------
     def show_selection(self):
         self.stack.setCurrentWidget(self.selection)
@@ -77,19 +116,20 @@ class Router(QWidget):
         if role is not None:
             self.current_role = role
 
+        login = self.view("login")
         # Tell LoginView what the active role is (if it supports set_role)
-        if hasattr(self.login, "set_role") and callable(getattr(self.login, "set_role")):
-            self.login.set_role(self.current_role)
+        if hasattr(login, "set_role") and callable(getattr(login, "set_role")):
+            login.set_role(self.current_role)
         else:
-            self.login.current_role = self.current_role
+            login.current_role = self.current_role
 
-        self.stack.setCurrentWidget(self.login)
+        self.stack.setCurrentWidget(login)
 
     def show_forgot(self):
-        self.stack.setCurrentWidget(self.forgot)
+        self.stack.setCurrentWidget(self.view("forgot"))
 
     def show_register(self):
-        self.stack.setCurrentWidget(self.register)
+        self.stack.setCurrentWidget(self.view("register"))
 
     # ---------- success handlers ----------
     def on_login_success(self, user_id: str):
@@ -104,9 +144,7 @@ class Router(QWidget):
         if role == "doctor":
             # create doctor portal on first use, pass doctor_id into ctor
             if self.doctor is None:
-                self.doctor = DoctorPortal(doctor_id=user_id)
-                self.doctor.goto_login.connect(self.show_login)
-                self.stack.addWidget(self.doctor)
+                self.view("doctor", doctor_id=user_id)
             else:
                 # if DoctorPortal implements set_user, update its context
                 if hasattr(self.doctor, "set_user"):
@@ -115,22 +153,12 @@ class Router(QWidget):
             self.stack.setCurrentWidget(self.doctor)
             return
 
-        # ----- Pharmacist -----
-        if role == "pharmacist":
-            if self.stack.indexOf(self.pharmacist) == -1:
-                self.stack.addWidget(self.pharmacist)
-            if hasattr(self.pharmacist, "set_user"):
-                self.pharmacist.set_user(user_id)
-            self.stack.setCurrentWidget(self.pharmacist)
-            return
-
-        # ----- Patient -----
-        if role == "patient":
-            if self.stack.indexOf(self.patient) == -1:
-                self.stack.addWidget(self.patient)
-            if hasattr(self.patient, "set_user"):
-                self.patient.set_user(user_id)
-            self.stack.setCurrentWidget(self.patient)
+        # ----- Pharmacist / Patient -----
+        if role in ("pharmacist", "patient"):
+            portal = self.view(role)
+            if hasattr(portal, "set_user"):
+                portal.set_user(user_id)
+            self.stack.setCurrentWidget(portal)
             return
 
         # Unknown role → go back
@@ -139,4 +167,4 @@ class Router(QWidget):
     def on_register_success(self, user_id: str):
         print(f"Registration successful for User_ID: {user_id}")
         QMessageBox.information(self, "Success", f"Registration successful for User_ID: {user_id}")
-        self.show_selection()
\ No newline at end of file
+        self.show_selection()
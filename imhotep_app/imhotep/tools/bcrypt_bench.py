@@ -0,0 +1,56 @@
+# imhotep/tools/bcrypt_bench.py
+"""
+Login latency per bcrypt cost on this machine.
+
+    python -m imhotep.tools.bcrypt_bench                 # costs 10..14, budget from .env
+    python -m imhotep.tools.bcrypt_bench --min 8 --max 15 --samples 5 --target-ms 300
+
+Prints median/worst checkpw time for each cost and the cost calibrate_cost()
+would pick for the budget. Pin the result with BCRYPT_COST in .env.
+"""
+import argparse
+import statistics
+import time
+
+import bcrypt
+
+from ..db.config import env_int, load_env
+from ..db.hashing import DEFAULT_TARGET_MS, calibrate_cost
+
+
+def verify_latency(cost, samples):
+    password = b"Bench-Passw0rd!"
+    hashed = bcrypt.hashpw(password, bcrypt.gensalt(cost))
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        bcrypt.checkpw(password, hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), max(timings)
+
+
+def main(argv=None):
+    load_env()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min", type=int, default=10, help="lowest cost to time")
+    parser.add_argument("--max", type=int, default=14, help="highest cost to time")
+    parser.add_argument("--samples", type=int, default=3, help="verifications per cost")
+    parser.add_argument("--target-ms", type=float,
+                        default=env_int("BCRYPT_TARGET_MS", DEFAULT_TARGET_MS),
+                        help="login latency budget (default: BCRYPT_TARGET_MS or %(default)s)")
+    args = parser.parse_args(argv)
+
+    print(f"{'cost':>4}  {'median ms':>10}  {'worst ms':>9}  within {args.target_ms:.0f} ms")
+    for cost in range(args.min, args.max + 1):
+        median, worst = verify_latency(cost, args.samples)
+        fits = "yes" if median <= args.target_ms else "no"
+        print(f"{cost:>4}  {median:>10.1f}  {worst:>9.1f}  {fits}")
+        if median > 4 * args.target_ms:
+            print("      (stopping: higher costs only get slower)")
+            break
+
+    print(f"\ncalibrate_cost({args.target_ms:.0f}) -> {calibrate_cost(args.target_ms)}")
+
+
+if __name__ == "__main__":
+    main()
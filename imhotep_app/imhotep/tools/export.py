@@ -0,0 +1,70 @@
+# imhotep/tools/export.py
+"""
+Export prescriptions (with patient name and doctor) to CSV or JSONL.
+
+    python -m imhotep.tools.export audit.csv.gz                       # everything, gzipped CSV
+    python -m imhotep.tools.export q1.jsonl --from 2025-01-01 --to 2025-03-31 --doctor 3
+    python -m imhotep.tools.export - --patient 120 --status active | less
+
+The format and compression follow the file name (.csv / .jsonl, + .gz);
+--format / --gzip override that. "-" writes to stdout. Rows are streamed from
+the server (db/export.py), so memory use does not grow with the table.
+Progress goes to stderr about once a second.
+"""
+import argparse
+import gzip
+import sys
+from datetime import date
+
+from ..db.export import COMPRESS_LEVEL, FORMATS, ExportFilter, Progress, export_prescriptions, write_export
+
+STATUS = {"active": 1, "dispensed": 0}
+
+
+def _reporter(stream):
+    # one line rewritten in place on a terminal, a line per report otherwise
+    end = "\r" if stream.isatty() else "\n"
+
+    def report(progress):
+        final = progress.finished is not None
+        print(f"{'exported' if final else 'exporting'} {progress}", end="\n" if final else end,
+              file=stream, flush=True)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help='file to write, or "-" for stdout')
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, help="first Visit_Date (inclusive)")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="last Visit_Date (inclusive)")
+    parser.add_argument("--doctor", type=int, help="User_ID of the prescribing doctor")
+    parser.add_argument("--patient", type=int, help="User_ID of the patient")
+    parser.add_argument("--status", choices=STATUS, help="only active or only dispensed prescriptions")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the file name, else csv")
+    parser.add_argument("--gzip", action=argparse.BooleanOptionalAction, default=None,
+                        help="default: when the file name ends in .gz")
+    parser.add_argument("--quiet", action="store_true", help="no progress on stderr")
+    args = parser.parse_args(argv)
+
+    filters = ExportFilter(date_from=args.date_from, date_to=args.date_to, doctor_id=args.doctor,
+                           patient_id=args.patient, dispense=STATUS.get(args.status))
+    report = None if args.quiet else _reporter(sys.stderr)
+    if args.output == "-":
+        out = sys.stdout.buffer
+        if args.gzip:
+            out = gzip.GzipFile(fileobj=out, mode="wb", compresslevel=COMPRESS_LEVEL)
+        try:
+            write_export(out, filters, args.format or "csv", Progress(report))
+        except BrokenPipeError:             # e.g. piped into head
+            return 0
+        finally:
+            if args.gzip:
+                out.close()
+        return 0
+
+    export_prescriptions(args.output, filters, args.format, args.gzip, progress=report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
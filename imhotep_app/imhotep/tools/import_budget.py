@@ -0,0 +1,155 @@
+# imhotep/tools/import_budget.py
+"""
+Cold-start budget check.
+
+Imports imhotep.router in a fresh interpreter under `python -X importtime` and
+fails (exit code 1) if the import takes longer than the budget, or if it drags
+in a module that only a later screen needs (bcrypt, pymysql, the DB layer,
+the portals, ...). Optionally also times a cold start up to the selection
+screen's first paint.
+
+    python -m imhotep.tools.import_budget                   # 150 ms budget
+    python -m imhotep.tools.import_budget --budget-ms 120 --top 15
+    python -m imhotep.tools.import_budget --first-paint     # also time the first paint
+
+Import times are noisy: the best of --runs (default 3) counts. PyQt5 itself
+is most of what is left, so the budget mostly guards against regressions.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+MODULE = "imhotep.router"
+DEFAULT_BUDGET_MS = 150
+
+# nothing on the way to the selection screen needs these; Router.view() and
+# app._warm_up() import them later
+FORBIDDEN = (
+    "bcrypt",
+    "pymysql",
+    "dotenv",
+    "concurrent.futures.process",
+    "imhotep.db",
+    "imhotep.executor",
+    "imhotep.views.login",
+    "imhotep.views.forgot",
+    "imhotep.views.register",
+    "imhotep.views.doctor",
+    "imhotep.views.pharma",
+    "imhotep.views.patient",
+)
+
+# child process for --first-paint: prints time.time() once the selection screen has painted
+_FIRST_PAINT = """
+import sys, time
+from PyQt5.QtWidgets import QApplication
+from imhotep.router import Router
+app = QApplication(sys.argv)
+router = Router()
+def painted():
+    print(time.time())
+    app.quit()
+router.first_paint.connect(painted)
+router.show()
+app.exec_()
+"""
+
+
+def _env():
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    return env
+
+
+def parse_importtime(stderr):
+    """[(name, self_us, cumulative_us, depth)] from `-X importtime` output, in import order."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def import_times(module=MODULE):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, env=_env())
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def subtree(rows, module):
+    """Rows imported on behalf of `module` (importtime lists children before their parent)."""
+    for i, (name, _, _, depth) in enumerate(rows):
+        if name == module and depth == 0:
+            start = i
+            while start > 0 and rows[start - 1][3] > 0:
+                start -= 1
+            return rows[start:i + 1]
+    return []
+
+
+def forbidden_imports(rows, forbidden=FORBIDDEN):
+    names = [name for name, *_ in rows]
+    return [name for name in names
+            if any(name == f or name.startswith(f + ".") for f in forbidden)]
+
+
+def first_paint_ms():
+    """Wall time from launching a fresh interpreter to the selection screen's first paint."""
+    start = time.time()
+    proc = subprocess.run([sys.executable, "-c", _FIRST_PAINT],
+                          capture_output=True, text=True, env=_env(), timeout=60)
+    if proc.returncode != 0 or not proc.stdout.strip():
+        raise RuntimeError(f"first paint run failed:\n{proc.stderr[-2000:]}")
+    return (float(proc.stdout.split()[-1]) - start) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default=MODULE, help="module to import (default: %(default)s)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="cumulative import time allowed (default: %(default)s)")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters to try; the best counts")
+    parser.add_argument("--top", type=int, default=10, help="slowest direct imports to list")
+    parser.add_argument("--first-paint", action="store_true", help="also time cold start to first paint")
+    args = parser.parse_args(argv)
+
+    best = None
+    for _ in range(max(1, args.runs)):
+        rows = subtree(import_times(args.module), args.module)
+        total = rows[-1][2] if rows else 0
+        if best is None or total < best[0]:
+            best = (total, rows)
+    total_us, rows = best
+
+    failed = False
+    print(f"import {args.module}: {total_us / 1000:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    for name, _, cum, depth in sorted((r for r in rows if r[3] == 1), key=lambda r: -r[2])[:args.top]:
+        print(f"  {cum / 1000:8.1f} ms  {name}")
+    if total_us / 1000 > args.budget_ms:
+        print("FAIL: over budget")
+        failed = True
+
+    bad = forbidden_imports(rows)
+    if bad:
+        print("FAIL: imported before the first screen needs it: " + ", ".join(bad))
+        failed = True
+
+    if args.first_paint:
+        print(f"cold start to first paint: {min(first_paint_ms() for _ in range(max(1, args.runs))):.0f} ms")
+
+    if not failed:
+        print("ok")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+# imhotep/tools/import_users.py
+"""
+Register users in bulk from a CSV file (db/user_import.py).
+
+    python -m imhotep.tools.import_users staff.csv
+    python -m imhotep.tools.import_users patients.csv --dry-run          # check only
+    python -m imhotep.tools.import_users patients.csv --rejects bad.csv
+
+The header names the columns: User_ID, User_Name, Password and optionally
+match. Rows are checked with the registration screen's rules; the ones that
+fail, or whose User_ID is taken or repeated, are listed on stderr (or written
+to --rejects) and the rest are imported. Exit code 1 if anything was rejected.
+"""
+import argparse
+import csv
+import sys
+
+from ..db.user_import import DEFAULT_BATCH, import_users
+
+
+def _report(done, total):
+    print(f"imported {done:,} / {total:,}", file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv", help="file with User_ID, User_Name, Password[, match] columns")
+    parser.add_argument("--dry-run", action="store_true", help="check the file, change nothing")
+    parser.add_argument("--rejects", help="write the rejected rows (line, User_ID, reason) to this CSV")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="users per INSERT transaction")
+    parser.add_argument("--workers", type=int, help="hashing processes (default: one per CPU)")
+    parser.add_argument("--cost", type=int, help="bcrypt cost (default: the site's, see BCRYPT_COST)")
+    args = parser.parse_args(argv)
+
+    try:
+        result = import_users(args.csv, batch=args.batch, workers=args.workers, cost=args.cost,
+                              dry_run=args.dry_run, progress=_report)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    if args.rejects:
+        with open(args.rejects, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(("line", "User_ID", "reason"))
+            writer.writerows(result.rejected)
+    else:
+        for line, user_id, reason in result.rejected:
+            print(f"line {line}: {user_id or '(no User_ID)'}: {reason}", file=sys.stderr)
+    if args.dry_run:
+        print(f"dry run: {len(result.imported):,} users would be imported, {len(result.rejected):,} rejected")
+    else:
+        print(result)
+    return 1 if result.rejected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
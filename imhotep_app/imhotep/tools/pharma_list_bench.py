@@ -0,0 +1,184 @@
+# imhotep/tools/pharma_list_bench.py
+"""
+Pharmacist list: widget-per-card layout vs. model/delegate list.
+
+    python -m imhotep.tools.pharma_list_bench                      # 1k, 10k, 100k rows
+    python -m imhotep.tools.pharma_list_bench --rows 5000 --max-card-rows 5000
+
+Each (variant, row count) runs in a fresh interpreter so RSS numbers don't
+bleed into each other. Rows are synthetic; no database is needed. Reported:
+
+- widgets   QWidgets created for the list
+- rss MB    resident memory added by building the list
+- build ms  filling the list
+- first ms  full repaint of the visible area
+- scroll ms mean repaint after jumping to 20 positions across the list
+
+The card variant is skipped above --max-card-rows; it takes minutes (and GBs)
+at 100k, which is the point. Runs headless with QT_QPA_PLATFORM=offscreen.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+VARIANTS = ("cards", "model")
+
+
+def synthetic_rows(count):
+    start = date(2024, 1, 1)
+    return [
+        (pr_id, f"Doctor suggestion #{pr_id}: rest and fluids", f"Paracetamol 500mg x{pr_id % 7 + 1}",
+         start + timedelta(days=pr_id % 365), pr_id % 4 != 0, f"Patient {pr_id % 997}", pr_id % 997)
+        for pr_id in range(count, 0, -1)
+    ]
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        import resource                         # peak, not current, outside Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+# ---------------- the list as it was before pharma_list.py ----------------
+def legacy_card(row):
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QFont
+    from PyQt5.QtWidgets import QFrame, QLabel, QPushButton, QSizePolicy, QVBoxLayout
+
+    _pr_id, doctor_sugg, med_text, visit_date, dispense, name, patient_id = row
+    card = QFrame()
+    card.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Minimum)
+    card.setStyleSheet("""
+        QFrame { border: 1px solid rgba(0,0,0,0.08); border-radius: 10px; background-color: #FFFFFF; }
+    """)
+    lay = QVBoxLayout(card)
+    lay.setContentsMargins(12, 12, 12, 12)
+    med_label = QLabel(f"<b>Medication:</b> {med_text}")
+    med_label.setFont(QFont("Segoe UI", 10))
+    info_label = QLabel(
+        f"Patient: {name} (ID: {patient_id})\nDoctor Suggestion: {doctor_sugg}\n"
+        f"Dispense Status: {'Active' if dispense else 'Dispensed'}\nVisit Date: {visit_date}"
+    )
+    info_label.setFont(QFont("Segoe UI", 9))
+    info_label.setStyleSheet("color: #555;")
+    btn = QPushButton("Dispense")
+    btn.setCursor(Qt.PointingHandCursor)
+    btn.setStyleSheet("""
+        QPushButton { background-color: #28a745; color: white; border-radius: 8px;
+                      font-weight: 600; padding: 4px 10px; }
+        QPushButton:hover { background-color: #218838; }
+        QPushButton:pressed { background-color: #1e7e34; }
+    """)
+    lay.addWidget(med_label)
+    lay.addWidget(info_label)
+    lay.addWidget(btn, alignment=Qt.AlignRight)
+    return card
+
+
+def build_cards(rows):
+    from PyQt5.QtWidgets import QScrollArea, QVBoxLayout, QWidget
+
+    area = QScrollArea()
+    area.setWidgetResizable(True)
+    content = QWidget()
+    col = QVBoxLayout(content)
+    col.addStretch(1)
+    for row in rows:
+        col.insertWidget(col.count() - 1, legacy_card(row))
+    area.setWidget(content)
+    return area, area.verticalScrollBar()
+
+
+def build_model(rows):
+    from ..views.pharma_list import PrescriptionListView
+
+    view = PrescriptionListView()
+    view.list_model.set_rows(rows)
+    return view, view.verticalScrollBar()
+
+
+# ---------------- one measurement (child process) ----------------
+def measure(variant, count):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication([])
+    rows = synthetic_rows(count)
+    widgets_before = len(QApplication.allWidgets())
+    rss_before = rss_mb()
+
+    start = time.perf_counter()
+    root, scrollbar = (build_cards if variant == "cards" else build_model)(rows)
+    root.resize(480, 640)
+    root.show()
+    app.processEvents()
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    root.repaint()
+    first_ms = (time.perf_counter() - start) * 1000
+
+    steps = 20
+    start = time.perf_counter()
+    for i in range(1, steps + 1):
+        scrollbar.setValue(scrollbar.maximum() * i // steps)
+        app.processEvents()
+        root.repaint()
+    scroll_ms = (time.perf_counter() - start) * 1000 / steps
+
+    return {
+        "variant": variant,
+        "rows": count,
+        "widgets": len(QApplication.allWidgets()) - widgets_before,
+        "rss_mb": round(rss_mb() - rss_before, 1),
+        "build_ms": round(build_ms, 1),
+        "first_ms": round(first_ms, 2),
+        "scroll_ms": round(scroll_ms, 2),
+    }
+
+
+def run_child(variant, count):
+    out = subprocess.run(
+        [sys.executable, "-m", "imhotep.tools.pharma_list_bench", "--child", variant, "--rows", str(count)],
+        capture_output=True, text=True, check=True,
+        cwd=Path(__file__).resolve().parents[2],        # imhotep_app/, so -m finds the package
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="list sizes to measure (default: %(default)s)")
+    parser.add_argument("--max-card-rows", type=int, default=10000,
+                        help="skip the widget-per-card variant above this many rows")
+    parser.add_argument("--child", choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.rows[0])))
+        return 0
+
+    print(f"{'variant':<8} {'rows':>7} {'widgets':>8} {'rss MB':>8} {'build ms':>9} {'first ms':>9} {'scroll ms':>10}")
+    for count in args.rows:
+        for variant in VARIANTS:
+            if variant == "cards" and count > args.max_card_rows:
+                print(f"{variant:<8} {count:>7}  (skipped, over --max-card-rows)")
+                continue
+            r = run_child(variant, count)
+            print(f"{r['variant']:<8} {r['rows']:>7} {r['widgets']:>8} {r['rss_mb']:>8} "
+                  f"{r['build_ms']:>9} {r['first_ms']:>9} {r['scroll_ms']:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
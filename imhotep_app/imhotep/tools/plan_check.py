@@ -0,0 +1,120 @@
+# imhotep/tools/plan_check.py
+"""
+Query plan regression check.
+
+Runs EXPLAIN on every statement in queries.PLAN_CHECKS and fails (exit code 1)
+if one of them falls back to a full table scan or a filesort. On the SQLite
+backend the same checks run through EXPLAIN QUERY PLAN.
+
+    python -m imhotep.tools.plan_check                  # check only
+    python -m imhotep.tools.plan_check --ensure-indexes # create missing indexes first
+
+Run it against a database with realistic volume: on a table with a handful of
+rows MySQL happily prefers a full scan, which says nothing about production.
+"""
+import argparse
+import sys
+
+from ..db.connection import backend_name, connection, cursor
+from ..db.queries import PLAN_CHECKS
+from ..db.schema import ensure_columns, ensure_indexes, ensure_tables
+
+
+def explain(conn, sql, params):
+    prefix = "EXPLAIN QUERY PLAN " if backend_name() == "sqlite" else "EXPLAIN "
+    with cursor(conn) as cur:
+        cur.execute(prefix + sql, params)
+        cols = [d[0].lower() for d in cur.description]
+        return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+def sqlite_plan_problems(plan):
+    """
+    Full scans / temp-b-tree sorts in an SQLite EXPLAIN QUERY PLAN result.
+    "SCAN t USING [COVERING] INDEX ..." walks an index in order, which is fine;
+    a bare "SCAN t" is a table scan.
+    """
+    problems = []
+    for row in plan:
+        detail = row.get("detail") or ""
+        # "SCAN t VIRTUAL TABLE INDEX n:M..." is an FTS5 MATCH lookup, not a table scan
+        if detail.startswith("SCAN ") and " USING " not in detail and " VIRTUAL TABLE INDEX " not in detail:
+            problems.append(f"full scan ({detail})")
+        if "USE TEMP B-TREE" in detail:
+            problems.append(f"sort ({detail})")
+    return problems
+
+
+def sqlite_plan_keys(plan):
+    keys = []
+    for row in plan:
+        detail = row.get("detail") or ""
+        if "PRIMARY KEY" in detail:
+            keys.append("PRIMARY")
+        elif " INDEX " in detail:
+            keys.append(detail.split(" INDEX ", 1)[1].split(" ")[0])
+    return keys or ["None"]
+
+
+def plan_problems(plan):
+    """Full scans / filesorts in a MySQL EXPLAIN result."""
+    if backend_name() == "sqlite":
+        return sqlite_plan_problems(plan)
+    problems = []
+    for row in plan:
+        table = row.get("table")
+        extra = row.get("extra") or ""
+        if (row.get("type") or "").upper() == "ALL":
+            problems.append(f"full scan of {table}")
+        if "filesort" in extra.lower():
+            problems.append(f"filesort on {table}")
+    return problems
+
+
+def run_checks(checks=PLAN_CHECKS, out=sys.stdout):
+    failures = 0
+    with connection() as conn:
+        for check in checks:
+            if check.backend and check.backend != backend_name():
+                continue
+            plan = explain(conn, check.sql, check.params)
+            problems = plan_problems(plan)
+            if not problems:
+                status = "ok"
+            elif check.allow_scan:
+                status = f"allowed ({check.note})"
+            else:
+                status = "FAIL: " + "; ".join(problems)
+                failures += 1
+            if backend_name() == "sqlite":
+                keys = ", ".join(sqlite_plan_keys(plan))
+            else:
+                keys = ", ".join(str(r.get("key")) for r in plan)
+            print(f"{check.name:<38} key={keys:<40} {status}", file=out)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ensure-indexes", action="store_true",
+                        help="bring the schema up to date (schema.TABLES, COLUMNS, INDEXES) before checking")
+    args = parser.parse_args(argv)
+
+    if args.ensure_indexes:
+        for name in ensure_tables():
+            print(f"created {name}")
+        for name in ensure_columns():
+            print(f"added column {name}")
+        for name in ensure_indexes():
+            print(f"created index {name}")
+
+    failures = run_checks()
+    if failures:
+        print(f"\n{failures} quer{'y' if failures == 1 else 'ies'} regressed to a full scan or filesort")
+        return 1
+    print("\nall query plans use indexes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,356 @@
+# imhotep/tools/synth_data.py
+"""
+Synthetic clinic data for scale testing.
+
+    python -m imhotep.tools.synth_data --truncate                     # 200 patients, 20k prescriptions
+    python -m imhotep.tools.synth_data --truncate --doctors 200 --pharmacists 80 \\
+        --patients 500000 --prescriptions 5000000 --seed 7
+
+Fills `user`, `prescription`, `doctor_portal`, `patient_portal` and
+`pharmacist_portal` on whatever database .env points at (DB_BACKEND,
+DB_SQLITE_PATH, ...). The same --seed and sizes give the same rows, hashes
+included, so benchmark runs on different days or machines are comparable.
+Without --truncate the new rows go above the current MAX(User_ID) / MAX(Pr_ID).
+
+What the data looks like:
+
+- users: doctors, then pharmacists, then patients, numbered from --first-user-id.
+  The password of user `uid` is password_for(uid), its recovery answer
+  match_for(uid). Only --distinct-passwords of each are hashed (in parallel,
+  at --bcrypt-cost), so millions of users cost seconds, not days.
+- visits per patient are log-normally skewed (--skew): most patients come a
+  few times, a handful have hundreds of visits, some never came.
+- Visit_Date spreads over --years up to --end-date, weekdays busier than
+  weekends and the clinic slowly growing. About 2% of rows have no date,
+  like the ones the doctor portal saves; they carry the highest Pr_IDs.
+- Dispense: recent prescriptions are mostly active, older ones mostly
+  dispensed (ACTIVE_BY_AGE). --claim-rate of the active ones are claimed in
+  pharmacist_portal with leases that have long run out.
+- texts: notes of one to a dozen sentences, one to five medication lines,
+  drawn from TEXT_POOL seeded variants of each.
+
+Rows are bulk-loaded in batches of --batch rows, one transaction each, with
+executemany: pymysql folds that into multi-row INSERTs, SQLite runs it as
+one prepared statement. The change-feed triggers are dropped for the load and
+put back afterwards (a generated history is not "news"), and on SQLite the
+secondary indexes and the search index are rebuilt once at the end.
+"""
+import argparse
+import bisect
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+from typing import NamedTuple
+
+from ..db.connection import backend_name, connection, cursor, fetch_one, transaction
+from ..db.hashing import hash_secret
+from ..db.schema import INDEXES, SQLITE_FTS_REBUILD, SQLITE_FTS_TRIGGERS, TRIGGERS, init_sqlite, trigger_ddl
+
+DEFAULT_END_DATE = date(2025, 12, 31)   # fixed, so the data does not depend on the day it is generated
+UNDATED_SHARE = 0.02
+WEEKDAY_WEIGHT = (1.0, 1.0, 1.0, 1.0, 0.9, 0.5, 0.15)      # Monday .. Sunday
+GROWTH = 0.5                            # the last day is this much busier than the first
+# (max age in days, chance the prescription is still active); undated rows count as new
+ACTIVE_BY_AGE = ((7, 0.9), (30, 0.6), (180, 0.15), (math.inf, 0.03))
+PRIMARY_DOCTOR_SHARE = 0.8
+TEXT_POOL = 4096                        # distinct notes / medication lists drawn from per run
+
+_BCRYPT_ALPHABET = "./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+
+FIRST_NAMES = ("Amina", "Ben", "Carlos", "Dalia", "Elif", "Farid", "Grace", "Hiro", "Ines", "Jamal",
+               "Kofi", "Lena", "Mei", "Nadia", "Omar", "Priya", "Quinn", "Rosa", "Samir", "Tariq",
+               "Uma", "Victor", "Wen", "Ximena", "Yusuf", "Zara")
+LAST_NAMES = ("Ahmed", "Brown", "Chowdhury", "Diaz", "Evans", "Fischer", "Garcia", "Hossain", "Ito",
+              "Johnson", "Khan", "Lopez", "Mensah", "Nguyen", "Okafor", "Patel", "Rahman", "Silva",
+              "Tanaka", "Uddin", "Volkov", "Williams", "Yilmaz", "Zhang")
+COMPLAINTS = ("Headache and mild fever.", "Sore throat and cough.", "High blood pressure follow-up.",
+              "Seasonal allergy and sneezing.", "Lower back pain after lifting.", "Mild flu and fatigue.",
+              "Type 2 diabetes review.", "Skin rash on both forearms.", "Recurring acid reflux.",
+              "Shortness of breath on exertion.", "Sprained left ankle.", "Trouble sleeping for two weeks.")
+ADVICE = ("Rest and drink plenty of fluids.", "Review in two weeks.", "Avoid heavy and spicy meals.",
+          "Monitor blood pressure daily and keep a log.", "Light exercise, thirty minutes a day.",
+          "Return at once if the fever goes above 39 degrees.", "Reduce salt and sugar intake.",
+          "Blood test before the next visit.", "Keep the affected area clean and dry.",
+          "Stop smoking; offered a referral to the cessation clinic.", "Continue the current dose.",
+          "Physiotherapy referral given.", "Use a cold compress three times a day.")
+DRUGS = ("Paracetamol 500mg", "Amoxicillin 250mg", "Ibuprofen 400mg", "Omeprazole 20mg", "Metformin 850mg",
+         "Cetirizine 10mg", "Salbutamol inhaler", "Amlodipine 5mg", "Atorvastatin 10mg", "Vitamin D 1000IU",
+         "Azithromycin 500mg", "Losartan 50mg", "Hydrocortisone cream 1%", "Melatonin 3mg")
+DOSES = ("once a day", "twice a day", "three times a day", "at night", "when needed, max 4 a day")
+
+
+class Summary(NamedTuple):
+    doctors: range                  # User_IDs
+    pharmacists: range
+    patients: range
+    prescriptions: range            # Pr_IDs
+    busiest_patient: int            # User_ID with the most visits
+    seconds: float
+
+
+def password_for(user_id, distinct=64):
+    return f"Synth-Passw0rd-{user_id % distinct}"
+
+
+def match_for(user_id, distinct=64):
+    return f"synth-answer-{user_id % distinct}"
+
+
+def bcrypt_salt(rng, cost):
+    # 22 base-64 characters; the last one only carries 2 bits, so it must be one of ".Oeu"
+    chars = "".join(rng.choice(_BCRYPT_ALPHABET) for _ in range(21)) + rng.choice(".Oeu")
+    return f"$2b${cost:02d}${chars}"
+
+
+def hash_table(rng, secrets, cost, workers):
+    """{secret: hash} for the distinct secrets, hashed on a process pool with seeded salts."""
+    secrets = list(dict.fromkeys(secrets))
+    salts = [bcrypt_salt(rng, cost) for _ in secrets]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        hashes = list(pool.map(hash_secret, secrets, [cost] * len(secrets), salts, chunksize=4))
+    return dict(zip(secrets, hashes))
+
+
+# ---------------- row generators ----------------
+def person_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def doctor_note(rng):
+    sentences = max(1, min(12, round(rng.lognormvariate(0.9, 0.6))))
+    return " ".join([rng.choice(COMPLAINTS)] + [rng.choice(ADVICE) for _ in range(sentences - 1)])
+
+
+def prescription_text(rng):
+    lines = rng.choices((1, 2, 3, 4, 5), weights=(30, 35, 20, 10, 5))[0]
+    return "\n".join(f"{drug}, {rng.choice(DOSES)}, {rng.choice((3, 5, 7, 10, 14, 30))} days"
+                     for drug in rng.sample(DRUGS, lines))
+
+
+def active_chance(age_days):
+    for max_age, chance in ACTIVE_BY_AGE:
+        if age_days <= max_age:
+            return chance
+    return ACTIVE_BY_AGE[-1][1]
+
+
+def visits_per_day(rng, total, first_day, days):
+    """Exactly `total` visits spread over the days: weekday pattern, growth, remainder drawn at random."""
+    weights = [WEEKDAY_WEIGHT[(first_day + timedelta(days=d)).weekday()] * (1 + GROWTH * d / max(1, days - 1))
+               for d in range(days)]
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    cum = list(accumulate(weights))
+    for _ in range(total - sum(counts)):
+        counts[bisect.bisect_right(cum, rng.random() * cum[-1])] += 1
+    return counts
+
+
+# ---------------- loading ----------------
+def _insert(sql, rows, batch):
+    for start in range(0, len(rows), batch):
+        with transaction() as conn:
+            with cursor(conn) as cur:
+                cur.executemany(sql, rows[start:start + batch])
+
+
+def _next_id(sql):
+    row = fetch_one(sql, as_dict=False)
+    return (row[0] or 0) + 1 if row else 1
+
+
+def _set_triggers(enabled):
+    sqlite = backend_name() == "sqlite"
+    with connection() as conn:
+        with cursor(conn) as cur:
+            for trigger in TRIGGERS:
+                cur.execute(f"DROP TRIGGER IF EXISTS `{trigger.name}`")
+                if enabled:
+                    cur.execute(trigger_ddl(trigger, sqlite=sqlite))
+            if sqlite and not enabled:
+                # the search index is rebuilt in one go afterwards (init_sqlite restores these)
+                for name, _ in SQLITE_FTS_TRIGGERS:
+                    cur.execute(f"DROP TRIGGER IF EXISTS `{name}`")
+        conn.commit()
+
+
+def _drop_sqlite_indexes():
+    with connection() as conn:
+        for ix in INDEXES:
+            if not ix.unique:                       # the claim upsert needs the unique one
+                conn.execute(f"DROP INDEX IF EXISTS `{ix.name}`")
+        conn.commit()
+
+
+def _rebuild_sqlite_indexes():
+    with connection() as conn:
+        init_sqlite(conn)
+        conn.execute(SQLITE_FTS_REBUILD)
+        conn.execute("ANALYZE")
+        conn.commit()
+
+
+def truncate():
+    tables = ("pharmacist_portal", "patient_portal", "doctor_portal", "prescription", "user",
+              "prescription_change")
+    with connection() as conn:
+        with cursor(conn) as cur:
+            for table in tables:
+                if backend_name() == "sqlite":
+                    cur.execute(f"DELETE FROM `{table}`")
+                else:
+                    cur.execute(f"TRUNCATE TABLE `{table}`")
+        conn.commit()
+
+
+def generate(doctors=5, pharmacists=3, patients=200, prescriptions=20000, seed=1,
+             years=3, end_date=DEFAULT_END_DATE, skew=1.0, claim_rate=0.01,
+             first_user_id=None, bcrypt_cost=10, distinct_passwords=64, batch=5000,
+             workers=None, do_truncate=False, log=print):
+    """Generate and load one data set; returns a Summary."""
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    sqlite = backend_name() == "sqlite"
+
+    _set_triggers(False)
+    try:
+        if do_truncate:
+            truncate()
+        if sqlite:
+            _drop_sqlite_indexes()
+
+        # ---- users ----
+        first = first_user_id or _next_id("SELECT MAX(User_ID) FROM `user`")
+        doctor_ids = range(first, first + doctors)
+        pharmacist_ids = range(doctor_ids.stop, doctor_ids.stop + pharmacists)
+        patient_ids = range(pharmacist_ids.stop, pharmacist_ids.stop + patients)
+        all_ids = range(first, patient_ids.stop)
+
+        log(f"hashing {distinct_passwords} passwords + answers at cost {bcrypt_cost}")
+        secrets = [password_for(i, distinct_passwords) for i in range(distinct_passwords)]
+        secrets += [match_for(i, distinct_passwords) for i in range(distinct_passwords)]
+        hashed = hash_table(rng, secrets, bcrypt_cost, workers or min(8, os.cpu_count() or 1))
+
+        names = {uid: ("Dr. " if uid in doctor_ids else "") + person_name(rng) for uid in all_ids}
+        log(f"loading {len(all_ids)} users")
+        _insert("INSERT INTO `user` (`User_ID`, `User_Name`, `Password`, `match`) VALUES (%s, %s, %s, %s)",
+                [(uid, names[uid], hashed[password_for(uid, distinct_passwords)],
+                  hashed[match_for(uid, distinct_passwords)]) for uid in all_ids], batch)
+
+        # ---- prescriptions, oldest first ----
+        # log-normal visit weight per patient; a primary doctor each
+        cum_weights = list(accumulate(rng.lognormvariate(0, skew) for _ in patient_ids))
+        primary = [rng.choice(doctor_ids) for _ in patient_ids] if doctors else []
+        first_day = end_date - timedelta(days=round(365.25 * years) - 1)
+        days = (end_date - first_day).days + 1
+        undated = round(prescriptions * UNDATED_SHARE)
+        per_day = visits_per_day(rng, prescriptions - undated, first_day, days)
+        per_day.append(undated)                     # the undated ones come last
+
+        # composing text per row is most of the CPU time; draw from seeded pools instead
+        notes = [doctor_note(rng) for _ in range(TEXT_POOL)]
+        medications = [prescription_text(rng) for _ in range(TEXT_POOL)]
+        pick = rng.randrange
+
+        pr_id = first_pr = _next_id("SELECT MAX(Pr_ID) FROM prescription")
+        visits = Counter()
+        latest = {}                                 # patient -> (Pr_ID, note) of the newest visit
+        pr_rows, doctor_rows, claim_rows = [], [], []
+        lease = datetime.combine(end_date, datetime.min.time())
+        log(f"loading {prescriptions} prescriptions over {days} days")
+        for day, count in enumerate(per_day):
+            visit_date = first_day + timedelta(days=day) if day < days else None
+            chance = active_chance((end_date - visit_date).days if visit_date else 0)
+            for index in rng.choices(range(patients), cum_weights=cum_weights, k=count) if patients else ():
+                patient = patient_ids[index]
+                note = notes[pick(TEXT_POOL)]
+                active = rng.random() < chance
+                pr_rows.append((pr_id, patient, note, medications[pick(TEXT_POOL)], visit_date, int(active)))
+                if doctors:
+                    doctor = primary[index] if rng.random() < PRIMARY_DOCTOR_SHARE else rng.choice(doctor_ids)
+                    doctor_rows.append((doctor, None if sqlite else doctor, patient, names[doctor], pr_id))
+                if active and pharmacists and rng.random() < claim_rate:
+                    pharmacist = rng.choice(pharmacist_ids)
+                    claim_rows.append((pharmacist, None if sqlite else pharmacist, patient, pr_id,
+                                       lease - timedelta(minutes=rng.randrange(60 * 24 * 30))))
+                visits[patient] += 1
+                latest[patient] = (pr_id, note)
+                pr_id += 1
+            if len(pr_rows) >= batch or day == len(per_day) - 1:
+                _flush(pr_rows, doctor_rows, claim_rows, batch)
+
+        # ---- one patient_portal row per patient, pointing at the newest visit ----
+        log(f"loading {patients} patient_portal rows")
+        _insert("INSERT INTO `patient_portal` (`Patient_ID`, `User_ID`, `User_Name`, `Doctor_sugg`, `Pr_ID`) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                [(uid, uid, names[uid], *latest.get(uid, (None, None))[::-1]) for uid in patient_ids], batch)
+    finally:
+        _set_triggers(True)
+        if sqlite:
+            log("building indexes")
+            _rebuild_sqlite_indexes()
+
+    busiest = visits.most_common(1)[0][0] if visits else (patient_ids[0] if patients else None)
+    return Summary(doctor_ids, pharmacist_ids, patient_ids, range(first_pr, pr_id), busiest,
+                   time.perf_counter() - started)
+
+
+def _flush(pr_rows, doctor_rows, claim_rows, batch):
+    _insert("INSERT INTO prescription (Pr_ID, Patient_ID, Doctor_Sugg, Prescription, Visit_Date, Dispense) "
+            "VALUES (%s, %s, %s, %s, %s, %s)", pr_rows, batch)
+    _insert("INSERT INTO `doctor_portal` (`User_ID`, `doctor_ID`, `Patient_ID`, `Doctor_Name`, `Pr_ID`) "
+            "VALUES (%s, %s, %s, %s, %s)", doctor_rows, batch)
+    _insert("INSERT INTO `pharmacist_portal` (`User_ID`, `Pharma_ID`, `Patient_UID`, `Pr_ID`, `Lease_Until`) "
+            "VALUES (%s, %s, %s, %s, %s)", claim_rows, batch)
+    for rows in (pr_rows, doctor_rows, claim_rows):
+        rows.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doctors", type=int, default=5)
+    parser.add_argument("--pharmacists", type=int, default=3)
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--prescriptions", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--years", type=float, default=3, help="Visit_Date spread (default: %(default)s)")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=DEFAULT_END_DATE,
+                        help="newest Visit_Date (default: %(default)s)")
+    parser.add_argument("--skew", type=float, default=1.0,
+                        help="sigma of the log-normal visits-per-patient weight; 0 = uniform")
+    parser.add_argument("--claim-rate", type=float, default=0.01, help="share of active rows with a claim")
+    parser.add_argument("--first-user-id", type=int, help="default: above the current MAX(User_ID)")
+    parser.add_argument("--bcrypt-cost", type=int, default=10)
+    parser.add_argument("--distinct-passwords", type=int, default=64)
+    parser.add_argument("--batch", type=int, default=5000, help="rows per INSERT batch / transaction")
+    parser.add_argument("--workers", type=int, help="hashing processes (default: CPUs, at most 8)")
+    parser.add_argument("--truncate", action="store_true",
+                        help="empty the five tables (and the change log) first")
+    args = parser.parse_args(argv)
+
+    summary = generate(
+        doctors=args.doctors, pharmacists=args.pharmacists, patients=args.patients,
+        prescriptions=args.prescriptions, seed=args.seed, years=args.years, end_date=args.end_date,
+        skew=args.skew, claim_rate=args.claim_rate, first_user_id=args.first_user_id,
+        bcrypt_cost=args.bcrypt_cost, distinct_passwords=args.distinct_passwords, batch=args.batch,
+        workers=args.workers, do_truncate=args.truncate,
+    )
+    rate = len(summary.prescriptions) / summary.seconds if summary.seconds else 0
+    print(f"doctors     {summary.doctors.start}..{summary.doctors.stop - 1}")
+    print(f"pharmacists {summary.pharmacists.start}..{summary.pharmacists.stop - 1}")
+    print(f"patients    {summary.patients.start}..{summary.patients.stop - 1} "
+          f"(busiest: {summary.busiest_patient})")
+    print(f"Pr_IDs      {summary.prescriptions.start}..{summary.prescriptions.stop - 1}")
+    print(f"done in {summary.seconds:.1f} s ({rate:,.0f} prescriptions/s); "
+          "passwords: password_for(User_ID) in imhotep.tools.synth_data")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,410 @@
+# imhotep/tools/ui_bench.py
+"""
+Headless end-to-end benchmark of the real Router.
+
+    python -m imhotep.tools.ui_bench                    # 3 runs, compared with bench_baseline.json
+    python -m imhotep.tools.ui_bench --save-baseline    # make this run the new baseline
+    python -m imhotep.tools.ui_bench --runs 5 --patients 500 --prescriptions 50000 --out run.json
+
+Every run is a fresh interpreter with QT_QPA_PLATFORM=offscreen and
+DB_BACKEND=sqlite on a temporary database filled by synth_data.generate()
+(same --seed, same data); the doctor loads the busiest patient. The flows are driven with QTest clicks and key presses:
+
+    startup               Router built and shown, up to the selection screen's first paint
+    open_login            click "Doctor"
+    doctor_login          type the credentials, click "Log In", portal ready
+    doctor_load_patient   type a Patient ID, click "Load Patient", history shown
+    doctor_save           type notes + prescription, click Save, history patched
+    pharmacist_login      log out, back to selection, "Pharmacist", log in
+    pharmacist_load_all   click "Load Prescription(s)" with an empty ID, first page shown
+    pharmacist_dispense   click the first card's Dispense button, card gone
+    patient_login         log out, back to selection, "Patient", log in, dashboard shown
+
+Recorded per step (median over --runs):
+
+- wall_ms       from the first input event until the step's end condition holds
+- round_trips   fetch_one/fetch_all/execute/execute_many calls and other
+                transaction() blocks (work queue) from any thread
+- stall_ms      time the GUI thread could not service its event loop (a 5 ms
+                timer that fires more than STALL_SLACK_MS late counts the lateness)
+- max_stall_ms  the longest single stall
+- rss_mb        resident memory after the step
+
+Results go to --out as JSON. If the baseline file exists the run is compared
+with it and the exit code is 1 on a regression: more round trips than the
+baseline, or wall/stall/RSS above it by more than --tolerance (and a small
+absolute margin, so a 3 ms step does not fail on noise). Timings are only
+comparable on the same machine; keep the baseline out of version control.
+
+Message boxes are answered automatically; a critical one fails the run. The
+change poller is slowed to once an hour so its timer does not add round trips.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from ..db.config import APP_DIR
+from .pharma_list_bench import rss_mb
+from .synth_data import generate, password_for
+
+DEFAULT_BASELINE = APP_DIR / "bench_baseline.json"
+STEP_TIMEOUT_MS = 30000
+STALL_TICK_MS = 5
+STALL_SLACK_MS = 10
+
+METRICS = ("wall_ms", "round_trips", "stall_ms", "max_stall_ms", "rss_mb")
+ABS_MARGIN = {"wall_ms": 25.0, "stall_ms": 25.0, "max_stall_ms": 25.0, "rss_mb": 10.0}
+
+
+# ---------------- one run (child process) ----------------
+class StallMeter:
+    """Lateness of a STALL_TICK_MS timer on the GUI thread, summed over ticks late by > STALL_SLACK_MS."""
+
+    def __init__(self):
+        from PyQt5.QtCore import Qt, QTimer
+
+        self.total_ms = self.max_ms = 0.0
+        self._last = time.perf_counter()
+        self._timer = QTimer()
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.setInterval(STALL_TICK_MS)
+        self._timer.timeout.connect(self._tick)
+        self._timer.start()
+
+    def reset(self):
+        self.total_ms = self.max_ms = 0.0
+        self._last = time.perf_counter()
+
+    def _tick(self):
+        now = time.perf_counter()
+        late = (now - self._last) * 1000 - STALL_TICK_MS
+        self._last = now
+        if late > STALL_SLACK_MS:
+            self.total_ms += late
+            self.max_ms = max(self.max_ms, late)
+
+
+class Flow:
+    def __init__(self, queries):
+        from PyQt5.QtWidgets import QMessageBox
+
+        self.queries = queries                  # connection.QueryCount for every thread
+        self.steps = []
+        self.dialogs = []
+        self.stalls = StallMeter()
+        self.router = None
+
+        def answer(kind):
+            def dialog(parent, title, text, *args, **kwargs):
+                self.dialogs.append((kind, title, text))    # raising here would abort PyQt
+                return QMessageBox.Ok
+            return staticmethod(dialog)
+
+        for kind in ("information", "warning", "critical", "question"):
+            setattr(QMessageBox, kind, answer(kind))
+
+    # ---------------- helpers ----------------
+    def wait_until(self, condition, name, timeout_ms=STEP_TIMEOUT_MS):
+        from PyQt5.QtTest import QTest
+
+        deadline = time.perf_counter() + timeout_ms / 1000
+        while not condition():
+            self._check_dialogs(name)
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"step {name!r} did not finish within {timeout_ms} ms")
+            QTest.qWait(1)
+        self._check_dialogs(name)
+
+    def _check_dialogs(self, name):
+        for kind, title, text in self.dialogs:
+            if kind == "critical":
+                raise RuntimeError(f"step {name!r}: {title}: {text}")
+
+    def step(self, name, action, done):
+        from PyQt5.QtTest import QTest
+
+        QTest.qWait(50)                         # let the previous step's stragglers settle
+        self.stalls.reset()
+        before = self.queries.count
+        start = time.perf_counter()
+        action()
+        self.wait_until(done, name)
+        wall_ms = (time.perf_counter() - start) * 1000
+        QTest.qWait(STALL_TICK_MS * 2)          # give the meter a tick after the last synchronous work
+        self.steps.append({
+            "step": name,
+            "wall_ms": round(wall_ms, 1),
+            "round_trips": self.queries.count - before,
+            "stall_ms": round(self.stalls.total_ms, 1),
+            "max_stall_ms": round(self.stalls.max_ms, 1),
+            "rss_mb": round(rss_mb(), 1),
+        })
+
+    def click(self, widget):
+        from PyQt5.QtCore import Qt
+        from PyQt5.QtTest import QTest
+
+        QTest.mouseClick(widget, Qt.LeftButton)
+
+    def type_into(self, widget, text):
+        from PyQt5.QtTest import QTest
+
+        widget.clear()
+        QTest.keyClicks(widget, text)
+
+    def button(self, parent, text):
+        from PyQt5.QtWidgets import QPushButton
+
+        for btn in parent.findChildren(QPushButton):
+            if btn.text().strip() == text:
+                return btn
+        raise LookupError(f"no {text!r} button in {type(parent).__name__}")
+
+    def current(self):
+        return self.router.stack.currentWidget()
+
+    def type_credentials(self, user_id):
+        login = self.router.login
+        self.type_into(login.unique_code, str(user_id))
+        self.type_into(login.password, password_for(user_id, distinct=1))
+        self.click(login.login_btn)
+
+    def log_in(self, role, user_id):
+        self.click(self.button(self.router.selection, role.capitalize()))
+        self.type_credentials(user_id)
+
+    def back_to_selection(self, logout_button):
+        self.click(logout_button)
+        self.click(self.router.login.back_btn)
+
+    # ---------------- the flows ----------------
+    def run(self, data):
+        from .. import app as app_module
+        from ..router import Router
+
+        painted = []
+
+        def start():
+            self.router = Router()
+            self.router.first_paint.connect(lambda: painted.append(True))
+            self.router.first_paint.connect(lambda: app_module._warm_up(self.router))
+            self.router.show()
+
+        self.step("startup", start, lambda: painted)
+        router = self.router
+
+        self.step("open_login", lambda: self.click(self.button(router.selection, "Doctor")),
+                  lambda: self.current() is router.login)
+
+        self.step("doctor_login", lambda: self.type_credentials(data.doctors[0]),
+                  lambda: self.current() is router.doctor and not router.doctor._executor.is_busy())
+        doctor = router.doctor
+
+        def load_patient():
+            self.type_into(doctor.uid_input, str(data.busiest_patient))
+            self.click(doctor.load_btn)
+
+        self.step("doctor_load_patient", load_patient,
+                  lambda: not doctor._executor.is_busy() and doctor.history_view.list_model.rowCount() > 0)
+
+        rows_before = []
+
+        def save():
+            rows_before.append(doctor.history_view.list_model.rowCount())
+            doctor.current_edit_prescription_id = None          # a new record, not an edit
+            self.type_into(doctor.notes_edit, "Follow-up visit. Symptoms improving.")
+            self.type_into(doctor.prescription_edit, "Paracetamol 500mg x2/day")
+            self.click(doctor.save_btn)
+
+        self.step("doctor_save", save,
+                  lambda: doctor.save_btn.isEnabled() and not doctor._executor.is_busy()
+                  and doctor.history_view.list_model.rowCount() > rows_before[0])
+
+        def pharmacist_login():
+            self.back_to_selection(doctor.logout_btn)
+            self.log_in("pharmacist", data.pharmacists[0])
+
+        self.step("pharmacist_login", pharmacist_login,
+                  lambda: self.current() is router.pharmacist and not router.pharmacist._executor.is_busy())
+        pharma = router.pharmacist
+        model = pharma.list_view.list_model
+
+        def load_all():
+            pharma.input_uid.clear()
+            self.click(self.button(pharma, "Load Prescription(s)"))
+
+        self.step("pharmacist_load_all", load_all,
+                  lambda: not pharma._executor.is_busy() and model.rowCount() > 0)
+
+        dispensed = []
+
+        def dispense():
+            from PyQt5.QtCore import Qt
+            from PyQt5.QtTest import QTest
+
+            view = pharma.list_view
+            dispensed.append(model.row_at(0)[0])
+            button = view.card_delegate.button_rect(view.visualRect(model.index(0)))
+            QTest.mouseClick(view.viewport(), Qt.LeftButton, Qt.NoModifier, button.center())
+
+        self.step("pharmacist_dispense", dispense,
+                  lambda: model.position_of(dispensed[0]) < 0 and not pharma._executor.is_busy())
+
+        def patient_login():
+            self.back_to_selection(self.button(pharma, "Log Out"))
+            self.log_in("patient", data.busiest_patient)
+
+        self.step("patient_login", patient_login,
+                  lambda: self.current() is router.patient and not router.patient._executor.is_busy()
+                  and router.patient.patient_info.text() != "Loading…")
+        return self.steps
+
+
+def run_once(args):
+    """One measured run in this process; returns the step list."""
+    workdir = tempfile.mkdtemp(prefix="imhotep-bench-")
+    db_path = os.path.join(workdir, "bench.db")
+    os.environ.update({
+        "QT_QPA_PLATFORM": os.environ.get("QT_QPA_PLATFORM", "offscreen"),
+        "DB_BACKEND": "sqlite",
+        "DB_SQLITE_PATH": db_path,
+        "BCRYPT_COST": str(args.bcrypt_cost),       # no calibration or rehash mid-run
+        "CHANGE_POLL_MS": "3600000",
+        "SLOW_QUERY_LOG": os.path.join(workdir, "slow_queries.jsonl"),
+    })
+    data = generate(doctors=1, pharmacists=1, patients=args.patients, prescriptions=args.prescriptions,
+                    seed=args.seed, first_user_id=1, bcrypt_cost=args.bcrypt_cost, distinct_passwords=1,
+                    log=lambda message: None)
+
+    from PyQt5.QtWidgets import QApplication
+
+    from ..db.connection import count_queries
+
+    app = QApplication.instance() or QApplication([])      # must outlive the run
+    try:
+        with count_queries(all_threads=True) as queries:
+            return Flow(queries).run(data)
+    finally:
+        from ..db.connection import close_pool
+        from ..db.hashing import get_hash_service
+        from ..executor import db_thread_pool
+
+        db_thread_pool().waitForDone(2000)
+        app.processEvents()         # results still queued for the GUI thread, before the pool closes
+        close_pool()
+        get_hash_service().shutdown()
+
+
+def run_child(args):
+    cmd = [sys.executable, "-m", "imhotep.tools.ui_bench", "--child",
+           "--patients", str(args.patients), "--prescriptions", str(args.prescriptions),
+           "--seed", str(args.seed), "--bcrypt-cost", str(args.bcrypt_cost)]
+    out = subprocess.run(cmd, capture_output=True, text=True, cwd=APP_DIR)
+    if out.returncode != 0:
+        raise RuntimeError(f"benchmark run failed:\n{out.stderr[-3000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+# ---------------- aggregate / compare ----------------
+def median_steps(runs):
+    """Per-step median of every metric across runs (all runs have the same steps)."""
+    merged = []
+    for same_step in zip(*runs):
+        row = {"step": same_step[0]["step"]}
+        for key in METRICS:
+            row[key] = round(statistics.median(s[key] for s in same_step), 1)
+        merged.append(row)
+    return merged
+
+
+def compare(steps, baseline_steps, tolerance):
+    """Regression messages: more round trips, or another metric over tolerance and its margin."""
+    baseline = {s["step"]: s for s in baseline_steps}
+    problems = []
+    for s in steps:
+        b = baseline.get(s["step"])
+        if b is None:
+            continue
+        if s["round_trips"] > b["round_trips"]:
+            problems.append(f"{s['step']}: round_trips {b['round_trips']} -> {s['round_trips']}")
+        for key, margin in ABS_MARGIN.items():
+            if s[key] > b[key] * (1 + tolerance) and s[key] - b[key] > margin:
+                problems.append(f"{s['step']}: {key} {b[key]} -> {s[key]}")
+    return problems
+
+
+def print_table(steps, baseline_steps=None):
+    baseline = {s["step"]: s for s in baseline_steps or ()}
+    print(f"{'step':<22} {'wall ms':>9} {'trips':>6} {'stall ms':>9} {'max stall':>10} {'rss MB':>8}")
+    for s in steps:
+        b = baseline.get(s["step"])
+        delta = f"   (baseline {b['wall_ms']} ms, {b['round_trips']} trips)" if b else ""
+        print(f"{s['step']:<22} {s['wall_ms']:>9} {s['round_trips']:>6} {s['stall_ms']:>9} "
+              f"{s['max_stall_ms']:>10} {s['rss_mb']:>8}{delta}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters; the median counts")
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--prescriptions", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--bcrypt-cost", type=int, default=10, help="cost of the seeded password hashes")
+    parser.add_argument("--out", type=Path, help="write the results JSON here")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE,
+                        help="compare with this results file (default: %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_once(args)))
+        return 0
+
+    steps = median_steps([run_child(args) for _ in range(max(1, args.runs))])
+    result = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": args.runs,
+            "patients": args.patients,
+            "prescriptions": args.prescriptions,
+            "seed": args.seed,
+            "bcrypt_cost": args.bcrypt_cost,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "steps": steps,
+    }
+    if args.out:
+        args.out.write_text(json.dumps(result, indent=2))
+
+    baseline = None
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text())
+    print_table(steps, baseline and baseline["steps"])
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(result, indent=2))
+        print(f"baseline saved to {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"no baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    problems = compare(steps, baseline["steps"], args.tolerance)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    if not problems:
+        print("no regressions against the baseline")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+# imhotep/views/card_list.py
+"""
+Building blocks for the virtualized card lists (pharmacist list, doctor history).
+
+- RowListModel: rows are plain tuples in a Python list; row[key_column] identifies one.
+- ButtonCardDelegate: paints a rounded card with one action button in the bottom
+  right corner and hit-tests clicks on it. Subclasses paint the body text.
+  Selected cards (if the view allows selection) get a highlighted outline.
+- CardListView: QListView preset for those delegates. Emits near_end() when the
+  user scrolls (or the list shrinks/grows) to within `prefetch_margin` px of the
+  last row, which is where the portals fetch their next page.
+
+Only rows inside the viewport are ever painted; nothing is allocated per row
+beyond the tuple itself.
+"""
+from bisect import bisect_right
+
+from PyQt5.QtCore import QAbstractListModel, QEvent, QModelIndex, QRect, QSize, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QPainter, QPen
+from PyQt5.QtWidgets import QAbstractItemView, QListView, QStyle, QStyledItemDelegate
+
+
+class RowListModel(QAbstractListModel):
+    key_column = 0
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+
+    # ---------------- Qt model API ----------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        return None
+
+    # ---------------- row access / edits ----------------
+    def row_at(self, position):
+        return self._rows[position]
+
+    def position_of(self, key):
+        for position, row in enumerate(self._rows):
+            if row[self.key_column] == key:
+                return position
+        return -1
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self._rows = list(rows)
+        self.endResetModel()
+
+    def append_rows(self, rows):
+        if not rows:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+
+    def insert_row(self, position, row):
+        self.beginInsertRows(QModelIndex(), position, position)
+        self._rows.insert(position, row)
+        self.endInsertRows()
+
+    def replace_row(self, row):
+        """Swap in a new version of the row with the same key; False if it isn't listed."""
+        position = self.position_of(row[self.key_column])
+        if position < 0:
+            return False
+        self._rows[position] = row
+        index = self.index(position)
+        self.dataChanged.emit(index, index)
+        return True
+
+    def upsert_sorted(self, row, sort_key, append=True):
+        """
+        Put `row` where it belongs in a list ordered by sort_key, replacing the
+        row with the same key (in place if its position doesn't change). A row
+        that would land after the last one is only added if `append`, i.e. when
+        the list isn't a prefix still being paged in. Returns True if listed.
+        """
+        position = self.position_of(row[self.key_column])
+        if position >= 0:
+            if sort_key(self._rows[position]) == sort_key(row):
+                return self.replace_row(row)
+            self.beginRemoveRows(QModelIndex(), position, position)
+            del self._rows[position]
+            self.endRemoveRows()
+        target = bisect_right([sort_key(r) for r in self._rows], sort_key(row))
+        if target == len(self._rows) and not append:
+            return False
+        self.insert_row(target, row)
+        return True
+
+    def clear(self):
+        self.set_rows([])
+
+    def remove_key(self, key):
+        """Drop the row with this key; returns False if it isn't in the list (any more)."""
+        position = self.position_of(key)
+        if position < 0:
+            return False
+        self.beginRemoveRows(QModelIndex(), position, position)
+        del self._rows[position]
+        self.endRemoveRows()
+        return True
+
+
+class ButtonCardDelegate(QStyledItemDelegate):
+    """Card background + one painted button; subclasses implement paint_body()."""
+
+    button_clicked = pyqtSignal(QModelIndex)
+
+    MARGIN = 6                  # gap between cards (half above, half below)
+    PADDING = 12
+    GAP = 4                     # between body text and button
+    BUTTON_SIZE = QSize(92, 28)
+    BUTTON_TEXT = ""
+    BUTTON_COLORS = ("#28a745", "#218838", "#1e7e34")   # normal, hover, pressed
+
+    def __init__(self, body_height, parent=None):
+        super().__init__(parent)
+        self.button_font = QFont("Segoe UI", 9, QFont.DemiBold)
+        self._hover_pos = None
+        self._pressed_row = None
+        self.row_height = (
+            2 * self.MARGIN + 2 * self.PADDING + body_height + self.GAP + self.BUTTON_SIZE.height()
+        )
+
+    # ---------------- geometry ----------------
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.row_height)
+
+    def card_rect(self, rect):
+        return rect.adjusted(1, self.MARGIN, -1, -self.MARGIN)
+
+    def button_rect(self, rect):
+        card = self.card_rect(rect)
+        size = self.BUTTON_SIZE
+        return QRect(card.right() - self.PADDING - size.width(),
+                     card.bottom() - self.PADDING - size.height(),
+                     size.width(), size.height())
+
+    # ---------------- painting ----------------
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        card = self.card_rect(option.rect)
+        if option.state & QStyle.State_Selected:
+            painter.setPen(QPen(QColor("#7fb3ff"), 2))
+            painter.setBrush(QColor("#EEF5FF"))
+        else:
+            painter.setPen(QPen(QColor(0, 0, 0, 20), 1))
+            painter.setBrush(QColor("#FFFFFF"))
+        painter.drawRoundedRect(card, 10, 10)
+
+        body = QRect(card.left() + self.PADDING, card.top() + self.PADDING,
+                     card.width() - 2 * self.PADDING,
+                     card.height() - 2 * self.PADDING - self.GAP - self.BUTTON_SIZE.height())
+        self.paint_body(painter, body, index.model().row_at(index.row()))
+
+        self._paint_button(painter, option, index)
+        painter.restore()
+
+    def paint_body(self, painter, rect, row):
+        raise NotImplementedError
+
+    @staticmethod
+    def draw_line(painter, rect, text, metrics):
+        """One left-aligned, elided line of text."""
+        painter.drawText(rect, Qt.AlignLeft | Qt.AlignVCenter,
+                         metrics.elidedText(str(text).replace("\n", " "), Qt.ElideRight, rect.width()))
+
+    def _paint_button(self, painter, option, index):
+        button = self.button_rect(option.rect)
+        hovered = (option.state & QStyle.State_MouseOver) and self._hover_pos is not None \
+            and button.contains(self._hover_pos)
+        normal, hover, pressed = self.BUTTON_COLORS
+        if self._pressed_row == index.row() and hovered:
+            color = pressed
+        elif hovered:
+            color = hover
+        else:
+            color = normal
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(color))
+        painter.drawRoundedRect(button, 8, 8)
+        painter.setPen(QColor("#FFFFFF"))
+        painter.setFont(self.button_font)
+        painter.drawText(button, Qt.AlignCenter, self.BUTTON_TEXT)
+
+    # ---------------- hit-testing ----------------
+    def editorEvent(self, event, model, option, index):
+        kind = event.type()
+        if kind not in (QEvent.MouseMove, QEvent.MouseButtonPress, QEvent.MouseButtonRelease):
+            return False
+
+        on_button = self.button_rect(option.rect).contains(event.pos())
+        view = option.widget
+        if kind == QEvent.MouseMove:
+            self._hover_pos = event.pos()
+            if view is not None:
+                view.viewport().setCursor(Qt.PointingHandCursor if on_button else Qt.ArrowCursor)
+                view.viewport().update(option.rect)
+            return False
+
+        if event.button() != Qt.LeftButton:
+            return False
+        if kind == QEvent.MouseButtonPress:
+            self._pressed_row = index.row() if on_button else None
+            if view is not None:
+                view.viewport().update(option.rect)
+            return on_button
+
+        # release: a click only counts if it started on the same button
+        clicked = on_button and self._pressed_row == index.row()
+        self._pressed_row = None
+        if view is not None:
+            view.viewport().update(option.rect)
+        if clicked:
+            self.button_clicked.emit(index)
+        return clicked
+
+
+class CardListView(QListView):
+    near_end = pyqtSignal()
+
+    def __init__(self, model, delegate, parent=None, prefetch_margin=300):
+        super().__init__(parent)
+        self.list_model = model
+        self.card_delegate = delegate
+        self.prefetch_margin = prefetch_margin
+        model.setParent(self)
+        delegate.setParent(self)
+        self.setModel(model)
+        self.setItemDelegate(delegate)
+
+        self.setUniformItemSizes(True)              # row heights never computed per row
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.verticalScrollBar().setSingleStep(24)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setFocusPolicy(Qt.NoFocus)
+        self.setMouseTracking(True)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setStyleSheet("QListView { border: none; background: transparent; }")
+
+        self.verticalScrollBar().valueChanged.connect(self._check_near_end)
+        model.rowsInserted.connect(self._check_near_end)
+        model.rowsRemoved.connect(self._check_near_end)
+        model.modelReset.connect(self._check_near_end)
+
+    def selected_rows(self):
+        """Selected row tuples in list order (empty unless a subclass enables selection)."""
+        positions = sorted(index.row() for index in self.selectionModel().selectedIndexes())
+        return [self.list_model.row_at(position) for position in positions]
+
+    def remaining_px(self):
+        """Height of the cards below the visible area (exact: every row has the same height)."""
+        content = self.list_model.rowCount() * self.card_delegate.row_height
+        return content - self.verticalScrollBar().value() - self.viewport().height()
+
+    def leaveEvent(self, event):
+        self.card_delegate._hover_pos = None
+        self.viewport().update()
+        super().leaveEvent(event)
+
+    def _check_near_end(self, *_):
+        if self.list_model.rowCount() and self.remaining_px() <= self.prefetch_margin:
+            self.near_end.emit()
@@ -1,15 +1,33 @@
+import logging
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QLineEdit, QPushButton, QFrame, QVBoxLayout, QHBoxLayout,
-    QScrollArea, QTextEdit, QMessageBox
+    QTextEdit, QMessageBox
 )
 from PyQt5.QtGui import QFont
-from PyQt5.QtCore import Qt, pyqtSignal
-import pymysql
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from ..change_poller import ChangePoller
+from ..db import queries
+from ..db.config import env_int, load_env
+from ..db.connection import execute, fetch_all, fetch_one
+from ..db.names import get_name_cache
+from ..db.search import search_prescriptions
+from ..executor import QueryExecutor
+from .doctor_history import PATIENT_ID, PR_ID, SUGG_PREVIEW, HistoryListView
+from .patient_completer import PatientCompleter
+
+logger = logging.getLogger("imhotep.doctor")
 
 
 class DoctorPortal(QWidget):
     goto_login = pyqtSignal()
 
+    # history rows per page (DOCTOR_HISTORY_PAGE_SIZE in .env)
+    DEFAULT_HISTORY_PAGE_SIZE = 30
+    # search-as-you-type: quiet time before a search, results shown (DOCTOR_SEARCH_* in .env)
+    DEFAULT_SEARCH_DEBOUNCE_MS = 250
+    DEFAULT_SEARCH_LIMIT = 50
+    SEARCH_MIN_CHARS = 2
+
     def __init__(self, doctor_id=None, doctor_name=None):
         super().__init__()
         self.setWindowTitle("Imhotep — Doctor's Portal")
@@ -19,53 +37,54 @@ class DoctorPortal(QWidget):
         # State Variables
         self.current_patient_id = None
         self.registered_doctor_id = doctor_id
-        # If doctor_name not given, fetch from DB using user table
-        self.registered_doctor_name = doctor_name or (
-            self._get_user_name(doctor_id) if doctor_id is not None else None
-        )
+        self.registered_doctor_name = doctor_name
         self.last_condition = ""
         self.last_prescription = ""
         self.current_edit_prescription_id = None
 
+        load_env()
+        self.history_page_size = max(1, env_int("DOCTOR_HISTORY_PAGE_SIZE", self.DEFAULT_HISTORY_PAGE_SIZE))
+        self._history_patient_id = None     # patient whose history is listed
+        self._history_after = None          # Pr_ID of the last row listed
+        self._history_has_more = False
+        self._edit_after_load = None        # Pr_ID picked in the search results
+        self.search_limit = max(1, env_int("DOCTOR_SEARCH_LIMIT", self.DEFAULT_SEARCH_LIMIT))
+
+        # all SQL runs on worker threads; results come back via signals
+        self._executor = QueryExecutor(self)
+        self._executor.busy_changed.connect(self._set_busy)
+        # searches get their own executor, so typing doesn't flash the busy cursor
+        self._search_executor = QueryExecutor(self)
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(env_int("DOCTOR_SEARCH_DEBOUNCE_MS", self.DEFAULT_SEARCH_DEBOUNCE_MS))
+        self._search_timer.timeout.connect(self._run_search)
+
+        # prescriptions written elsewhere (another doctor, a dispense) show up in the history
+        self._poller = ChangePoller(self, prepare=self._history_rows_for_changes)
+        self._poller.changes.connect(self._merge_history_changes)
+
         self.init_ui()
 
+        # If doctor_name not given, fetch from DB using user table
+        if doctor_name is None and doctor_id is not None:
+            self._refresh_doctor_name()
+
     # ---------------- DB helper: get doctor name from `user` table ----------------
     @classmethod
     def _get_user_name(cls, user_id):
         """
-        Look up the User_Name for the given User_ID from the `user` table.
+        Look up the User_Name for the given User_ID (through the shared name cache).
         Returns the name as a string, or None if not found or on error.
         """
         if user_id is None:
             return None
 
-        conn = None
-        cur = None
         try:
-            conn = pymysql.connect(
-                host="localhost",
-                user="root",
-                password="",
-                database="imhotep",
-                cursorclass=pymysql.cursors.DictCursor,
-                autocommit=False
-            )
-            cur = conn.cursor()
-            cur.execute("SELECT User_Name FROM user WHERE User_ID = %s", (user_id,))
-            row = cur.fetchone()
-            if row:
-                return row.get("User_Name")
-            return None
+            return get_name_cache().get(user_id)
         except Exception as e:
-            print(f"Error loading doctor name for {user_id}: {e}")
+            logger.error("Error loading doctor name for %s", user_id, exc_info=e)
             return None
-        finally:
-            try:
-                if cur:
-                    cur.close()
-            finally:
-                if conn:
-                    conn.close()
 
     # ---------------- Public setter if you ever want to refresh the user ----------------
     def set_user(self, doctor_id):
@@ -74,13 +93,34 @@ class DoctorPortal(QWidget):
         after the object is created.
         """
         self.registered_doctor_id = doctor_id
-        self.registered_doctor_name = self._get_user_name(doctor_id)
+        self.registered_doctor_name = None
+        self._update_doctor_label()
+        self._refresh_doctor_name()
+
+    def _refresh_doctor_name(self):
+        self._executor.submit(
+            "doctor_name", self._get_user_name, self.registered_doctor_id,
+            on_result=self._on_doctor_name_loaded,
+        )
+
+    def _on_doctor_name_loaded(self, name):
+        self.registered_doctor_name = name
+        self._update_doctor_label()
+
+    def _update_doctor_label(self):
         # refresh label text if UI already built
         if hasattr(self, "doctor_info_label"):
             name = self.registered_doctor_name or "Unknown"
             uid = self.registered_doctor_id or "—"
             self.doctor_info_label.setText(f"Doctor: {name}\nUser ID: {uid}")
 
+    def _set_busy(self, busy):
+        # keep the event loop free: just show a busy cursor while queries run
+        if busy:
+            self.setCursor(Qt.BusyCursor)
+        else:
+            self.unsetCursor()
+
     # --- helper to show status messages ---
     def show_notification(self, text, color="#888"):
         # ensure label exists before use; create one lazily if needed
@@ -90,22 +130,34 @@ class DoctorPortal(QWidget):
         self.notification_label.setStyleSheet(f"color: {color}; font-size: 11px;")
 
     def clear_portal(self):
+        self._executor.cancel("load")
+        self._executor.cancel("page")
+        self._executor.cancel("record")
+        self._search_timer.stop()
+        self._search_executor.cancel("search")
+        self.search_input.clear()
         self.uid_input.clear()
         self.notes_edit.clear()
         self.prescription_edit.clear()
         self.notification_label.setText("")
         self.current_edit_prescription_id = None
+        self._edit_after_load = None
 
         # Clear history list
-        self._clear_layout(self.history_layout)
-        empty = QLabel("No patient loaded.")
-        empty.setStyleSheet("color:#888;")
-        self.history_layout.addWidget(empty)
-        self.history_layout.addStretch()
+        self._history_patient_id = None
+        self._history_has_more = False
+        self.history_view.list_model.clear()
+        self.history_empty_lbl.setText("No patient loaded.")
+        self.history_empty_lbl.show()
 
     def showEvent(self, event):
         super().showEvent(event)
         self.clear_portal()
+        self._poller.start()
+
+    def hideEvent(self, event):
+        self._poller.stop()
+        super().hideEvent(event)
 
 
     def init_ui(self):
@@ -157,13 +209,30 @@ class DoctorPortal(QWidget):
         self.doctor_info_label.setStyleSheet("color: #333;")
         left_v.addWidget(self.doctor_info_label)
 
+        left_v.addWidget(QLabel("Search Records", font=QFont("Helvetica", 12, QFont.Bold)))
+
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText('Search notes & prescriptions  ("exact phrase", amox*)')
+        self.search_input.setFixedHeight(36)
+        self.search_input.setStyleSheet("border:1px solid #e1e1e1; border-radius:6px; padding-left:8px;")
+        self.search_input.textChanged.connect(self._on_search_text_changed)
+        self.search_input.returnPressed.connect(self._run_search)
+        left_v.addWidget(self.search_input)
+
+        self.search_status_lbl = QLabel("")
+        self.search_status_lbl.setStyleSheet("color: #888; font-size: 11px;")
+        self.search_status_lbl.hide()
+        left_v.addWidget(self.search_status_lbl)
+
         left_v.addWidget(QLabel("Find Patient", font=QFont("Helvetica", 12, QFont.Bold)))
 
         self.uid_input = QLineEdit()
         # This is now Patient_ID, not UID
-        self.uid_input.setPlaceholderText("Enter Patient ID")
+        self.uid_input.setPlaceholderText("Patient name or ID")
         self.uid_input.setFixedHeight(36)
         self.uid_input.setStyleSheet("border:1px solid #e1e1e1; border-radius:6px; padding-left:8px;")
+        self.uid_completer = PatientCompleter(self.uid_input)
+        self.uid_completer.chosen.connect(lambda _: self.on_load_patient())
         left_v.addWidget(self.uid_input)
 
         self.notification_label = QLabel("")
@@ -179,17 +248,32 @@ class DoctorPortal(QWidget):
         self.load_btn.clicked.connect(self.on_load_patient)
         left_v.addWidget(self.load_btn)
 
-        left_v.addWidget(QLabel("Patient History", font=QFont("Helvetica", 12, QFont.Bold)))
-        self.history_scroll = QScrollArea()
-        self.history_scroll.setWidgetResizable(True)
-        self.history_scroll.setStyleSheet("border:1px solid #e9e9e9; border-radius:8px; background:#fff;")
-        self.history_scroll.setFixedHeight(300)
-        self.history_content = QWidget()
-        self.history_layout = QVBoxLayout(self.history_content)
-        self.history_layout.setContentsMargins(10, 10, 10, 10)
-        self.history_layout.setSpacing(10)
-        self.history_scroll.setWidget(self.history_content)
-        left_v.addWidget(self.history_scroll)
+        # history and search results share this spot; a search shows its results in place of the history
+        self.history_panel = QWidget()
+        history_v = QVBoxLayout(self.history_panel)
+        history_v.setContentsMargins(0, 0, 0, 0)
+        history_v.setSpacing(12)
+        history_v.addWidget(QLabel("Patient History", font=QFont("Helvetica", 12, QFont.Bold)))
+        self.history_empty_lbl = QLabel("No patient loaded.")
+        self.history_empty_lbl.setStyleSheet("color:#888;")
+        history_v.addWidget(self.history_empty_lbl)
+
+        # virtualized, paged list (see doctor_history.py)
+        self.history_view = HistoryListView()
+        self.history_view.setStyleSheet("QListView { border:1px solid #e9e9e9; border-radius:8px; background:#fff; }")
+        self.history_view.setFixedHeight(300)
+        self.history_view.edit_requested.connect(self._on_edit_requested)
+        self.history_view.near_end.connect(self._maybe_fetch_more_history)
+        history_v.addWidget(self.history_view)
+        left_v.addWidget(self.history_panel)
+
+        # matches across all patients, best first; Edit opens the patient and the record
+        self.search_results = HistoryListView(show_patient=True)
+        self.search_results.setStyleSheet("QListView { border:1px solid #e9e9e9; border-radius:8px; background:#fff; }")
+        self.search_results.setFixedHeight(300)
+        self.search_results.edit_requested.connect(self._on_search_result_chosen)
+        self.search_results.hide()
+        left_v.addWidget(self.search_results)
         left_v.addStretch(5)
 
         # RIGHT PANEL
@@ -253,56 +337,31 @@ class DoctorPortal(QWidget):
         self.setLayout(main_layout)
 
         # Set doctor info label text once UI built
-        name = self.registered_doctor_name or "Unknown"
-        uid = self.registered_doctor_id or "—"
-        self.doctor_info_label.setText(f"Doctor: {name}\nUser ID: {uid}")
-
-    def _create_history_card(self, rec):
-        card = QFrame()
-        card.setStyleSheet("border: 1px solid #ddd; border-radius: 8px; background: #fff;")
-        vbox = QVBoxLayout(card)
-        vbox.setContentsMargins(10, 10, 10, 10)
-        vbox.setSpacing(6)
-
-        pid = rec.get("Pr_ID", "")
-        note = rec.get("Doctor_Sugg") or ""
-        presc_full = rec.get("Prescription") or ""
-        info = QLabel(
-            f"<b>ID:</b> {pid}<br><b>Notes:</b> {note[:120]}<br><b>Prescription:</b> {presc_full[:120]}"
+        self._update_doctor_label()
+
+    def _show_history(self, rows):
+        self.history_view.list_model.set_rows(rows)
+        self.history_view.scrollToTop()
+        self.history_empty_lbl.setText("No patient data found.")
+        self.history_empty_lbl.setVisible(not rows)
+
+    def _on_edit_requested(self, pr_id):
+        # the list only holds previews; read the full texts before editing
+        self._executor.submit(
+            "record", self._fetch_record, pr_id,
+            on_result=self._on_record_loaded,
+            on_error=self._on_load_error,
         )
-        info.setWordWrap(True)
-        vbox.addWidget(info)
 
-        edit_btn = QPushButton("✏ Edit")
-        edit_btn.setFixedWidth(72)
-        edit_btn.setStyleSheet("""
-            QPushButton { background-color: #DC3545; color: white; border: none; border-radius: 8px; font-weight: bold; }
-            QPushButton:hover { background-color: #E94B5A; }
-        """)
-        edit_btn.clicked.connect(lambda _, r=rec: self._on_edit_history_record(r))
-        vbox.addWidget(edit_btn, alignment=Qt.AlignRight)
-        return card
+    @staticmethod
+    def _fetch_record(pr_id):
+        return fetch_one(queries.DOCTOR_RECORD, (pr_id,))
 
-    def _clear_layout(self, layout):
-        if layout is None:
-            return
-        while layout.count():
-            item = layout.takeAt(0)
-            widget = item.widget()
-            if widget is not None:
-                widget.deleteLater()
-
-    def populate_history(self, records):
-        self._clear_layout(self.history_layout)
-        if not records:
-            no_data = QLabel("No patient data found.")
-            no_data.setStyleSheet("color:#888;")
-            self.history_layout.addWidget(no_data)
-            self.history_layout.addStretch()
+    def _on_record_loaded(self, rec):
+        if rec is None:
+            self.show_notification("That record no longer exists.", "#e05a4f")
             return
-        for rec in records:
-            self.history_layout.addWidget(self._create_history_card(rec))
-        self.history_layout.addStretch()
+        self._on_edit_history_record(rec)
 
     def _on_edit_history_record(self, rec):
         self.current_edit_prescription_id = rec.get("Pr_ID")
@@ -316,109 +375,239 @@ class DoctorPortal(QWidget):
 
     def on_load_patient(self):
         self.current_edit_prescription_id = None
-        patient_id = self.uid_input.text().strip()
+        self._edit_after_load = None
+        patient_id = self.uid_completer.resolve(self.uid_input.text())
         if not patient_id:
             self.show_notification("Please enter Patient ID.", "#e05a4f")
             return
+        if not patient_id.isdigit():
+            self.show_notification("No single patient by that name; pick one from the list.", "#e05a4f")
+            return
+        self.uid_input.setText(patient_id)
+
+        self.show_notification(f"Loading patient {patient_id}…", "#666")
+        # a second Load supersedes this one (e.g. doctor switched patients)
+        self._executor.cancel("page")
+        self._executor.cancel("record")
+        self._history_has_more = False
+        self._executor.submit(
+            "load", self._fetch_history, patient_id, self.history_page_size,
+            on_result=lambda result, pid=patient_id: self._on_history_loaded(pid, result),
+            on_error=self._on_load_error,
+        )
 
-        conn = None
-        cur = None
-        try:
-            conn = pymysql.connect(
-                host="localhost",
-                user="root",
-                password="",
-                database="imhotep",
-                cursorclass=pymysql.cursors.DictCursor,
-                autocommit=False
-            )
-            cur = conn.cursor()
-            # Use Patient_ID directly, no join, no Patient_UID
-            cur.execute("""
-                SELECT *
-                FROM prescription
-                WHERE Patient_ID = %s
-                ORDER BY Pr_ID ASC;
-            """, (patient_id,))
-            records = cur.fetchall()
-            self.populate_history(records)
-            if records:
-                latest = records[0]
-                self.notes_edit.setPlainText(latest.get("Doctor_Sugg") or "")
-                self.prescription_edit.setPlainText(latest.get("Prescription") or "")
-                self.show_notification("Loaded latest record.", "#666")
-            else:
-                self.notes_edit.clear()
-                self.prescription_edit.clear()
-                self.show_notification("No patient data found.", "#666")
-        except Exception as e:
-            QMessageBox.critical(self, "Load Error", f"Error loading patient data:\n{e}")
-            print(f"Error loading patient: {e}")
-        finally:
-            try:
-                if cur:
-                    cur.close()
-            finally:
-                if conn:
-                    conn.close()
+    @classmethod
+    def _fetch_history(cls, patient_id, size):
+        """First history page plus the full texts of the newest record (to prefill the editors)."""
+        rows, has_more = cls._fetch_history_page(patient_id, None, size)
+        latest = cls._fetch_record(rows[0][0]) if rows else None
+        return rows, has_more, latest
+
+    @staticmethod
+    def _fetch_history_page(patient_id, after_pr_id, size):
+        """
+        Newest-first page of a patient's history below Pr_ID `after_pr_id` (None = first page).
+        Rows are preview tuples, see doctor_history.py. Returns (rows, has_more).
+        """
+        # Use Patient_ID directly, no join, no Patient_UID
+        if after_pr_id is None:
+            rows = fetch_all(queries.DOCTOR_HISTORY_FIRST, (patient_id, size), as_dict=False)
+        else:
+            rows = fetch_all(queries.DOCTOR_HISTORY_AFTER, (patient_id, after_pr_id, size), as_dict=False)
+        return rows, len(rows) == size
+
+    def _on_history_loaded(self, patient_id, result):
+        rows, self._history_has_more, latest = result
+        self._history_patient_id = patient_id
+        self._history_after = rows[-1][0] if rows else None
+        self._show_history(rows)
+        edit_pr_id, self._edit_after_load = self._edit_after_load, None
+        if edit_pr_id is not None:
+            self._on_edit_requested(edit_pr_id)
+        elif latest:
+            self.notes_edit.setPlainText(latest.get("Doctor_Sugg") or "")
+            self.prescription_edit.setPlainText(latest.get("Prescription") or "")
+            self.show_notification("Loaded latest record.", "#666")
+        else:
+            self.notes_edit.clear()
+            self.prescription_edit.clear()
+            self.show_notification("No patient data found.", "#666")
+
+    def _maybe_fetch_more_history(self):
+        if not self._history_has_more or self._executor.is_busy("page") or self._executor.is_busy("load"):
+            return
+        self._executor.submit(
+            "page", self._fetch_history_page,
+            self._history_patient_id, self._history_after, self.history_page_size,
+            on_result=self._on_history_page_loaded,
+            on_error=self._on_history_page_error,
+        )
+
+    def _on_history_page_loaded(self, page):
+        rows, self._history_has_more = page
+        if rows:
+            self._history_after = rows[-1][0]
+        self.history_view.list_model.append_rows(rows)
+
+    def _on_history_page_error(self, e):
+        self._history_has_more = False      # don't retry on every scroll tick; Load starts over
+        self._on_load_error(e)
+
+    def _on_load_error(self, e):
+        self.show_notification("", "#666")
+        QMessageBox.critical(self, "Load Error", f"Error loading patient data:\n{e}")
+        logger.error("Error loading patient", exc_info=e)
 
     def on_save_prescription(self):
-        patient_id = self.uid_input.text().strip()
+        # a name typed in the box is saved under the ID it stands for, never as the Patient_ID
+        patient_id = self.uid_completer.resolve(self.uid_input.text())
         notes = self.notes_edit.toPlainText().strip()
         presc = self.prescription_edit.toPlainText().strip()
 
         if not patient_id:
             self.show_notification("Please enter Patient ID.", "#e05a4f")
             return
+        if not patient_id.isdigit():
+            self.show_notification("No single patient by that name; pick one from the list.", "#e05a4f")
+            return
+        self.uid_input.setText(patient_id)
         if not notes and not presc:
             self.show_notification("Notes or prescription must not be empty.", "#e05a4f")
             return
 
-        conn = None
-        cur = None
-        try:
-            conn = pymysql.connect(
-                host="localhost",
-                user="root",
-                password="",
-                database="imhotep",
-                cursorclass=pymysql.cursors.Cursor,  # tuple rows are fine here
-                autocommit=False
-            )
-            cur = conn.cursor()
-
-            # UPDATE existing prescription
-            if self.current_edit_prescription_id:
-                cur.execute("""
-                    UPDATE prescription
-                    SET Doctor_Sugg = %s, Prescription = %s
-                    WHERE Pr_ID = %s
-                """, (notes, presc, self.current_edit_prescription_id))
-                conn.commit()
-                self.show_notification("Prescription updated successfully.", "#20b54b")
-                self.current_edit_prescription_id = None
-                self.on_load_patient()
-                return
-
-            # INSERT new prescription
-            # We trust the entered Patient_ID
-            cur.execute("""
-                INSERT INTO prescription (Patient_ID, Doctor_Sugg, Prescription)
-                VALUES (%s, %s, %s)
-            """, (patient_id, notes, presc))
-            conn.commit()
-            self.show_notification("Prescription saved successfully.", "#20b54b")
+        self.save_btn.setEnabled(False)     # no double inserts while the save is in flight
+        self._executor.submit(
+            "save", self._save_prescription,
+            self.current_edit_prescription_id, patient_id, notes, presc,
+            on_result=lambda saved, pid=patient_id, n=notes, p=presc:
+                self._on_prescription_saved(pid, n, p, saved),
+            on_error=self._on_save_error,
+        )
+
+    @staticmethod
+    def _save_prescription(edit_id, patient_id, notes, presc):
+        """Returns (action, Pr_ID); the history list is patched from it, not re-queried."""
+        # UPDATE existing prescription
+        if edit_id:
+            execute(queries.PRESCRIPTION_UPDATE, (notes, presc, edit_id))
+            return "updated", edit_id
+
+        # INSERT new prescription (on_save_prescription checked the Patient_ID is digits)
+        result = execute(queries.PRESCRIPTION_INSERT, (patient_id, notes, presc))
+        return "saved", result.lastrowid
+
+    def _on_prescription_saved(self, patient_id, notes, presc, saved):
+        action, pr_id = saved
+        self.save_btn.setEnabled(True)
+        self.show_notification(f"Prescription {action} successfully.", "#20b54b")
+        self.current_edit_prescription_id = None
+
+        model = self.history_view.list_model
+        preview = (notes[:queries.HISTORY_PREVIEW_CHARS], presc[:queries.HISTORY_PREVIEW_CHARS])
+        if action == "updated":
+            position = model.position_of(pr_id)
+            if position >= 0:
+                model.replace_row((*model.row_at(position)[:SUGG_PREVIEW], *preview))
+        elif patient_id == self._history_patient_id and not self._executor.is_busy("load"):
+            # new rows get the column defaults: no Visit_Date, Dispense = 1
+            model.insert_row(0, (pr_id, int(patient_id), None, 1, *preview))
+            self.history_view.scrollToTop()
+            self.history_empty_lbl.hide()
+        else:
+            # saved for a patient that isn't listed yet: show their history
             self.on_load_patient()
 
-        except Exception as e:
-            if conn:
-                conn.rollback()
-            QMessageBox.critical(self, "Save Error", f"Error saving prescription:\n{e}")
-            print(f"Error saving prescription: {e}")
-        finally:
-            try:
-                if cur:
-                    cur.close()
-            finally:
-                if conn:
-                    conn.close()
+    def _on_save_error(self, e):
+        # execute() already rolled the transaction back
+        self.save_btn.setEnabled(True)
+        QMessageBox.critical(self, "Save Error", f"Error saving prescription:\n{e}")
+        logger.error("Error saving prescription", exc_info=e)
+
+    # ---------------- search ----------------
+    def _show_search_results(self, visible):
+        self.search_results.setVisible(visible)
+        self.history_panel.setVisible(not visible)
+
+    def _on_search_text_changed(self, text):
+        if len(text.strip()) < self.SEARCH_MIN_CHARS:
+            self._search_timer.stop()
+            self._search_executor.cancel("search")
+            self.search_results.list_model.clear()
+            self._show_search_results(False)
+            self.search_status_lbl.hide()
+            return
+        self._search_timer.start()          # restarts: searches once typing pauses
+
+    def _run_search(self):
+        self._search_timer.stop()
+        text = self.search_input.text()
+        if len(text.strip()) < self.SEARCH_MIN_CHARS:
+            return
+        # a newer search supersedes this one
+        self._search_executor.submit(
+            "search", search_prescriptions, text, self.search_limit,
+            on_result=self._on_search_results,
+            on_error=self._on_search_error,
+        )
+
+    def _on_search_results(self, results):
+        rows = results.rows
+        self.search_results.list_model.set_rows(rows)
+        self.search_results.scrollToTop()
+        self._show_search_results(bool(rows))
+        if results.recent:
+            # too common a word to rank the matches: only the newest were looked
+            # at (search.FULL_RANK_HITS, search.RECENT_SPAN)
+            found = f"Most recent {len(rows)} matches" if rows else "No matches among the recent records"
+            self.search_status_lbl.setText(f"{found}; add a less common word to rank them all by relevance.")
+        elif not rows:
+            self.search_status_lbl.setText("No matching records.")
+        elif len(rows) == self.search_limit:
+            self.search_status_lbl.setText(f"Best {len(rows)} matches; add words to narrow it down.")
+        else:
+            self.search_status_lbl.setText(f"{len(rows)} matching record(s).")
+        self.search_status_lbl.show()
+
+    def _on_search_error(self, e):
+        logger.error("Error searching records", exc_info=e)
+        self._show_search_results(False)
+        self.search_status_lbl.setText("Search failed; see the log.")
+        self.search_status_lbl.show()
+
+    def _on_search_result_chosen(self, pr_id):
+        model = self.search_results.list_model
+        position = model.position_of(pr_id)
+        if position < 0:
+            return
+        # back to the history, for that patient; once it is in, open this record instead of the latest
+        self._show_search_results(False)
+        self.search_status_lbl.setText("Press Enter in the search box to see the matches again.")
+        self.uid_input.setText(str(model.row_at(position)[PATIENT_ID]))
+        self.on_load_patient()
+        self._edit_after_load = pr_id
+
+    # ---------------- change feed ----------------
+    @staticmethod
+    def _history_rows_for_changes(changes):
+        """(change, history preview row or None if deleted); same shape as DOCTOR_HISTORY_* rows."""
+        chars = queries.HISTORY_PREVIEW_CHARS
+        return [
+            (c, None if c.deleted else (c.pr_id, c.patient_id, c.visit_date, c.dispense,
+                                        (c.doctor_sugg or "")[:chars], (c.prescription or "")[:chars]))
+            for c in changes
+        ]
+
+    def _merge_history_changes(self, pairs):
+        if self._history_patient_id is None or self._executor.is_busy("load"):
+            return                          # the load in flight brings the current state
+        model = self.history_view.list_model
+        for change, row in pairs:
+            if str(change.patient_id) != self._history_patient_id:
+                # not (or no longer) this patient's
+                model.remove_key(change.pr_id)
+            elif row is None:
+                model.remove_key(change.pr_id)
+            else:
+                # newest first; older rows than the loaded pages come in by scrolling
+                model.upsert_sorted(row, lambda r: -r[PR_ID], append=not self._history_has_more)
+        self.history_empty_lbl.setVisible(not model.rowCount())
@@ -0,0 +1,81 @@
+# imhotep/views/doctor_history.py
+"""
+Virtualized "Patient History" list for the doctor portal.
+
+Rows are the preview tuples from queries.DOCTOR_HISTORY_FIRST/_AFTER:
+    (Pr_ID, Patient_ID, Visit_Date, Dispense, notes preview, prescription preview)
+
+Full texts are not kept here; HistoryListView.edit_requested(Pr_ID) asks the
+portal to load the record it is about to edit. The search results use the
+same list with show_patient=True, since they span patients.
+"""
+from PyQt5.QtCore import QRect, QSize, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QFontMetrics
+
+from .card_list import ButtonCardDelegate, CardListView, RowListModel
+
+PR_ID, PATIENT_ID, VISIT_DATE, DISPENSE, SUGG_PREVIEW, PRESCRIPTION_PREVIEW = range(6)
+
+
+class HistoryListModel(RowListModel):
+    key_column = PR_ID
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            return row[PRESCRIPTION_PREVIEW]
+        if role == Qt.ToolTipRole:
+            return f"Notes: {row[SUGG_PREVIEW] or ''}\nPrescription: {row[PRESCRIPTION_PREVIEW] or ''}"
+        return None
+
+
+class HistoryCardDelegate(ButtonCardDelegate):
+    """ID, date/status, notes and prescription previews, and an Edit button."""
+
+    BUTTON_TEXT = "✏ Edit"
+    BUTTON_SIZE = QSize(72, 28)
+    BUTTON_COLORS = ("#DC3545", "#E94B5A", "#C82333")
+
+    def __init__(self, parent=None, show_patient=False):
+        self.show_patient = show_patient
+        self.text_font = QFont("Helvetica", 9)
+        self.bold = QFont(self.text_font)
+        self.bold.setBold(True)
+        self._metrics = QFontMetrics(self.text_font)
+        self._bold_metrics = QFontMetrics(self.bold)
+        super().__init__(3 * self._metrics.height(), parent)
+
+    def paint_body(self, painter, rect, row):
+        height = self._metrics.height()
+        x, y, width = rect.left(), rect.top(), rect.width()
+        status = "Active" if row[DISPENSE] else "Dispensed"
+        date = row[VISIT_DATE] or "no visit date"
+        patient = f"Patient {row[PATIENT_ID]}  ·  " if self.show_patient else ""
+        for label, text in (
+            ("ID: ", f"{row[PR_ID]}  ·  {patient}{date}  ·  {status}"),
+            ("Notes: ", row[SUGG_PREVIEW] or ""),
+            ("Prescription: ", row[PRESCRIPTION_PREVIEW] or ""),
+        ):
+            label_width = self._bold_metrics.horizontalAdvance(label)
+            painter.setPen(QColor("#222222"))
+            painter.setFont(self.bold)
+            painter.drawText(QRect(x, y, label_width, height), Qt.AlignLeft | Qt.AlignVCenter, label)
+            painter.setPen(QColor("#444444"))
+            painter.setFont(self.text_font)
+            self.draw_line(painter, QRect(x + label_width, y, width - label_width, height), text, self._metrics)
+            y += height
+
+
+class HistoryListView(CardListView):
+    """Card list preset for a patient's history; emits edit_requested(Pr_ID)."""
+
+    edit_requested = pyqtSignal(object)
+
+    def __init__(self, parent=None, show_patient=False):
+        super().__init__(HistoryListModel(), HistoryCardDelegate(show_patient=show_patient), parent,
+                         prefetch_margin=200)
+        self.card_delegate.button_clicked.connect(
+            lambda index: self.edit_requested.emit(self.list_model.row_at(index.row())[PR_ID])
+        )
@@ -6,6 +6,7 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QFont, QColor, QCursor
 from ..db.auth import AuthHandler
+from ..executor import QueryExecutor
 
 
 class ForgotPasswordView(QWidget):
@@ -20,6 +21,10 @@ class ForgotPasswordView(QWidget):
         self.setMinimumSize(400, 450)
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
 
+        # match check + new hash (bcrypt) run off the GUI thread
+        self._executor = QueryExecutor(self)
+        self._executor.busy_changed.connect(self._set_busy)
+
         self.card = QFrame(self)
         self.card.setStyleSheet("QFrame { background-color: white; border-radius: 18px; }")
         shadow = QGraphicsDropShadowEffect(self)
@@ -157,9 +162,9 @@ class ForgotPasswordView(QWidget):
 
         # Buttons
         btn_row = QHBoxLayout()
-        submit_btn = self.create_button("Submit", "#1EBE64", "#2ED97A")
-        submit_btn.clicked.connect(self.reset_password)
-        btn_row.addWidget(submit_btn)
+        self.submit_btn = self.create_button("Submit", "#1EBE64", "#2ED97A")
+        self.submit_btn.clicked.connect(self.reset_password)
+        btn_row.addWidget(self.submit_btn)
 
         cancel_btn = self.create_button("Cancel", "#DC3545", "#E94B5A")
         cancel_btn.clicked.connect(self.goto_login.emit)
@@ -288,8 +293,16 @@ class ForgotPasswordView(QWidget):
             self.error_label.setText("Password must be 8–16 chars with upper, lower, digit, special.")
             return
 
-        result = AuthHandler.reset_user_password(code, new, Match)
+        self._executor.submit(
+            "reset", AuthHandler.reset_user_password, code, new, Match,
+            on_result=self._on_reset_result,
+        )
+
+    def _set_busy(self, busy):
+        self.submit_btn.setEnabled(not busy)
+        self.submit_btn.setText("Please wait…" if busy else "Submit")
 
+    def _on_reset_result(self, result):
         if "success" in result.lower():
             self.error_label.setStyleSheet("color:green;")
         else:
@@ -5,6 +5,7 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QFont, QColor, QCursor
 from ..db.auth import AuthHandler
+from ..executor import QueryExecutor
 
 
 class LoginView(QWidget):
@@ -18,6 +19,10 @@ class LoginView(QWidget):
         super().__init__()
         self.current_role = None        # remember selected role (doctor/patient/pharmacist)
 
+        # credential check (DB + bcrypt) runs off the GUI thread
+        self._executor = QueryExecutor(self)
+        self._executor.busy_changed.connect(self._set_busy)
+
         self.setWindowTitle("Imhotep Login")
         self.resize(480, 520)
         self.setStyleSheet("background-color: #f4f5f7;")
@@ -228,8 +233,16 @@ class LoginView(QWidget):
             self.error_label.setText("Please enter both Unique Code and Password.")
             return
 
-        result = AuthHandler.verify_user_credentials(user, pwd)
+        self._executor.submit(
+            "login", AuthHandler.verify_user_credentials, user, pwd,
+            on_result=lambda result, user=user: self._on_login_result(user, result),
+        )
+
+    def _set_busy(self, busy):
+        self.login_btn.setEnabled(not busy)
+        self.login_btn.setText("Logging in…" if busy else "Log In")
 
+    def _on_login_result(self, user, result):
         if result == "Login Success":
             self.error_label.setStyleSheet("color:green;")
             self.error_label.setText("Login Successful")
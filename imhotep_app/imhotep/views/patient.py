@@ -1,37 +1,21 @@
 import logging
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import List, Optional, Union
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout,
     QFrame, QGridLayout, QSizePolicy, QScrollArea
 )
 from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QFont
-import pymysql
-from pymysql.err import MySQLError
+from ..change_poller import ChangePoller
+from ..db.dashboard import PatientDashboard, load_patient_dashboard
+from ..executor import QueryExecutor
 
 
 class PatientPortal(QWidget):
 
     goto_login = pyqtSignal()
 
-    # Local DB config (edit if needed)
-    DB_CONFIG = {
-        "host": "localhost",
-        "user": "root",
-        "password": "",
-        "database": "imhotep",
-        "charset": "utf8mb4",
-        "autocommit": True,  # ensure reads/writes don't require manual commit
-        "cursorclass": pymysql.cursors.DictCursor,
-    }
-
-    logger = logging.getLogger("ImhotepPatientPortal")
-    if not logger.handlers:
-        logging.basicConfig(
-            filename="app.log",
-            level=logging.INFO,
-            format="%(asctime)s %(levelname)s %(name)s: %(message)s",
-        )
+    logger = logging.getLogger("imhotep.patient")     # handlers: see applog
 
     # --------------------------
     # Small UI helpers
@@ -114,6 +98,14 @@ class PatientPortal(QWidget):
         self.setMinimumSize(760, 580)
         self.setStyleSheet("background-color: #eef2f5;")
 
+        # queries run on worker threads; results come back via signals
+        self._executor = QueryExecutor(self)
+        self._executor.busy_changed.connect(self._set_busy)
+
+        # a new or dispensed prescription re-renders the dashboard without pressing anything
+        self._poller = ChangePoller(self, prepare=self._dashboard_for_changes)
+        self._poller.changes.connect(self._on_dashboard_changed)
+
         self._build_ui()
         self._load_data()
 
@@ -177,112 +169,75 @@ class PatientPortal(QWidget):
 
         self.main_layout.addLayout(self.grid)
 
-    # --------------------------
-    # DB helpers (self-contained, PyMySQL)
-    # --------------------------
-    @classmethod
-    def _get_conn(cls):
-        """
-        Return a fresh PyMySQL connection using only local DB_CONFIG.
-        """
-        conn = pymysql.connect(**cls.DB_CONFIG)
-        try:
-            conn.ping(reconnect=True)
-            if hasattr(conn, "autocommit") and not conn.get_autocommit():
-                conn.autocommit(True)
-        except Exception:
-            pass
-        return conn
-
-    @classmethod
-    def _fetch_one(cls, query: str, params: Optional[Tuple] = None) -> Optional[Dict[str, Any]]:
-        try:
-            with cls._get_conn() as conn:
-                with conn.cursor() as cur:
-                    cur.execute(query, params or ())
-                    return cur.fetchone()
-        except MySQLError:
-            cls.logger.exception("Error executing _fetch_one (query=%s, params=%s)", query, params)
-            return None
-
-    @classmethod
-    def _fetch_all(cls, query: str, params: Optional[Tuple] = None) -> List[Dict[str, Any]]:
-        try:
-            with cls._get_conn() as conn:
-                with conn.cursor() as cur:
-                    cur.execute(query, params or ())
-                    return cur.fetchall()
-        except MySQLError:
-            cls.logger.exception("Error executing _fetch_all (query=%s, params=%s)", query, params)
-            return []
-
-    # --------------------------
-    # Data access
-    # --------------------------
-    @classmethod
-    def _get_patient_info(cls, patient_id: int) -> Optional[Dict[str, Any]]:
-        return cls._fetch_one(
-            "SELECT * FROM prescription WHERE Patient_ID = %s",
-            (patient_id,),
-        )
-    
-    
-    
-
-    @classmethod
-    def _get_prescriptions(cls, patient_id: int) -> List[Dict[str, Any]]:
-        # Using all relevant columns from Prescription table
-        return cls._fetch_all(
-            """
-            SELECT Pr_ID, Patient_ID, Doctor_Sugg, Prescription, Visit_Date, Dispense
-            FROM Prescription
-            WHERE Patient_ID = %s
-            ORDER BY COALESCE(Visit_Date, '1900-01-01') DESC, Pr_ID DESC
-            LIMIT 20
-            """,
-            (patient_id,),
-        )
-    @classmethod
-    def _get_user_name(cls, user_id: int) -> Optional[str]:
-        row = cls._fetch_one(
-            "SELECT User_Name FROM user WHERE User_ID = %s",
-            (user_id,),
-        )
-        return row["User_Name"] if row else None
-
     # --------------------------
     # Load and bind data to UI  
     # --------------------------
+    def _set_busy(self, busy: bool):
+        if busy:
+            self.setCursor(Qt.BusyCursor)
+            self.patient_info.setText("Loading…")
+        else:
+            self.unsetCursor()
+
     def _load_data(self):
         if self.patient_id is None:
+            self._executor.cancel("load")
             self._show_empty_state()
             return
 
-        patient = self._get_patient_info(self.patient_id)
-        prescriptions = self._get_prescriptions(self.patient_id)
+        # one query for the whole dashboard (see db/dashboard.py)
+        self._executor.submit(
+            "load", load_patient_dashboard, self.patient_id,
+            on_result=self._apply_data, on_error=self._on_load_error,
+        )
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._poller.start()
 
-        if not patient:
+    def hideEvent(self, event):
+        self._poller.stop()
+        super().hideEvent(event)
+
+    def _dashboard_for_changes(self, changes) -> Optional[PatientDashboard]:
+        # runs on the poller's worker thread: reload only if one of ours changed
+        patient_id = self.patient_id
+        if patient_id is None or all(str(c.patient_id) != str(patient_id) for c in changes):
+            return None
+        return load_patient_dashboard(patient_id)
+
+    def _on_dashboard_changed(self, dash: PatientDashboard):
+        # ignore a refresh for the previous user, or one racing a full load
+        if dash.patient_id == self.patient_id and not self._executor.is_busy("load"):
+            self._apply_data(dash)
+
+    def _on_load_error(self, error: Exception):
+        self.logger.error("Error loading dashboard for patient %s", self.patient_id, exc_info=error)
+        self._show_empty_state()
+
+    def _apply_data(self, dash: PatientDashboard):
+        self.logger.debug("dashboard for patient %s loaded in %d round trip(s)",
+                          dash.patient_id, dash.round_trips)
+        if not dash.found:
             self._show_empty_state()
             return
 
-        name = self._get_user_name(self.patient_id) or "Unknown"
-        uid = patient.get("Patient ID", self.patient_id)
-        self.patient_info.setText(f"Patient: {name}\nUID: {uid}")
+        name = dash.name or "Unknown"
+        self.patient_info.setText(f"Patient: {name}\nUID: {dash.patient_id}")
 
-        if prescriptions:
+        if dash.prescriptions:
             # latest prescription (ordered by Visit_Date DESC, Pr_ID DESC)
-            current = prescriptions[0]
+            current = dash.current
 
             # Suggestion and details from Prescription table
-            sugg = current.get("Doctor_Sugg") or "No suggestions available."
+            sugg = current.doctor_sugg or "No suggestions available."
             self.suggestion_card.set_content(sugg)
 
-            pres_text = current.get("Prescription") or "Medication"
-            doc_text = current.get("Doctor_Sugg") or "—"
-            visit_date = current.get("Visit_Date") or ""
-            dispense = current.get("Dispense")
+            pres_text = current.prescription or "Medication"
+            doc_text = current.doctor_sugg or "—"
+            visit_date = current.visit_date or ""
 
-            status = "Active" if dispense else "Dispensed"
+            status = "Active" if current.dispense else "Dispensed"
 
             self.prescription_card.prescription_label.setText(
                 f"{pres_text}\n(Visit Date: {visit_date}, Status: {status})"
@@ -291,9 +246,9 @@ class PatientPortal(QWidget):
 
             # past prescriptions (skip the first)
             past_items: List[str] = []
-            for p in prescriptions[1:]:
-                txt = p.get("Prescription") or ""
-                dt = p.get("Visit_Date") or ""
+            for p in dash.history:
+                txt = p.prescription or ""
+                dt = p.visit_date or ""
                 if txt:
                     line = f"{txt} - {dt}".strip(" -")
                     past_items.append(line)
@@ -308,15 +263,11 @@ class PatientPortal(QWidget):
             self.prescription_card.doc_info.setText("Provided by: —")
             self.past_card.set_content("No prescription history.")
 
-    def _show_empty_state(self):
+    def _show_empty_state(self, name: Optional[str] = None):
         if self.patient_id is None:
             self.patient_info.setText("Patient: —\nUID: —")
         else:
-            patient = self._get_patient_info(self.patient_id)
-            name = self._get_user_name(self.patient_id) or "—"
-            uid = self.patient_id
-
-            self.patient_info.setText(f"Patient: {name}\nUID: {uid}")
+            self.patient_info.setText(f"Patient: {name or '—'}\nUID: {self.patient_id}")
 
         self.prescription_card.prescription_label.setText("No active prescription")
         self.prescription_card.doc_info.setText("Provided by: —")
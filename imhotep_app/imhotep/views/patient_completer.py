@@ -0,0 +1,72 @@
+# imhotep/views/patient_completer.py
+"""
+Name/ID autocomplete for the "Find Patient" boxes.
+
+    completer = PatientCompleter(self.uid_input)
+    completer.chosen.connect(lambda user_id: self.on_load_patient())
+
+Each keystroke asks db.name_index for suggestions (no SQL) and shows them as
+"Name  ·  ID". Picking one puts the ID in the box and emits chosen(ID).
+Until the index has loaded there are no suggestions; IDs still work as typed.
+"""
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt, pyqtSignal
+from PyQt5.QtWidgets import QCompleter
+
+from ..db.name_index import get_name_index
+
+
+class SuggestionModel(QAbstractListModel):
+    """(User_ID, User_Name) rows: shown as "Name  ·  ID", completed as the ID."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self._rows = list(rows)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        user_id, name = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            return f"{name}  ·  {user_id}"
+        if role == Qt.EditRole:
+            return str(user_id)
+        return None
+
+
+class PatientCompleter(QCompleter):
+    chosen = pyqtSignal(str)            # User_ID of the picked suggestion
+
+    def __init__(self, line_edit, limit=10):
+        super().__init__(line_edit)
+        self.limit = limit
+        self.suggestions = SuggestionModel(self)
+        self.setModel(self.suggestions)
+        # the index has already matched: show its rows as they are
+        self.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.setMaxVisibleItems(limit)
+        line_edit.setCompleter(self)
+        # runs before QLineEdit refreshes the popup for the same edit
+        line_edit.textEdited.connect(self._update)
+        self.activated[str].connect(self.chosen.emit)
+
+    def _update(self, text):
+        self.suggestions.set_rows(get_name_index().complete(text, self.limit))
+
+    def resolve(self, text):
+        """
+        What a Load button should look up for `text`: the text itself if it
+        is an ID (or empty), else the ID of the one user the name matches.
+        """
+        text = text.strip()
+        if not text or text.isdigit():
+            return text
+        rows = get_name_index().complete(text, 2)
+        return str(rows[0][0]) if len(rows) == 1 else text
@@ -1,53 +1,74 @@
 # imhotep/views/pharmacist.py
+import logging
+from datetime import date
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QLineEdit, QPushButton, QVBoxLayout, QHBoxLayout,
-    QFrame, QGroupBox, QSizePolicy, QSpacerItem, QMessageBox, QScrollArea
+    QFrame, QGroupBox, QSizePolicy, QSpacerItem, QMessageBox
 )
 from PyQt5.QtGui import QFont
-from PyQt5.QtCore import Qt, pyqtSignal
-import pymysql
-from pymysql import err as pymysql_err
-
-
-# ---------------- Database config + local connector ----------------
-DB_CONFIG = dict(
-    host="localhost",
-    user="root",
-    password="",
-    database="imhotep",
-    charset="utf8mb4",
-)
-
-def get_connection():
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from ..db import queries
+from ..db.config import env_int, load_env
+from ..change_poller import ChangePoller
+from ..db.connection import fetch_all
+from ..db.names import get_name_cache
+from ..db.work_queue import DEFAULT_CLAIM_SIZE, WorkQueue
+from ..executor import QueryExecutor
+from .patient_completer import PatientCompleter
+from .pharma_list import DISPENSE, PATIENT_ID, PR_ID, VISIT_DATE, PrescriptionListView
 
-    return pymysql.connect(
-        host=DB_CONFIG["host"],
-        user=DB_CONFIG["user"],
-        password=DB_CONFIG["password"],
-        database=DB_CONFIG["database"],
-        charset=DB_CONFIG.get("charset", "utf8mb4"),
-        autocommit=False,                       # explicit commits where needed
-        cursorclass=pymysql.cursors.Cursor,     # fetches tuples like (..,..)
-    )
+logger = logging.getLogger("imhotep.pharma")
 
 
 class PharmacistPortal(QWidget):
 
     goto_login = pyqtSignal()
 
+    # "all patients" list: rows per page (PHARMA_PAGE_SIZE in .env)
+    DEFAULT_PAGE_SIZE = 50
+
     def __init__(self):
         super().__init__()
         self._current_user_id = None
         self._current_user_name = None
 
+        load_env()
+        self.page_size = max(1, env_int("PHARMA_PAGE_SIZE", self.DEFAULT_PAGE_SIZE))
+        self._page_after = None     # keyset of the last card shown: (Visit_Date, Pr_ID)
+        self._has_more = False
+
+        # work queue (see db/work_queue.py): prescriptions claimed by this pharmacist
+        self.claim_size = max(1, env_int("PHARMA_CLAIM_SIZE", DEFAULT_CLAIM_SIZE))
+        self._queue = None
+        self._claimed = set()
+
+        # what the list shows: None, "all", "patient" (self._list_patient_id) or "queue"
+        self._list_mode = None
+        self._list_patient_id = None
+        self._renew_timer = QTimer(self)
+        self._renew_timer.timeout.connect(self._renew_claims)
+
         self.setWindowTitle("Imhotep — Pharmacist's Portal")
         self.setGeometry(100, 50, 1000, 750)
+
+        # queries run on worker threads; results come back via signals
+        self._executor = QueryExecutor(self)
+        self._executor.busy_changed.connect(self._set_busy)
+
+        # other counters' writes (new prescriptions, dispenses) merged in while shown
+        self._poller = ChangePoller(self, prepare=self._rows_for_changes)
+        self._poller.changes.connect(self._merge_changes)
+
         self._build_ui()
 
     # ---------------- Public API ----------------
     def set_user(self, user_id: str, user_name: str = None):
         self._current_user_id = user_id
         self._current_user_name = user_name or "—"
+        self._queue = WorkQueue.from_env(user_id) if user_id is not None else None
+        if self._queue is not None:
+            # renew well before the lease runs out
+            self._renew_timer.setInterval(int(self._queue.lease.total_seconds() * 1000 / 3))
 
     # ---------------- UI ----------------
     def _build_ui(self):
@@ -116,7 +137,7 @@ class PharmacistPortal(QWidget):
         lbl_find = QLabel("Find Patient")
         lbl_find.setFont(QFont("Segoe UI", 13, QFont.Bold))
         self.input_uid = QLineEdit()
-        self.input_uid.setPlaceholderText("Enter Patient ID (or leave blank for all)")
+        self.input_uid.setPlaceholderText("Patient name or ID (or leave blank for all)")
         self.input_uid.setFixedHeight(36)
         self.input_uid.setStyleSheet("""
             QLineEdit {
@@ -126,6 +147,8 @@ class PharmacistPortal(QWidget):
                 border: 1px solid #7fb3ff; background: #fff;
             }
         """)
+        self.uid_completer = PatientCompleter(self.input_uid)
+        self.uid_completer.chosen.connect(lambda _: self._on_load())
         btn_load = QPushButton("Load Prescription(s)")
         btn_load.setFixedHeight(44)
         btn_load.setCursor(Qt.PointingHandCursor)
@@ -138,9 +161,22 @@ class PharmacistPortal(QWidget):
             QPushButton:pressed { background-color: #1f5fa8; }
         """)
         btn_load.clicked.connect(self._on_load)
+        self.btn_claim = QPushButton("Claim Next Prescriptions")
+        self.btn_claim.setFixedHeight(44)
+        self.btn_claim.setCursor(Qt.PointingHandCursor)
+        self.btn_claim.setStyleSheet("""
+            QPushButton {
+                background-color: #17a2b8; color: white; border-radius: 6px;
+                font-weight: 600; padding: 6px 14px;
+            }
+            QPushButton:hover { background-color: #138496; }
+            QPushButton:pressed { background-color: #117a8b; }
+        """)
+        self.btn_claim.clicked.connect(self._on_claim)
         fg_layout.addWidget(lbl_find)
         fg_layout.addWidget(self.input_uid)
         fg_layout.addWidget(btn_load)
+        fg_layout.addWidget(self.btn_claim)
         find_group.setLayout(fg_layout)
 
         # patient details
@@ -170,27 +206,45 @@ class PharmacistPortal(QWidget):
         self.left_col.addStretch(1)
         self.left_col.addWidget(btn_logout, alignment=Qt.AlignLeft)
 
-        # right column with scroll
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
-        scroll_area.setStyleSheet("QScrollArea { border: none; }")
-
-        scroll_content = QWidget()
-        self.right_col = QVBoxLayout(scroll_content)
+        # right column: virtualized card list (see pharma_list.py)
+        self.right_col = QVBoxLayout()
         self.right_col.setSpacing(12)
 
         pr_label = QLabel("Pending Prescriptions")
         pr_label.setFont(QFont("Segoe UI", 12, QFont.Bold))
         self.right_col.addWidget(pr_label)
-        self.right_col.addStretch(1)
 
-        scroll_content.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        scroll_area.setWidget(scroll_content)
+        self.empty_lbl = QLabel("No prescriptions found.")
+        self.empty_lbl.setStyleSheet("color: #777; font-style: italic;")
+        self.empty_lbl.hide()
+        self.right_col.addWidget(self.empty_lbl)
+
+        self.list_view = PrescriptionListView()
+        self.list_view.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.list_view.dispense_requested.connect(self._on_dispense)
+        # fetch the next page as the user nears the end (or while the list is too short to scroll)
+        self.list_view.near_end.connect(self._maybe_fetch_more)
+        self.right_col.addWidget(self.list_view, 1)
+
+        # bulk dispense of the cards selected with (Ctrl/Shift+) click
+        self.btn_dispense_selected = QPushButton("Dispense Selected")
+        self.btn_dispense_selected.setFixedHeight(36)
+        self.btn_dispense_selected.setCursor(Qt.PointingHandCursor)
+        self.btn_dispense_selected.setStyleSheet("""
+            QPushButton { background-color: #28a745; color: white; border-radius: 6px;
+                          font-weight: 600; padding: 6px 14px; }
+            QPushButton:hover { background-color: #218838; }
+            QPushButton:pressed { background-color: #1e7e34; }
+            QPushButton:disabled { background-color: #a5d6b1; }
+        """)
+        self.btn_dispense_selected.setEnabled(False)
+        self.btn_dispense_selected.clicked.connect(self._on_dispense_selected)
+        self.list_view.selectionModel().selectionChanged.connect(self._update_bulk_button)
+        self.right_col.addWidget(self.btn_dispense_selected, alignment=Qt.AlignRight)
 
         # compose
         self.card_layout.addLayout(self.left_col, 2)
-        self.card_layout.addWidget(scroll_area, 3)
+        self.card_layout.addLayout(self.right_col, 3)
 
         outer.addWidget(self.card, alignment=Qt.AlignHCenter)
         outer.addSpacerItem(QSpacerItem(0, 16, QSizePolicy.Minimum, QSizePolicy.Expanding))
@@ -206,175 +260,333 @@ class PharmacistPortal(QWidget):
         self.right_col.setSpacing(int(16 * scale))
         return super().resizeEvent(event)
 
-    def _query_prescriptions_all(self):
-        conn = get_connection()
-        cur = conn.cursor()
-        try:
-            cur.execute("""
-                SELECT DISTINCT
-                    p.Doctor_Sugg,
-                    p.Prescription,
-                    p.Visit_Date,
-                    p.Dispense,
-                    u.User_Name,
-                    p.Patient_ID
-                FROM prescription p
-                JOIN `user` u ON p.Patient_ID = u.User_ID
-                ORDER BY p.Visit_Date DESC
-            """)
-            return cur.fetchall()
-        finally:
-            try:
-                cur.close()
-            except Exception:
-                pass
-            conn.close()
+    def _query_prescriptions_page(self, after, size):
+        """
+        One page of the "all patients" list after keyset `after` (None = first page).
+        Returns (rows, next_after, has_more); tuple rows are unpacked in _append_prescriptions.
+        """
+        rows = []
+        if after is None:
+            rows = fetch_all(queries.PHARMA_PAGE_DATED_FIRST, (size,), as_dict=False)
+        elif after[0] is not None:
+            visit_date, pr_id = after
+            rows = fetch_all(queries.PHARMA_PAGE_DATED_AFTER,
+                             (visit_date, visit_date, pr_id, size), as_dict=False)
+
+        # dated rows exhausted: carry on with the undated ones in the same page
+        if len(rows) < size:
+            remaining = size - len(rows)
+            if after is not None and after[0] is None:
+                rows += fetch_all(queries.PHARMA_PAGE_UNDATED_AFTER, (after[1], remaining), as_dict=False)
+            else:
+                rows += fetch_all(queries.PHARMA_PAGE_UNDATED_FIRST, (remaining,), as_dict=False)
+
+        next_after = (rows[-1][3], rows[-1][0]) if rows else after
+        return self._with_names(rows), next_after, len(rows) == size
 
     def _query_prescriptions_by_id(self, patient_id):
-        conn = get_connection()
-        cur = conn.cursor()
-        try:
-            cur.execute("""
-                SELECT DISTINCT
-                    p.Doctor_Sugg,
-                    p.Prescription,
-                    p.Visit_Date,
-                    p.Dispense,
-                    u.User_Name,
-                    p.Patient_ID
-                FROM prescription p
-                JOIN `user` u ON p.Patient_ID = u.User_ID
-                WHERE p.Patient_ID = %s
-                AND p.Dispense = 1       -- >>> ONLY ACTIVE
-                ORDER BY p.Visit_Date DESC
-            """, (patient_id,))
-            return cur.fetchall()
-        finally:
-            try: cur.close()
-            except: pass
-            conn.close()
-    
+        return self._with_names(fetch_all(queries.PHARMA_BY_PATIENT, (patient_id,), as_dict=False))
+
+    @staticmethod
+    def _with_names(rows):
+        """Insert the patient name before Patient_ID; one IN (...) query for all uncached names."""
+        names = get_name_cache().get_many(row[-1] for row in rows)
+        return [(*row[:-1], names.get(row[-1]), row[-1]) for row in rows]
+
+    def _set_busy(self, busy):
+        if busy:
+            self.setCursor(Qt.BusyCursor)
+        else:
+            self.unsetCursor()
+
     def clear_portal(self):
+        self._executor.cancel("load")
+        self._executor.cancel("page")
+        self._executor.cancel("claim")
+        self._has_more = False
+        self._release_claims()
+        self._list_mode = None
         self.input_uid.clear()
 
         # Patient details reset
         self.lbl_name.setText("Name: —")
         self.lbl_uid.setText("UID: —")
 
-        while self.right_col.count() > 2:
-            item = self.right_col.takeAt(1)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
+        self._clear_prescriptions_area()
 
     def showEvent(self, event):
         super().showEvent(event)
         self.clear_portal()
+        self._poller.start()
 
-    def _clear_prescriptions_area(self):
-        while self.right_col.count() > 2:
-            item = self.right_col.takeAt(1)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
-
-    def _create_prescription_card(self, info_text, med_text, patient_id):
-        card = QFrame()
-        card.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Minimum)
-        card.setStyleSheet("""
-            QFrame { border: 1px solid rgba(0,0,0,0.08); border-radius: 10px; background-color: #FFFFFF; }
-        """)
-        lay = QVBoxLayout(card)
-        lay.setContentsMargins(12, 12, 12, 12)
-
-        med_label = QLabel(f"<b>Medication:</b> {med_text}")
-        med_label.setFont(QFont("Segoe UI", 10))
-        info_label = QLabel(info_text)
-        info_label.setFont(QFont("Segoe UI", 9))
-        info_label.setStyleSheet("color: #555;")
-
-        btn_dispense = QPushButton("Dispense")
-        btn_dispense.setCursor(Qt.PointingHandCursor)
-        btn_dispense.setStyleSheet("""
-            QPushButton {
-                background-color: #28a745; color: white; border-radius: 8px;
-                font-weight: 600; padding: 4px 10px;
-            }
-            QPushButton:hover { background-color: #218838; }
-            QPushButton:pressed { background-color: #1e7e34; }
-        """)
-        btn_dispense.clicked.connect(lambda _, pid=patient_id, w=card: self._on_dispense(pid, w))
+    def hideEvent(self, event):
+        self._poller.stop()
+        if not event.spontaneous():
+            # Back, Log Out or any other page switch (not minimizing): hand the
+            # claims back, or _renew_timer would keep them from everyone else
+            self._executor.cancel("claim")
+            self._release_claims()
+        super().hideEvent(event)
 
-        lay.addWidget(med_label)
-        lay.addWidget(info_label)
-        lay.addWidget(btn_dispense, alignment=Qt.AlignRight)
-        return card
+    def _clear_prescriptions_area(self):
+        self.list_view.list_model.clear()
+        self.empty_lbl.hide()
 
     def _load_prescriptions(self, rows):
-        self._clear_prescriptions_area()
-        if not rows:
-            empty_lbl = QLabel("No prescriptions found.")
-            empty_lbl.setStyleSheet("color: #777; font-style: italic;")
-            self.right_col.insertWidget(1, empty_lbl)
-            return
+        self.list_view.list_model.set_rows(rows)
+        self.list_view.scrollToTop()
+        self.empty_lbl.setVisible(not rows)
 
-        for doctor_sugg, prescription_text, visit_date, dispense, patient_name, patient_id in rows:
-            info_text = (
-                f"Patient: {patient_name} (ID: {patient_id})\n"
-                f"Doctor Suggestion: {doctor_sugg}\n"
-                f"Dispense Status: {'Active' if dispense else 'Dispensed'}\n"
-                f"Visit Date: {visit_date}"
-            )
-            card = self._create_prescription_card(info_text, prescription_text, patient_id)
-            self.right_col.insertWidget(1, card)
+    def _append_prescriptions(self, rows):
+        self.list_view.list_model.append_rows(rows)
 
     def _on_load(self):
-        uid = self.input_uid.text().strip()
-        try:
-            if uid:
-                rows = self._query_prescriptions_by_id(uid)
-                if rows:
-                    name = rows[0][4]
-                    self.lbl_name.setText(f"Name: {name}")
-                    self.lbl_uid.setText(f"UID: {uid}")
-                    self._load_prescriptions(rows)
-                else:
-                    self.lbl_name.setText("Name: —")
-                    self.lbl_uid.setText("UID: —")
-                    QMessageBox.information(self, "No Results",
-                                            f"No prescriptions found for Patient ID {uid}.")
-            else:
-                rows = self._query_prescriptions_all()
-                self.lbl_name.setText("Name: All Patients")
-                self.lbl_uid.setText("UID: —")
-                self._load_prescriptions(rows)
-        except pymysql_err.MySQLError as e:
-            QMessageBox.critical(self, "Database Error", str(e))
-
-    def _on_dispense(self, patient_id, card_widget):
-        conn = None
-        cur = None
-        try:
-            conn = get_connection()
-            cur = conn.cursor()
-            cur.execute("UPDATE prescription SET Dispense=0 WHERE Patient_ID=%s", (patient_id,))
-            conn.commit()
+        uid = self.uid_completer.resolve(self.input_uid.text())
+        if uid and not uid.isdigit():
+            QMessageBox.information(self, "Not Found", "No single patient by that name; pick one from the list.")
+            return
+        self.input_uid.setText(uid)
+        # pressing Load again (e.g. for another patient) supersedes this request;
+        # a claim still running is handed back when it arrives (on_discard)
+        self._executor.cancel("page")
+        self._executor.cancel("claim")
+        self._has_more = False
+        self._release_claims()
+        if uid:
+            self._executor.submit(
+                "load", self._query_prescriptions_by_id, uid,
+                on_result=lambda rows, uid=uid: self._on_loaded_by_id(uid, rows),
+                on_error=self._on_db_error,
+            )
+        else:
+            self._executor.submit(
+                "load", self._query_prescriptions_page, None, self.page_size,
+                on_result=self._on_loaded_all,
+                on_error=self._on_db_error,
+            )
+
+    def _on_loaded_by_id(self, uid, rows):
+        if rows:
+            self._list_mode, self._list_patient_id = "patient", uid
+            name = rows[0][5] or "Unknown"
+            self.lbl_name.setText(f"Name: {name}")
+            self.lbl_uid.setText(f"UID: {uid}")
+            self._load_prescriptions(rows)
+        else:
+            self.lbl_name.setText("Name: —")
+            self.lbl_uid.setText("UID: —")
+            QMessageBox.information(self, "No Results",
+                                    f"No prescriptions found for Patient ID {uid}.")
+
+    def _on_loaded_all(self, page):
+        rows, self._page_after, self._has_more = page
+        self._list_mode = "all"
+        self.lbl_name.setText("Name: All Patients")
+        self.lbl_uid.setText("UID: —")
+        self._load_prescriptions(rows)
+
+    def _maybe_fetch_more(self):
+        if not self._has_more or self._executor.is_busy("page") or self._executor.is_busy("load"):
+            return
+        self._executor.submit(
+            "page", self._query_prescriptions_page, self._page_after, self.page_size,
+            on_result=self._on_page_loaded,
+            on_error=self._on_page_error,
+        )
+
+    def _on_page_loaded(self, page):
+        rows, self._page_after, self._has_more = page
+        self._append_prescriptions(rows)
+
+    def _on_page_error(self, e):
+        self._has_more = False      # don't retry on every scroll tick; Load starts over
+        self._on_db_error(e)
+
+    def _on_db_error(self, e):
+        QMessageBox.critical(self, "Database Error", str(e))
+
+    def _on_dispense(self, pr_id, patient_id):
+        if pr_id in self._claimed:
+            self._executor.submit(
+                f"dispense:{pr_id}", self._queue.complete, [pr_id],
+                on_result=lambda done, pid=patient_id, pr=pr_id: self._on_dispensed(pid, pr, pr in done),
+                on_error=lambda e: QMessageBox.critical(self, "Error", f"Database error: {e}"),
+            )
+            return
+        if self._queue is None:
+            QMessageBox.information(self, "Dispense", "Log in as a pharmacist to dispense prescriptions.")
+            return
+        # not claimed by us: skipped if another pharmacist holds it
+        self._executor.submit(
+            f"dispense:{pr_id}", self._queue.dispense, [pr_id],
+            on_result=lambda done, pid=patient_id, pr=pr_id: self._on_dispensed(pid, pr, pr in done),
+            on_error=lambda e: QMessageBox.critical(self, "Error", f"Database error: {e}"),
+        )
+
+    def _on_dispensed(self, patient_id, pr_id, dispensed):
+        self._claimed.discard(pr_id)
+        if dispensed:
             QMessageBox.information(self, "Dispensed",
-                                    f"Prescription for Patient ID {patient_id} has been dispensed.")
-            card_widget.deleteLater()
-        except pymysql_err.MySQLError as e:
-            # Attempt rollback if the UPDATE failed mid-transaction
-            try:
-                if conn:
-                    conn.rollback()
-            except Exception:
-                pass
-            QMessageBox.critical(self, "Error", f"Database error: {e}")
-        finally:
+                                    f"Prescription {pr_id} for Patient ID {patient_id} has been dispensed.")
+        else:
+            QMessageBox.warning(self, "Already Dispensed",
+                                f"Prescription {pr_id} for Patient ID {patient_id} was already dispensed "
+                                f"or is being handled by another pharmacist.")
+        # either way it is no longer ours to do; no-op if the list was reloaded meanwhile
+        self.list_view.list_model.remove_key(pr_id)
+
+    def _update_bulk_button(self, *_):
+        count = len(self.list_view.selectionModel().selectedIndexes())
+        self.btn_dispense_selected.setEnabled(count > 0 and not self._executor.is_busy("dispense:bulk"))
+        self.btn_dispense_selected.setText(f"Dispense Selected ({count})" if count else "Dispense Selected")
+
+    def _on_dispense_selected(self):
+        pr_ids = [row[0] for row in self.list_view.selected_rows()]
+        if not pr_ids:
+            return
+        if self._queue is None:
+            QMessageBox.information(self, "Dispense", "Log in as a pharmacist to dispense prescriptions.")
+            return
+        self.btn_dispense_selected.setEnabled(False)
+        # one transaction either way; outside the queue, others' claims are skipped
+        dispense = self._queue.complete if self._list_mode == "queue" else self._queue.dispense
+        self._executor.submit(
+            "dispense:bulk", dispense, pr_ids,
+            on_result=lambda done, ids=pr_ids: self._on_bulk_dispensed(ids, len(done)),
+            on_error=self._on_bulk_error,
+        )
+
+    def _on_bulk_dispensed(self, pr_ids, count):
+        for pr_id in pr_ids:
+            self._claimed.discard(pr_id)
+            self.list_view.list_model.remove_key(pr_id)
+        self._update_bulk_button()
+        message = f"{count} of {len(pr_ids)} prescriptions dispensed."
+        if count < len(pr_ids):
+            message += f"\n{len(pr_ids) - count} had already been dispensed or taken over."
+        QMessageBox.information(self, "Dispensed", message)
+
+    def _on_bulk_error(self, e):
+        # execute_many() rolled the whole batch back
+        self._update_bulk_button()
+        QMessageBox.critical(self, "Error", f"Database error: {e}")
+
+    # ---------------- work queue ----------------
+    def _on_claim(self):
+        if self._queue is None:
+            QMessageBox.information(self, "Work Queue", "Log in as a pharmacist to claim prescriptions.")
+            return
+        if self._executor.is_busy("claim"):
+            return
+        self._executor.cancel("load")
+        self._executor.cancel("page")
+        self._has_more = False
+        self._executor.submit(
+            "claim", self._claim, self._queue, self.claim_size,
+            on_result=self._on_claimed,
+            on_error=self._on_db_error,
+            on_discard=lambda rows, queue=self._queue: self._release((row[PR_ID] for row in rows), queue),
+        )
+
+    @classmethod
+    def _claim(cls, queue, count):
+        return cls._with_names(queue.claim(count))
+
+    def _on_claimed(self, rows):
+        if self._list_mode != "queue":
+            self._list_mode = "queue"
+            self.lbl_name.setText("Name: My Queue")
+            self.lbl_uid.setText("UID: —")
+            self._load_prescriptions(rows)
+        else:
+            # claiming again adds to what we already hold
+            self._append_prescriptions(rows)
+            self.empty_lbl.setVisible(not self.list_view.list_model.rowCount())
+        self._claimed.update(row[0] for row in rows)
+        if self._claimed:
+            self._renew_timer.start()
+        if not rows:
+            QMessageBox.information(self, "Work Queue", "No unclaimed prescriptions are waiting.")
+
+    def _renew_claims(self):
+        if not self._claimed:
+            self._renew_timer.stop()
+            return
+        sent = set(self._claimed)
+        self._executor.submit(
+            "renew", self._queue.renew, sent,
+            on_result=lambda held, sent=sent: self._on_renewed(sent, held),
+            on_error=lambda e: logger.error("Error renewing claims", exc_info=e),
+        )
+
+    def _on_renewed(self, sent, held):
+        # leases we lost (e.g. the machine slept past the expiry) are someone else's now
+        for pr_id in (sent - held) & self._claimed:
+            self._claimed.discard(pr_id)
+            self.list_view.list_model.remove_key(pr_id)
+
+    def _release_claims(self):
+        """Leave queue mode, handing back whatever is still claimed."""
+        self._renew_timer.stop()
+        if self._list_mode == "queue":
+            self._list_mode = None
+        self._release(self._claimed)
+        self._claimed = set()
+
+    def _release(self, pr_ids, queue=None):
+        """Hand `pr_ids` back to the queue they were claimed from (default: the current one)."""
+        pr_ids, queue = frozenset(pr_ids), queue or self._queue
+        if pr_ids and queue is not None:
+            # own key per batch: a later release must not supersede this one
+            self._executor.submit(
+                f"release:{id(pr_ids)}", queue.release, pr_ids,
+                on_error=lambda e: logger.error("Error releasing claims", exc_info=e),
+            )
+
+    # ---------------- change feed ----------------
+    @classmethod
+    def _rows_for_changes(cls, changes):
+        """(change, list row or None if deleted) pairs; runs on the poller's worker thread."""
+        live = [c for c in changes if not c.deleted]
+        rows = cls._with_names([(c.pr_id, c.doctor_sugg, c.prescription, c.visit_date, c.dispense, c.patient_id)
+                                for c in live])
+        by_id = {row[PR_ID]: row for row in rows}
+        return [(c, by_id.get(c.pr_id)) for c in changes]
+
+    @staticmethod
+    def _list_order(row):
+        # the "all patients" / by-patient order: Visit_Date DESC (undated last), then Pr_ID DESC
+        visit_date = row[VISIT_DATE]
+        if isinstance(visit_date, str):
+            # a date that arrived as text; "" or junk counts as undated, as in the keyset pages
             try:
-                if cur:
-                    cur.close()
-            except Exception:
-                pass
-            if conn:
-                conn.close()
+                visit_date = date.fromisoformat(visit_date.strip()[:10])
+            except ValueError:
+                visit_date = None
+        if not isinstance(visit_date, date):
+            return (1, 0, -row[PR_ID])
+        return (0, -visit_date.toordinal(), -row[PR_ID])
+
+    def _merge_changes(self, pairs):
+        model = self.list_view.list_model
+        for change, row in pairs:
+            if row is None:
+                self._claimed.discard(change.pr_id)
+                model.remove_key(change.pr_id)
+            elif self._list_mode == "all":
+                # rows past the loaded pages turn up while scrolling
+                model.upsert_sorted(row, self._list_order, append=not self._has_more)
+            elif self._list_mode == "patient":
+                if str(row[PATIENT_ID]) == self._list_patient_id and row[DISPENSE]:
+                    model.upsert_sorted(row, self._list_order)
+                else:
+                    model.remove_key(change.pr_id)
+            elif self._list_mode == "queue":
+                if not row[DISPENSE]:
+                    # dispensed elsewhere (or by us a moment ago): nothing left to do here
+                    self._claimed.discard(change.pr_id)
+                    model.remove_key(change.pr_id)
+                elif model.position_of(change.pr_id) >= 0:
+                    model.replace_row(row)
+        if self._list_mode in ("patient", "queue"):
+            self.empty_lbl.setVisible(not model.rowCount())
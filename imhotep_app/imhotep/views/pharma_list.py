@@ -0,0 +1,105 @@
+# imhotep/views/pharma_list.py
+"""
+Virtualized prescription list for the pharmacist portal.
+
+The portal used to build a QFrame + two QLabels + a QPushButton (each with its
+own stylesheet) for every row. Here the rows live in a plain Python list inside
+PrescriptionListModel and PrescriptionCardDelegate paints a card only for the
+rows currently in view, so 100k rows cost a list of tuples and no widgets.
+The Dispense "button" is painted too; the delegate hit-tests clicks on it
+(see card_list.py).
+
+Row tuples are the ones PharmacistPortal._with_names produces:
+    (Pr_ID, Doctor_Sugg, Prescription, Visit_Date, Dispense, patient name, Patient_ID)
+
+See tools/pharma_list_bench.py for numbers against the widget-per-card list.
+"""
+from PyQt5.QtCore import QRect, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QFontMetrics
+from PyQt5.QtWidgets import QAbstractItemView
+
+from .card_list import ButtonCardDelegate, CardListView, RowListModel
+
+PR_ID, DOCTOR_SUGG, PRESCRIPTION, VISIT_DATE, DISPENSE, PATIENT_NAME, PATIENT_ID = range(7)
+
+
+class PrescriptionListModel(RowListModel):
+    key_column = PR_ID
+
+    PrIdRole = Qt.UserRole + 1
+    PatientIdRole = Qt.UserRole + 2
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            return row[PRESCRIPTION]
+        if role == Qt.ToolTipRole:
+            return row[DOCTOR_SUGG]
+        if role == self.PrIdRole:
+            return row[PR_ID]
+        if role == self.PatientIdRole:
+            return row[PATIENT_ID]
+        return None
+
+
+class PrescriptionCardDelegate(ButtonCardDelegate):
+    """Paints one row as the old card: medication, four info lines, a Dispense button."""
+
+    BUTTON_TEXT = "Dispense"
+    BUTTON_COLORS = ("#28a745", "#218838", "#1e7e34")
+    LINE_GAP = 4
+
+    def __init__(self, parent=None):
+        self.med_font = QFont("Segoe UI", 10)
+        self.med_bold = QFont(self.med_font)
+        self.med_bold.setBold(True)
+        self.info_font = QFont("Segoe UI", 9)
+        self._med_metrics = QFontMetrics(self.med_font)
+        self._info_metrics = QFontMetrics(self.info_font)
+        self._label_width = QFontMetrics(self.med_bold).horizontalAdvance("Medication: ")
+        super().__init__(self._med_metrics.height() + self.LINE_GAP + 4 * self._info_metrics.height(), parent)
+
+    def paint_body(self, painter, rect, row):
+        x, y, width = rect.left(), rect.top(), rect.width()
+        med_height = self._med_metrics.height()
+
+        painter.setPen(QColor("#222222"))
+        painter.setFont(self.med_bold)
+        painter.drawText(QRect(x, y, self._label_width, med_height), Qt.AlignLeft | Qt.AlignVCenter,
+                         "Medication: ")
+        painter.setFont(self.med_font)
+        self.draw_line(painter, QRect(x + self._label_width, y, width - self._label_width, med_height),
+                       row[PRESCRIPTION] or "", self._med_metrics)
+        y += med_height + self.LINE_GAP
+
+        painter.setFont(self.info_font)
+        painter.setPen(QColor("#555555"))
+        info_height = self._info_metrics.height()
+        for line in (
+            f"Patient: {row[PATIENT_NAME] or 'Unknown'} (ID: {row[PATIENT_ID]})",
+            f"Doctor Suggestion: {row[DOCTOR_SUGG]}",
+            f"Dispense Status: {'Active' if row[DISPENSE] else 'Dispensed'}",
+            f"Visit Date: {row[VISIT_DATE]}",
+        ):
+            self.draw_line(painter, QRect(x, y, width, info_height), line, self._info_metrics)
+            y += info_height
+
+
+class PrescriptionListView(CardListView):
+    """
+    Card list preset for prescriptions; emits dispense_requested(Pr_ID, Patient_ID).
+    Clicking a card body selects it (Ctrl/Shift extend) for a bulk dispense.
+    """
+
+    dispense_requested = pyqtSignal(object, object)
+
+    def __init__(self, parent=None):
+        super().__init__(PrescriptionListModel(), PrescriptionCardDelegate(), parent)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.card_delegate.button_clicked.connect(self._on_dispense_clicked)
+
+    def _on_dispense_clicked(self, index):
+        row = self.list_model.row_at(index.row())
+        self.dispense_requested.emit(row[PR_ID], row[PATIENT_ID])
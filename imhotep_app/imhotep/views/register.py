@@ -3,10 +3,15 @@ from PyQt5.QtGui import QFont, QIcon
 from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtCore import QTimer
 from pathlib import Path
-from mysql.connector import Error
-import traceback, pymysql
+import traceback
 from PyQt5.QtWidgets import QMessageBox
-import bcrypt
+from ..db import queries
+from ..db.auth import registration_error
+from ..db.connection import IntegrityError, execute, fetch_one
+from ..db.hashing import get_hash_service
+from ..db.name_index import get_name_index
+from ..db.names import get_name_cache
+from ..executor import QueryExecutor
 
 class RegisterView(QWidget):
     goto_selection = pyqtSignal()        # back/cancel
@@ -20,6 +25,10 @@ class RegisterView(QWidget):
         self.setMinimumSize(600, 500)
         self.setStyleSheet("background-color: #f5f5f5;")
 
+        # duplicate check, bcrypt and INSERT run off the GUI thread
+        self._executor = QueryExecutor(self)
+        self._executor.busy_changed.connect(self._set_busy)
+
         # Card
         self.card = QFrame(self)
         self.card.setStyleSheet("QFrame { background-color: white; border-radius: 20px; }")
@@ -227,82 +236,70 @@ class RegisterView(QWidget):
             f"color: {color}; font-size: 13px; font-weight: bold; font-family: 'Segoe UI';"
         )
 
-    # ----- DB: uses shared get_conn() -----
+    def _set_busy(self, busy):
+        self.register_btn.setEnabled(not busy)
+        self.register_btn.setText("Registering…" if busy else "Confirm")
+
+    # ----- DB: uses the shared connection pool -----
     def register_user(self, checked=False):
-        conn = None
-        cur = None
+        # gather & validate inputs
+        fullname = self.full_name.text().strip()
+        unique_code = self.unique_code.text().strip()
+        Match = self.pass_check.text().strip()
+        password = self.password.text().strip()
+        self.notification.clear()
+
+        error = registration_error(fullname, unique_code, password)
+        if error:
+            self.show_notification(error)
+            return
 
+        self._executor.submit(
+            "register", self._create_user, unique_code, fullname, password, Match,
+            on_result=lambda created, code=unique_code: self._on_register_result(code, created),
+            on_error=self._on_register_error,
+        )
+
+    @staticmethod
+    def _create_user(unique_code, fullname, password, match):
+        """Worker thread: returns True if the user was inserted, False if the code is taken."""
+        # both hashes start now and run in parallel on the process pool
+        hashing = get_hash_service()
+        hashed_pw = hashing.hash(password)
+        hashed_m = hashing.hash(match)
+
+        # duplicate check
+        if fetch_one(queries.USER_EXISTS, (unique_code,), as_dict=False):
+            hashed_pw.cancel()
+            hashed_m.cancel()
+            return False
+
+        # insert with hashed password + match
         try:
-            # gather & validate inputs
-            fullname = self.full_name.text().strip()
-            unique_code = self.unique_code.text().strip()
-            Match = self.pass_check.text().strip()
-            password = self.password.text().strip()
-            self.notification.clear()
-
-            if not fullname or not unique_code or not password:
-                self.show_notification("Please fill in all fields.")
-                return
-            if " " in unique_code:
-                self.show_notification("Unique Code cannot contain spaces!")
-                return
-            if not unique_code.isdigit():
-                self.show_notification("Unique Code must contain digits only!")
-                return
-            if not (8 <= len(password) <= 16):
-                self.show_notification("Password must be 8 to 16 characters long!")
-                return
-
-            # connect via PyMySQL
-            conn = pymysql.connect(
-                host="localhost",
-                user="root",
-                password="",
-                database="imhotep",
-                cursorclass=pymysql.cursors.Cursor
-            )
-            cur = conn.cursor()
-
-            # duplicate check
-            cur.execute("SELECT 1 FROM `user` WHERE `User_ID`=%s", (unique_code,))
-            if cur.fetchone():
-                self.show_notification("Unique Code already exists!")
-                return
-
-            # insert with hashed password + match
-            hashed_pw = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-            hashed_m = bcrypt.hashpw(Match.encode('utf-8'), bcrypt.gensalt())
-            cur.execute(
-                "INSERT INTO `user` (`User_ID`, `User_Name`, `Password`, `match`) VALUES (%s, %s, %s, %s)",
-                (unique_code, fullname, hashed_pw.decode('utf-8'), hashed_m.decode('utf-8'))
-            )
-            conn.commit()
-
-            self.show_notification("Registration Successful!", color="green")
-            # optional: emit success
-            self.register_success.emit(unique_code)
-
-            # go back to login
-            self.goto_login.emit()
-
-            # local clear (even though showEvent will clear next time too)
-            self.clear_fields()
-
-        except Exception as e:
-            traceback.print_exc()
-            try:
-                if conn:
-                    conn.rollback()
-            except:
-                pass
-            self.show_notification(f"Database error: {e}")
-            QMessageBox.critical(self, "Database error", str(e))
-
-        finally:
-            try:
-                if cur:
-                    cur.close()
-                if conn:
-                    conn.close()
-            except:
-                pass
+            execute(queries.USER_INSERT, (unique_code, fullname, hashed_pw.result(), hashed_m.result()))
+        except IntegrityError:
+            # someone registered the same code between the check and the insert
+            return False
+        get_name_cache().invalidate(unique_code)
+        get_name_index().add(unique_code, fullname)
+        return True
+
+    def _on_register_result(self, unique_code, created):
+        if not created:
+            self.show_notification("Unique Code already exists!")
+            return
+
+        self.show_notification("Registration Successful!", color="green")
+        # optional: emit success
+        self.register_success.emit(unique_code)
+
+        # go back to login
+        self.goto_login.emit()
+
+        # local clear (even though showEvent will clear next time too)
+        self.clear_fields()
+
+    def _on_register_error(self, e):
+        traceback.print_exception(type(e), e, e.__traceback__)
+        self.show_notification(f"Database error: {e}")
+        QMessageBox.critical(self, "Database error", str(e))
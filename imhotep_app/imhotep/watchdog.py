@@ -0,0 +1,113 @@
+# imhotep/watchdog.py
+"""
+GUI stall watchdog.
+
+    watchdog = StallWatchdog(router, view=router.current_view)
+    watchdog.start()
+
+A QTimer on the GUI thread beats every STALL_HEARTBEAT_MS (default 100) and
+notes which view is showing. A daemon thread checks the beat; once it is
+older than STALL_THRESHOLD_MS (default 500) the event loop is blocked, and
+the watchdog logs the GUI thread's Python stack (sys._current_frames()) to
+"imhotep.watchdog" together with the active view. When the loop comes back
+it logs how long the stall lasted. STALL_THRESHOLD_MS=0 turns it off.
+
+Cost while nothing is stuck: one timer tick on the GUI thread and one
+wake-up of the checker thread per heartbeat, no stack walks.
+
+A stall inside C code that holds the GIL (the checker cannot run then) is
+still noticed from the gap between two beats, just without a stack.
+"""
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from PyQt5.QtCore import QObject, QTimer
+
+from .db.config import env_int, load_env
+
+DEFAULT_THRESHOLD_MS = 500
+DEFAULT_HEARTBEAT_MS = 100
+MAX_STACK_FRAMES = 40
+
+logger = logging.getLogger("imhotep.watchdog")
+
+
+class StallWatchdog(QObject):
+    def __init__(self, parent=None, view=None, threshold_ms=None, heartbeat_ms=None):
+        super().__init__(parent)
+        load_env()
+        self.threshold = (threshold_ms if threshold_ms is not None
+                          else env_int("STALL_THRESHOLD_MS", DEFAULT_THRESHOLD_MS)) / 1000
+        heartbeat_ms = heartbeat_ms or env_int("STALL_HEARTBEAT_MS", DEFAULT_HEARTBEAT_MS)
+        self._view = view or (lambda: None)
+        self._gui_ident = threading.get_ident()     # constructed on the GUI thread
+        self._last_beat = time.monotonic()
+        self._last_view = None
+        self._reported = False                      # current stall already logged by the checker
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.stalls = 0                             # counters for whoever wants them
+        self.stalled_ms = 0.0
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(max(10, heartbeat_ms))
+        self._timer.timeout.connect(self._beat)
+
+    def start(self):
+        if self.threshold <= 0 or self.is_running():
+            return
+        self._last_beat = time.monotonic()
+        self._timer.start()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="gui-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._timer.stop()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    # ---------------- GUI thread ----------------
+    def _beat(self):
+        now = time.monotonic()
+        gap = now - self._last_beat
+        self._last_beat = now
+        stalled = gap - self._timer.interval() / 1000
+        if stalled >= self.threshold:
+            self.stalls += 1
+            self.stalled_ms += stalled * 1000
+            if self._reported:
+                logger.warning("GUI stall over after %.0f ms (view: %s)", stalled * 1000, self._last_view)
+            else:
+                logger.warning("GUI stalled for %.0f ms (view: %s); no stack, the GIL was held",
+                               stalled * 1000, self._last_view)
+        self._reported = False
+        try:
+            self._last_view = self._view()
+        except Exception:
+            self._last_view = None
+
+    # ---------------- checker thread ----------------
+    def _watch(self):
+        interval = self._timer.interval() / 1000
+        while not self._stop.wait(interval):
+            blocked = time.monotonic() - self._last_beat - interval
+            if blocked >= self.threshold and not self._reported:
+                self._reported = True
+                logger.warning("GUI blocked for %.0f ms (view: %s); GUI thread stack:\n%s",
+                               blocked * 1000, self._last_view, self.gui_stack())
+
+    def gui_stack(self):
+        frame = sys._current_frames().get(self._gui_ident)
+        if frame is None:
+            return "  (GUI thread not found)"
+        return "".join(traceback.format_stack(frame, limit=MAX_STACK_FRAMES))
@@ -0,0 +1,40 @@
+# tests/conftest.py
+"""
+Shared fixtures. Tests run against a throwaway SQLite database (the backend
+creates the schema on first use, schema.init_sqlite), never the .env one.
+
+    cd imhotep_app && python -m pytest -q tests
+"""
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+_ENV = ("DB_BACKEND", "DB_SQLITE_PATH", "CHANGE_POLL_MS", "BCRYPT_COST")
+
+
+@pytest.fixture(scope="module")
+def sqlite_db(tmp_path_factory):
+    """Point the app at a fresh SQLite file for one test module; yields its path."""
+    from imhotep.db.connection import close_pool
+    from imhotep.db.names import get_name_cache
+
+    saved = {key: os.environ.get(key) for key in _ENV}
+    path = str(tmp_path_factory.mktemp("db") / "imhotep.db")
+    os.environ.update({
+        "DB_BACKEND": "sqlite",
+        "DB_SQLITE_PATH": path,
+        "CHANGE_POLL_MS": "3600000",
+        "BCRYPT_COST": "4",
+    })
+    close_pool()                    # the next query opens `path`
+    get_name_cache().invalidate()
+    yield path
+    close_pool()
+    get_name_cache().invalidate()
+    for key, value in saved.items():
+        if value is None:
+            os.environ.pop(key, None)
+        else:
+            os.environ[key] = value
@@ -0,0 +1,74 @@
+# tests/test_dashboard.py
+"""
+db/dashboard.py: a dashboard render is one round trip (queries.PATIENT_DASHBOARD).
+The documented exception is a patient without prescriptions, whose name then
+comes from the name cache: one more query if it isn't cached yet.
+"""
+import pytest
+
+WITH_HISTORY, NO_HISTORY, NO_USER_ROW, UNKNOWN = 7001, 7002, 7003, 7004
+
+
+@pytest.fixture(scope="module")
+def patients(sqlite_db):
+    from imhotep.db import queries
+    from imhotep.db.connection import execute, execute_many
+
+    execute_many(queries.USER_INSERT, [(WITH_HISTORY, "Amara Osei", "x", "y"),
+                                       (NO_HISTORY, "Idris Bell", "x", "y")])
+    execute_many(queries.PRESCRIPTION_INSERT, [(WITH_HISTORY, f"note {i}", f"rx {i}") for i in range(3)]
+                 + [(NO_USER_ROW, "orphan note", "orphan rx")])
+    execute("UPDATE prescription SET Visit_Date = date('2024-03-01', '+' || Pr_ID || ' days')")
+
+
+@pytest.fixture(autouse=True)
+def cold_cache():
+    from imhotep.db.names import get_name_cache
+
+    get_name_cache().invalidate()
+
+
+def test_patient_with_prescriptions_is_one_round_trip(patients):
+    from imhotep.db.dashboard import load_patient_dashboard
+
+    dash = load_patient_dashboard(WITH_HISTORY)
+    assert dash.round_trips == 1
+    assert dash.found and dash.name == "Amara Osei"
+    assert [p.doctor_sugg for p in dash.prescriptions] == ["note 2", "note 1", "note 0"]    # latest first
+    assert dash.current.doctor_sugg == "note 2"
+
+
+def test_name_from_the_dashboard_query_is_cached(patients):
+    from imhotep.db.connection import count_queries
+    from imhotep.db.dashboard import load_patient_dashboard
+    from imhotep.db.names import get_name_cache
+
+    load_patient_dashboard(WITH_HISTORY)
+    with count_queries() as counter:
+        assert get_name_cache().get(WITH_HISTORY) == "Amara Osei"
+    assert counter.count == 0
+
+
+def test_patient_without_prescriptions_falls_back_to_the_name_cache(patients):
+    from imhotep.db.dashboard import load_patient_dashboard
+
+    dash = load_patient_dashboard(NO_HISTORY)
+    assert dash.round_trips == 2                # dashboard query + the cache's lookup
+    assert dash.found and dash.name == "Idris Bell" and dash.prescriptions == []
+    assert load_patient_dashboard(NO_HISTORY).round_trips == 1     # cached by now
+
+
+def test_prescriptions_without_a_user_row_still_show(patients):
+    from imhotep.db.dashboard import load_patient_dashboard
+
+    dash = load_patient_dashboard(NO_USER_ROW)
+    assert dash.round_trips == 1
+    assert dash.found and dash.name is None
+    assert [p.doctor_sugg for p in dash.prescriptions] == ["orphan note"]
+
+
+def test_unknown_patient_is_not_found(patients):
+    from imhotep.db.dashboard import load_patient_dashboard
+
+    dash = load_patient_dashboard(UNKNOWN)
+    assert not dash.found and dash.prescriptions == []
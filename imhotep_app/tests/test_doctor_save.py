@@ -0,0 +1,63 @@
+# tests/test_doctor_save.py
+"""
+Saving a prescription from the doctor portal after a patient *name* was typed
+in the ID box: it goes in under that patient's User_ID, or not at all.
+"""
+import pytest
+
+
+@pytest.fixture(scope="module")
+def portal(sqlite_db):
+    from PyQt5.QtWidgets import QApplication
+
+    from imhotep.db import queries
+    from imhotep.db.connection import execute
+    from imhotep.db.name_index import get_name_index
+    from imhotep.views.doctor import DoctorPortal
+
+    app = QApplication.instance() or QApplication([])
+    execute(queries.USER_INSERT, (4242, "Zenobia Quill", "x", "y"))
+    execute(queries.USER_INSERT, (4243, "Zeb Quarry", "x", "y"))
+    get_name_index().load()
+
+    view = DoctorPortal(doctor_id="1", doctor_name="Dr. Test")
+    yield app, view
+    view.deleteLater()
+
+
+def _save(app, view, typed):
+    from PyQt5.QtCore import QDeadlineTimer, QThread
+
+    view.clear_portal()
+    view.uid_input.setText(typed)
+    view.notes_edit.setPlainText("follow up in a week")
+    view.prescription_edit.setPlainText("paracetamol 500mg")
+    view.on_save_prescription()
+    deadline = QDeadlineTimer(5000)
+    while view._executor.is_busy() and not deadline.hasExpired():
+        app.processEvents()
+        QThread.msleep(10)
+    assert not view._executor.is_busy()
+
+
+def _patient_ids():
+    from imhotep.db.connection import fetch_all
+
+    return [row[0] for row in fetch_all("SELECT Patient_ID FROM prescription ORDER BY Pr_ID", as_dict=False)]
+
+
+def test_save_after_typing_a_name_uses_the_patient_id(portal):
+    app, view = portal
+    before = _patient_ids()
+    _save(app, view, "zenobia")
+    assert _patient_ids() == before + [4242]
+    assert view.uid_input.text() == "4242"
+
+
+@pytest.mark.parametrize("typed", ["nobody by this name", "qu"])      # no match; two matches
+def test_save_refuses_a_name_that_is_not_one_patient(portal, typed):
+    app, view = portal
+    before = _patient_ids()
+    _save(app, view, typed)
+    assert _patient_ids() == before
+    assert view.notification_label.text() == "No single patient by that name; pick one from the list."
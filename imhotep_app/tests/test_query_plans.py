@@ -0,0 +1,44 @@
+# tests/test_query_plans.py
+"""
+Every statement in queries.PLAN_CHECKS is served by an index: no full scan,
+no sort (tools/plan_check.py, on a seeded SQLite database). A query edit or a
+dropped index that loses its index fails here instead of in production.
+"""
+import pytest
+
+from imhotep.db.queries import PLAN_CHECKS
+
+SQLITE_CHECKS = [check for check in PLAN_CHECKS if check.backend in ("", "sqlite")]
+
+
+@pytest.fixture(scope="module")
+def seeded(sqlite_db):
+    from imhotep.db.connection import connection
+    from imhotep.tools.synth_data import generate
+
+    generate(doctors=2, pharmacists=2, patients=300, prescriptions=5000, seed=7, claim_rate=0.2,
+             bcrypt_cost=4, distinct_passwords=1, log=lambda message: None)
+    with connection() as conn:
+        conn.execute("ANALYZE")     # plans as the planner sees a loaded database
+    return sqlite_db
+
+
+@pytest.mark.parametrize("check", SQLITE_CHECKS, ids=lambda c: f"{SQLITE_CHECKS.index(c)}-{c.name}")
+def test_query_uses_an_index(seeded, check):
+    from imhotep.db.connection import connection
+    from imhotep.tools.plan_check import explain, plan_problems
+
+    with connection() as conn:
+        problems = plan_problems(explain(conn, check.sql, check.params))
+    if check.allow_scan:
+        pytest.skip(f"documented exception: {check.note}")
+    assert not problems, f"{check.name}: {'; '.join(problems)}"
+
+
+def test_run_checks_passes(seeded):
+    import io
+
+    from imhotep.tools.plan_check import run_checks
+
+    out = io.StringIO()
+    assert run_checks(out=out) == 0, out.getvalue()
@@ -0,0 +1,76 @@
+# tests/test_search.py
+"""
+db/search.py on SQLite: terms with few hits are ranked, a common word gets the
+newest matches unranked, and the walk back for those stops at RECENT_SPAN.
+"""
+import pytest
+
+COUNT = 40                      # Pr_ID 1..COUNT, all "twice daily"
+OLD_COMMON = range(1, 13)       # "amoxicillin", a common word in the oldest rows
+RARE = (5, 30)                  # "rash" in the notes
+
+
+@pytest.fixture(scope="module")
+def prescriptions(sqlite_db):
+    from imhotep.db import queries
+    from imhotep.db.connection import execute_many
+
+    execute_many(queries.PRESCRIPTION_INSERT, [
+        (7000 + pr_id,
+         "review rash" if pr_id in RARE else "review",
+         "amoxicillin 500mg twice daily" if pr_id in OLD_COMMON else "paracetamol twice daily")
+        for pr_id in range(1, COUNT + 1)
+    ])
+
+
+@pytest.fixture
+def cap(monkeypatch):
+    from imhotep.db import search
+
+    monkeypatch.setattr(search, "FULL_RANK_HITS", 10)
+    monkeypatch.setattr(search, "RECENT_WINDOW", 4)
+    return search
+
+
+def _ids(results):
+    return [row[0] for row in results.rows]
+
+
+def test_prefix_is_cut_to_the_prefix_indexes():
+    from imhotep.db.search import fts5_query, parse
+
+    assert fts5_query(parse("amoxicillin")) == '"amoxi"*'
+    assert fts5_query(parse("amoxicillin ")) == '"amoxicillin"'
+    assert fts5_query(parse('"twice dail')) == '"twice dail"*'
+    assert fts5_query(parse("a")) == '"a"'
+
+
+def test_rare_word_is_ranked(prescriptions, cap):
+    results = cap.search_prescriptions("rash")
+    assert not results.recent
+    assert sorted(_ids(results)) == list(RARE)
+    assert all(row[-1] is not None for row in results.rows)
+
+
+def test_rare_word_with_a_common_one_is_not_ranked(prescriptions, cap):
+    results = cap.search_prescriptions("rash twice")          # bm25 would read every "twice"
+    assert results.recent and _ids(results) == sorted(RARE, reverse=True)
+
+
+def test_phrase_with_a_rare_word_is_ranked(prescriptions, cap):
+    results = cap.search_prescriptions('"review rash"')
+    assert not results.recent and sorted(_ids(results)) == list(RARE)
+
+
+def test_common_word_gets_the_newest_matches(prescriptions, cap):
+    results = cap.search_prescriptions("twice daily", limit=15)
+    assert results.recent
+    assert _ids(results) == list(range(COUNT, COUNT - 15, -1))
+    assert all(row[-1] is None for row in results.rows)
+
+
+def test_newest_walk_stops_at_the_span(prescriptions, cap, monkeypatch):
+    monkeypatch.setattr(cap, "RECENT_SPAN", 20)
+    assert _ids(cap.search_prescriptions("paracetamol")) == list(range(COUNT, COUNT - 20, -1))
+    results = cap.search_prescriptions("amoxicillin")           # all older than the span
+    assert results.recent and results.rows == []
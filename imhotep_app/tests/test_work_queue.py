@@ -0,0 +1,123 @@
+# tests/test_work_queue.py
+"""
+db/work_queue.py on SQLite, with a clock the tests move by hand: claims never
+overlap, leases run out, and renew/complete/release/dispense only act on
+claims still held.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+LEASE = 300
+PRESCRIPTIONS = 8
+
+
+class Clock:
+    def __init__(self):
+        self.now = datetime(2030, 1, 1, 9, 0, 0)
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+
+@pytest.fixture
+def clock(sqlite_db):
+    """A clock and PRESCRIPTIONS fresh active prescriptions, nobody's claims."""
+    from imhotep.db import queries
+    from imhotep.db.connection import execute, execute_many
+
+    execute("DELETE FROM pharmacist_portal")
+    execute("DELETE FROM prescription")
+    execute_many(queries.PRESCRIPTION_INSERT, [(1000 + i, "note", "rx") for i in range(PRESCRIPTIONS)])
+    return Clock()
+
+
+def _queue(user_id, clock):
+    from imhotep.db.work_queue import WorkQueue
+
+    return WorkQueue(user_id, lease_seconds=LEASE, clock=clock)
+
+
+def _ids(rows):
+    return [row[0] for row in rows]
+
+
+def _active():
+    from imhotep.db.connection import fetch_all
+
+    return {row[0] for row in fetch_all("SELECT Pr_ID FROM prescription WHERE Dispense = 1", as_dict=False)}
+
+
+def _claims():
+    from imhotep.db.connection import fetch_all
+
+    return dict(fetch_all("SELECT Pr_ID, User_ID FROM pharmacist_portal", as_dict=False))
+
+
+def test_two_queues_claim_disjoint_rows(clock):
+    a, b = _queue(5, clock), _queue(6, clock)
+    mine, theirs = _ids(a.claim(3)), _ids(b.claim(3))
+    assert len(mine) == len(theirs) == 3
+    assert not set(mine) & set(theirs)
+    assert mine == sorted(mine) and max(mine) < min(theirs)      # oldest first
+    assert _ids(b.claim(5)) == sorted(_active() - set(mine) - set(theirs))
+    assert b.claim(5) == []                                        # queue drained
+
+
+def test_expired_lease_is_claimable_again(clock):
+    a, b = _queue(5, clock), _queue(6, clock)
+    held = _ids(a.claim(2))
+    clock.advance(LEASE - 1)
+    assert not set(_ids(b.claim(PRESCRIPTIONS))) & set(held)      # still a's
+    clock.advance(2)
+    assert set(_ids(b.claim(PRESCRIPTIONS))) == set(held)         # ran out: b takes them
+    assert {_claims()[pr_id] for pr_id in held} == {6}
+
+
+def test_renew_keeps_live_claims_and_drops_taken_over_ones(clock):
+    a, b = _queue(5, clock), _queue(6, clock)
+    held = _ids(a.claim(4))
+    clock.advance(LEASE - 10)
+    assert a.renew(held) == set(held)
+    clock.advance(LEASE - 10)                                      # past the first lease, within the renewed one
+    assert not set(_ids(b.claim(PRESCRIPTIONS))) & set(held)
+    clock.advance(11)                                              # the renewed lease is over too
+    assert set(_ids(b.claim(PRESCRIPTIONS))) == set(held)
+    assert a.renew(held) == set()                                  # b's now: a learns it has lost them
+    assert b.renew(held) == set(held)
+
+
+def test_complete_skips_prescriptions_no_longer_held(clock):
+    a, b = _queue(5, clock), _queue(6, clock)
+    held = _ids(a.claim(2))
+    clock.advance(LEASE + 1)
+    assert set(_ids(b.claim(2))) == set(held)
+    assert a.complete(held) == []                                  # b took them over
+    assert set(held) <= _active()
+    assert b.complete(held) == held
+    assert not set(held) & _active()
+    assert not set(held) & _claims().keys()
+
+
+def test_release_hands_claims_back(clock):
+    a, b = _queue(5, clock), _queue(6, clock)
+    held = _ids(a.claim(2))
+    assert b.release(held) == 0                                    # not b's to give back
+    assert a.release(held) == 2
+    assert a.release(held) == 0
+    assert _ids(b.claim(2)) == held                                # free at once, no lease to wait out
+
+
+def test_dispense_from_a_list_skips_other_pharmacists_claims(clock):
+    a, b = _queue(5, clock), _queue(6, clock)
+    held = _ids(a.claim(2))
+    free = sorted(_active() - set(held))[:1]
+    assert b.dispense(held + free) == free
+    assert set(held) <= _active()
+    assert a.dispense(held[:1]) == held[:1]                        # our own claim: dispensed and dropped
+    assert held[0] not in _claims()
+    clock.advance(LEASE + 1)
+    assert b.dispense(held[1:]) == held[1:]                        # a's lease ran out